@@ -0,0 +1,51 @@
+"""
+Compares the memory held per order by a `Resource` and by its compact
+counterpart. Only the per-instance overhead is counted, nested values are the
+same objects in both.
+
+Usage:
+  python benchmarks/bench_compact.py
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tictail.resource import Order, Store
+from tictail.resource.compact import compact_class
+from fixtures import make_orders
+
+
+def resource_size(resource):
+    size = sys.getsizeof(resource)
+    size += sys.getsizeof(resource.__dict__)
+    size += sys.getsizeof(resource._data)
+    size += sys.getsizeof(resource.parent)
+    return size
+
+
+def compact_size(compact):
+    size = sys.getsizeof(compact)
+    if compact._extra is not None:
+        size += sys.getsizeof(compact._extra)
+    return size
+
+
+def main():
+    orders = make_orders(1000, items=1)
+    parent = "{0}/KGu".format(Store.endpoint)
+
+    full = [Order(None, data=o, parent=parent) for o in orders]
+    compact = [compact_class(Order)(o) for o in orders]
+
+    full_bytes = sum(resource_size(r) for r in full) / len(full)
+    compact_bytes = sum(compact_size(r) for r in compact) / len(compact)
+
+    print("{0:<40} {1:>10} bytes".format('Order', full_bytes))
+    print("{0:<40} {1:>10} bytes".format('CompactOrder', compact_bytes))
+    print("\nsaving: {0:.1f}x".format(float(full_bytes) / compact_bytes))
+
+
+if __name__ == '__main__':
+    main()
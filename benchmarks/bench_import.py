@@ -0,0 +1,61 @@
+"""
+Measures the cold start of `import tictail` in a fresh interpreter, and which
+heavy dependencies it pulls in. On Python 3.7+ the slowest imports are listed
+as reported by `python -X importtime`.
+
+Usage:
+  python benchmarks/bench_import.py
+
+"""
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY = ('requests', 'dateutil', 'urllib3', 'OpenSSL', 'ndg')
+
+RUNS = 10
+
+SCRIPT = """
+import sys
+import tictail
+print(','.join(sorted(set(m.split('.')[0] for m in sys.modules
+                          if m.split('.')[0] in {0!r}))))
+""".format(HEAVY)
+
+
+def run(*args):
+    started = time.time()
+    proc = subprocess.Popen((sys.executable,) + args, cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    return time.time() - started, out.decode('utf-8'), err.decode('utf-8')
+
+
+def main():
+    baseline = min(run('-c', 'pass')[0] for _ in range(RUNS))
+    timings = [run('-c', SCRIPT) for _ in range(RUNS)]
+    best = min(t[0] for t in timings)
+
+    print("{0:<40} {1:>10.1f} ms".format('interpreter startup', baseline * 1000))
+    print("{0:<40} {1:>10.1f} ms".format('import tictail', (best - baseline) * 1000))
+    print("{0:<40} {1:>10}".format('heavy modules imported',
+                                   timings[0][1].strip() or 'none'))
+
+    if sys.version_info >= (3, 7):
+        _, _, err = run('-X', 'importtime', '-c', 'import tictail')
+        rows = []
+        for line in err.splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                rows.append((int(parts[1]), parts[2].rstrip()))
+        print("\nslowest imports (cumulative us):")
+        for cumulative, name in sorted(rows, reverse=True)[:10]:
+            print("{0:<40} {1:>10}".format(name, cumulative))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Compares `parse_datetime` against plain `dateutil` on the timestamps of a
+realistic page of orders, and measures the cost of instantiating the page.
+
+Usage:
+  python benchmarks/bench_parse_datetime.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dateutil.parser import parse
+
+from tictail.resource import base, Order
+from tictail.resource.base import parse_datetime, register_transform
+from fixtures import make_orders, collect_timestamps
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print("{0:<40} {1:>10.2f} ms".format(name, seconds * 1000))
+    return seconds
+
+
+def main():
+    orders = make_orders(100, items=10)
+    timestamps = collect_timestamps(orders)
+    print("{0} orders, {1} timestamps ({2} distinct)\n".format(
+        len(orders), len(timestamps), len(set(timestamps))))
+
+    def parse_all(parser):
+        return lambda: [parser(ts) for ts in timestamps]
+
+    def uncached():
+        base._datetime_cache.clear()
+        return [base._parse_api_datetime(ts) for ts in timestamps]
+
+    baseline = bench('dateutil.parser.parse', parse_all(parse), 10)
+    fast = bench('fast path, no cache', uncached, 10)
+    cached = bench('fast path, cached', parse_all(parse_datetime), 10)
+
+    print("\nspeedup: {0:.1f}x uncached, {1:.1f}x cached\n".format(
+        baseline / fast, baseline / cached))
+
+    instantiate = lambda: [Order(None, data=order) for order in orders]
+    # Transforms are looked up in the registry, so the baseline has to be
+    # registered there.
+    originals = [(attr, base.TRANSFORMS[attr])
+                 for attr in ('created_at', 'modified_at')]
+    for attr, _ in originals:
+        register_transform(attr, parse)
+    try:
+        baseline = bench('instantiate orders, dateutil', instantiate, 3)
+    finally:
+        for attr, transform in originals:
+            register_transform(attr, transform)
+    fast = bench('instantiate orders', instantiate, 3)
+
+    print("\nspeedup: {0:.1f}x".format(baseline / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Compares instantiating orders through their compiled transform plan against
+the generic recursive walk over every nested value, and against view mode,
+where nothing is transformed until it is read.
+
+Usage:
+  python benchmarks/bench_transform_plan.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tictail.client import DEFAULT_CONFIG
+from tictail.resource import base, Order
+from fixtures import make_orders
+
+
+class FakeTransport(object):
+    def __init__(self, config):
+        self.config = config
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print("{0:<40} {1:>10.2f} ms".format(name, seconds * 1000))
+    return seconds
+
+
+def main():
+    orders = make_orders(100, items=10)
+    plan = Order.get_transform_plan()
+    generic = base.GenericTransformPlan()
+
+    baseline = bench('generic walk', lambda: [generic.apply(o) for o in orders], 20)
+    planned = bench('transform plan', lambda: [plan.apply(o) for o in orders], 20)
+
+    print("\nspeedup: {0:.1f}x\n".format(baseline / planned))
+
+    transport = FakeTransport(DEFAULT_CONFIG)
+    view_transport = FakeTransport(dict(DEFAULT_CONFIG, view_resources=True))
+    copied = bench('instantiate orders',
+                   lambda: [Order(transport, data=o) for o in orders], 20)
+    viewed = bench('instantiate orders, view mode',
+                   lambda: [Order(view_transport, data=o) for o in orders], 20)
+
+    print("\nspeedup: {0:.1f}x".format(copied / viewed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Compares building resource uris and absolute request urls with the cached
+prefixes against rebuilding them from scratch on every access, as done before.
+
+Usage:
+  python benchmarks/bench_uri.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tictail.client import DEFAULT_CONFIG
+from tictail.transport import RequestsHttpTransport
+from tictail.resource import Order, Store
+from tictail.resource.base import remove_slashes
+from fixtures import make_orders
+
+
+def rebuilt_uri(resource):
+    uri = ''
+    if resource.parent:
+        uri += "/{0}".format(remove_slashes(resource.parent))
+    uri += "/{0}".format(resource.endpoint)
+    if not resource.singleton:
+        uri += "/{0}".format(resource.pk)
+    return uri
+
+
+def rebuilt_abs_uri(config, uri):
+    base = config['base']
+    version = "v{0}".format(config['version'])
+    protocol = config['protocol']
+    if uri[0] == '/':
+        uri = uri[1:]
+    if uri[-1] == '/':
+        uri = uri[:-1]
+    return "{0}://{1}/{2}/{3}".format(protocol, base, version, uri)
+
+
+def bench(name, func, number):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print("{0:<40} {1:>10.2f} ms".format(name, seconds * 1000))
+    return seconds
+
+
+def main():
+    transport = RequestsHttpTransport('token', dict(DEFAULT_CONFIG))
+    parent = "/{0}/KGu/".format(Store.endpoint)
+    orders = [Order(transport, data=o, parent=parent)
+              for o in make_orders(1000, items=0)]
+    uris = [o.uri for o in orders]
+
+    baseline = bench('Resource.uri, rebuilt',
+                     lambda: [rebuilt_uri(o) for o in orders], 20)
+    cached = bench('Resource.uri, cached',
+                   lambda: [o.uri for o in orders], 20)
+    print("\nspeedup: {0:.1f}x\n".format(baseline / cached))
+
+    config = transport.config
+    baseline = bench('absolute uri, rebuilt',
+                     lambda: [rebuilt_abs_uri(config, u) for u in uris], 20)
+    cached = bench('absolute uri, precomputed base',
+                   lambda: [transport._make_abs_uri(u) for u in uris], 20)
+    print("\nspeedup: {0:.1f}x".format(baseline / cached))
+
+
+if __name__ == '__main__':
+    main()
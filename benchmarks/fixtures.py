@@ -0,0 +1,76 @@
+"""
+Synthetic API payloads shaped like the responses of the Tictail API.
+
+"""
+from datetime import datetime, timedelta
+
+
+def _timestamp(i):
+    # Timestamps repeat every so often, like they do in real orders where all
+    # items share the timestamps of the order.
+    return (datetime(2014, 1, 1) + timedelta(seconds=i * 37)).isoformat()
+
+
+def make_product(i):
+    return {
+        'id': "p{0}".format(i),
+        'title': "Product {0}".format(i),
+        'price': 1200 + i,
+        'currency': 'SEK',
+        'quantity': i % 7,
+        'status': 'published',
+        'created_at': _timestamp(i),
+        'modified_at': _timestamp(i + 1),
+        'images': [{
+            'id': "i{0}".format(i),
+            'url': "http://example.com/{0}.jpg".format(i),
+            'created_at': _timestamp(i)
+        }],
+        'categories': [{'id': 'aVr', 'title': 'Shirts'}]
+    }
+
+
+def make_order(i, items=10):
+    return {
+        'id': "o{0}".format(i),
+        'price': 1200 * items,
+        'currency': 'SEK',
+        'created_at': _timestamp(i),
+        'modified_at': _timestamp(i + 1),
+        'customer': {
+            'id': "c{0}".format(i),
+            'name': 'John Doe',
+            'email': 'johndoe@example.com',
+            'created_at': _timestamp(i),
+            'modified_at': None
+        },
+        'transaction': {'status': 'paid', 'created_at': _timestamp(i)},
+        'fullfilment': {'status': 'unhandled', 'modified_at': _timestamp(i)},
+        'items': [{
+            'quantity': 1,
+            'price': 1200,
+            'currency': 'SEK',
+            'product': make_product(j)
+        } for j in range(items)],
+        'vat': {'price': 0, 'rate': '0.250000'}
+    }
+
+
+def make_orders(count, items=10):
+    return [make_order(i, items) for i in range(count)]
+
+
+def collect_timestamps(value, key=None, found=None):
+    """Returns all `created_at` and `modified_at` values in `value`."""
+    if found is None:
+        found = []
+    if key in ('created_at', 'modified_at'):
+        if value is not None:
+            found.append(value)
+    elif isinstance(value, dict):
+        for k, v in value.iteritems():
+            collect_timestamps(v, k, found)
+    elif isinstance(value, list):
+        for v in value:
+            collect_timestamps(v, None, found)
+    return found
@@ -27,6 +27,9 @@ setup(
     description='Python bindings for the Tictail API',
     keywords=['tictail', 'rest', 'api'],
     install_requires=requirements,
+    entry_points={
+        'console_scripts': ['tictail = tictail.cli:main']
+    },
     long_description=long_description,
     classifiers=[
         "Development Status :: 4 - Beta",
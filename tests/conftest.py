@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 
 import pytest
 
@@ -27,3 +28,70 @@ def client(test_token):
 @pytest.fixture(scope='function')
 def transport(client):
     return client.transport
+
+
+class FakeApi(object):
+    """Serves `items` from memory in the order of their ids, honoring the
+    `after`, `limit` and `modified_*` query parameters. Items that were never
+    modified are filtered by their `created_at`. Raises after `fail_after`
+    requests if set.
+
+    Replaces the `request` method of a collection:
+
+    >>> monkeypatch.setattr(products, 'request', FakeApi(PRODUCTS))
+
+    """
+
+    def __init__(self, items=(), fail_after=None):
+        self.items = list(items)
+        self.fail_after = fail_after
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def put(self, item):
+        """Adds `item`, replacing the item with the same id."""
+        self.items = [i for i in self.items if i['id'] != item['id']]
+        self.items.append(item)
+
+    def __call__(self, method, uri, params=None):
+        with self.lock:
+            self.calls.append(params)
+            calls = len(self.calls)
+        if self.fail_after is not None and calls > self.fail_after:
+            raise IOError('connection lost')
+
+        changed_at = lambda i: i.get('modified_at') or i.get('created_at')
+        rv = sorted(self.items, key=lambda i: i['id'])
+        if 'modified_after' in params:
+            rv = [i for i in rv if changed_at(i) > params['modified_after']]
+        if 'modified_before' in params:
+            rv = [i for i in rv if changed_at(i) < params['modified_before']]
+        if 'after' in params:
+            rv = [i for i in rv if i['id'] > params['after']]
+        return rv[:params['limit']], 200
+
+
+class FakeClock(object):
+    """A clock that only advances when told to, or when slept on. It is
+    callable, and `time` and `sleep` stand in for their `time` module
+    counterparts.
+
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def ids(items):
+    return [item['id'] for item in items]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import pytest
+from mock import MagicMock
+
+from tictail import cli
+
+
+class TestCli(object):
+
+    @pytest.fixture
+    def export_store(self, monkeypatch):
+        mock = MagicMock(return_value={'products': 1, 'orders': 2})
+        monkeypatch.setattr(cli, 'export_store', mock)
+        return mock
+
+    def test_export(self, export_store, tmpdir):
+        output = str(tmpdir)
+        checkpoint = str(tmpdir.join('checkpoint.json'))
+        assert cli.main(['export', '-t', 'token', '-s', 'KGu', '-o', output,
+                         '-f', 'csv', '-z', '-c', 'id,title', '--limit', '50',
+                         '--checkpoint', checkpoint,
+                         'products', 'orders']) == 0
+
+        args, kwargs = export_store.call_args
+        store, directory = args
+        assert store.id == 'KGu'
+        assert store.transport.access_token == 'token'
+        assert directory == output
+        assert kwargs['collections'] == ['products', 'orders']
+        assert kwargs['format'] == 'csv'
+        assert kwargs['compress'] is True
+        assert kwargs['columns'] == {
+            'products': ['id', 'title'],
+            'orders': ['id', 'title']
+        }
+        assert kwargs['limit'] == 50
+        assert kwargs['checkpoints'].path == checkpoint
+
+    def test_export_defaults(self, monkeypatch, export_store):
+        me = MagicMock()
+        monkeypatch.setattr(cli.Client, 'me', me)
+        export_store.return_value = dict.fromkeys(cli.EXPORTABLE, 0)
+
+        assert cli.main(['export', '-t', 'token']) == 0
+        args, kwargs = export_store.call_args
+        assert args == (me.return_value, '.')
+        assert kwargs['collections'] == list(cli.EXPORTABLE)
+        assert kwargs['format'] == 'ndjson'
+        assert kwargs['columns'] is None
+
+    @pytest.mark.parametrize('argv', [
+        [],
+        ['import', '-t', 'token'],
+        ['export'],
+        ['export', '-t', 'token', 'themes'],
+        ['export', '-t', 'token', '-f', 'xml']
+    ])
+    def test_usage_errors(self, monkeypatch, argv):
+        monkeypatch.delenv('TICTAIL_ACCESS_TOKEN', raising=False)
+        with pytest.raises(SystemExit):
+            cli.main(argv)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+
+from tictail.columnar import ColumnSet, column_kind, concat_columns, to_columns
+
+
+ORDERS = [
+    {
+        'id': 'a1',
+        'created_at': '2014-01-01T10:00:00.000000',
+        'price': 1000,
+        'transaction': {'status': 'paid'}
+    },
+    {
+        'id': 'b2',
+        'created_at': None,
+        'price': None,
+        'transaction': None
+    }
+]
+
+
+@pytest.fixture
+def numpy():
+    # NumPy is a development requirement, the array tests must not be
+    # skipped.
+    import numpy
+    return numpy
+
+
+class TestColumnKind(object):
+    @pytest.mark.parametrize('name,kind', [
+        ('created_at', 'datetime'),
+        ('items.modified_at', 'datetime'),
+        ('price', 'number'),
+        ('vat.price', 'number'),
+        ('original_price', 'number'),
+        ('quantity', 'number'),
+        ('id', 'object'),
+        ('store_id', 'object'),
+        ('title', 'object')
+    ])
+    def test_column_kind(self, name, kind):
+        assert column_kind(name) == kind
+
+
+class TestToColumns(object):
+    def test_default_columns(self):
+        columns = to_columns(ORDERS, use_numpy=False)
+        assert isinstance(columns, ColumnSet)
+        assert columns.names == ['created_at', 'id', 'price', 'transaction']
+        assert len(columns) == 2
+
+    def test_lists(self):
+        columns = to_columns(ORDERS, ['id', 'created_at', 'price',
+                                      'transaction.status'], use_numpy=False)
+        assert columns['id'] == ['a1', 'b2']
+        assert columns['created_at'] == [datetime(2014, 1, 1, 10), None]
+        assert columns['price'] == [1000, None]
+        assert columns['transaction.status'] == ['paid', None]
+
+    def test_empty(self):
+        columns = to_columns([], use_numpy=False)
+        assert columns.names == []
+        assert len(columns) == 0
+
+    def test_arrays(self, numpy):
+        columns = to_columns(ORDERS, ['id', 'created_at', 'price'])
+        assert columns['id'].dtype == object
+        assert columns['created_at'].dtype == numpy.dtype('datetime64[us]')
+        assert str(columns['created_at'][1]) == 'NaT'
+        assert columns['price'].dtype == numpy.float64
+        assert numpy.isnan(columns['price'][1])
+
+    def test_int_arrays(self, numpy):
+        columns = to_columns([{'quantity': 1}, {'quantity': 2}])
+        assert columns['quantity'].dtype == numpy.int64
+
+    def test_float_arrays(self, numpy):
+        columns = to_columns([{'price': 10}, {'price': 12.5}])
+        assert columns['price'].dtype == numpy.float64
+        assert list(columns['price']) == [10.0, 12.5]
+
+    def test_to_records(self, numpy):
+        records = to_columns(ORDERS, ['id', 'price']).to_records()
+        assert records[0]['id'] == 'a1'
+
+
+class TestConcatColumns(object):
+    def test_concat_lists(self):
+        chunks = [
+            to_columns(ORDERS[:1], ['id', 'price'], use_numpy=False),
+            to_columns(ORDERS[1:], ['id', 'price'], use_numpy=False)
+        ]
+        columns = concat_columns(chunks)
+        assert len(columns) == 2
+        assert columns.names == ['id', 'price']
+        assert columns['price'] == [1000, None]
+
+    def test_concat_arrays(self, numpy):
+        chunks = [to_columns(ORDERS[:1], ['price']),
+                  to_columns(ORDERS[1:], ['price'])]
+        assert len(concat_columns(chunks)['price']) == 2
+
+    def test_concat_nothing(self):
+        assert len(concat_columns([])) == 0
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import pickle
+import pprint
+
+import pytest
+from mock import MagicMock
+
+from tictail import Tictail
+from tictail.resource import Order, Orders, Product
+from tictail.resource.compact import CompactResource, compact_class
+
+
+ORDER = {
+    'id': 'aFQX',
+    'price': 1200,
+    'created_at': '2014-01-01T00:00:00',
+    'items': [{'product': {'id': '9cVh', 'created_at': '2014-01-01T00:00:00'}}],
+    'unknown_field': 'foo'
+}
+
+
+class TestCompactResource(object):
+
+    def test_compact_class(self):
+        cls = compact_class(Order)
+        assert issubclass(cls, CompactResource)
+        assert cls.__name__ == 'CompactOrder'
+        assert cls.resource_class is Order
+        assert cls.fields == frozenset(Order.fields)
+        assert compact_class(Order) is cls
+        assert compact_class(Product) is not cls
+
+    @pytest.mark.parametrize('protocol', [0, pickle.HIGHEST_PROTOCOL])
+    def test_pickle(self, protocol):
+        order = compact_class(Order)(ORDER)
+        restored = pickle.loads(pickle.dumps(order, protocol))
+        assert type(restored) is type(order)
+        assert restored == order
+        assert restored.created_at == datetime(2014, 1, 1)
+        assert restored.unknown_field == 'foo'
+
+    def test_construction(self):
+        order = compact_class(Order)(ORDER)
+        assert not hasattr(order, '__dict__')
+        assert order.id == 'aFQX'
+        assert order['price'] == 1200
+        assert order.pk == 'aFQX'
+
+        # Values are transformed using the plan of the resource class.
+        assert order.created_at == datetime(2014, 1, 1)
+        assert order.items[0]['product']['created_at'] == datetime(2014, 1, 1)
+
+        # Unknown fields end up in the fallback dict.
+        assert order.unknown_field == 'foo'
+        assert order._extra == {'unknown_field': 'foo'}
+
+        # Missing fields behave like on a `Resource`.
+        with pytest.raises(AttributeError):
+            order.currency
+        with pytest.raises(KeyError):
+            order['currency']
+        assert 'currency' not in order
+        assert 'price' in order
+
+    @pytest.mark.parametrize('name', [
+        'to_dict', 'pk', 'fields', 'resource_class', '_extra', '__class__'
+    ])
+    def test_items_are_data_only(self, name):
+        order = compact_class(Order)(ORDER)
+        assert name not in order
+        with pytest.raises(KeyError):
+            order[name]
+        assert order['unknown_field'] == 'foo'
+
+    def test_no_extra(self):
+        order = compact_class(Order)({'id': 1})
+        assert order._extra is None
+        with pytest.raises(AttributeError):
+            order.foo
+
+    def test_read_only(self):
+        order = compact_class(Order)(ORDER)
+        with pytest.raises(TypeError):
+            order.price = 1
+        with pytest.raises(TypeError):
+            order.foo = 1
+
+    def test_pk_missing(self):
+        with pytest.raises(ValueError):
+            compact_class(Order)({'price': 1}).pk
+
+    def test_helpers(self, transport):
+        order = compact_class(Order)(ORDER)
+        full = Order(transport, data=ORDER)
+        assert order.to_dict() == full.to_dict()
+        assert sorted(order.data_keys()) == sorted(full.data_keys())
+        assert sorted(order.data_items()) == sorted(full.data_items())
+        assert len(order.data_values()) == len(full.data_values())
+        assert order == compact_class(Order)(ORDER)
+        assert order != compact_class(Order)({'id': 1})
+        assert repr(order) == "CompactOrder({0})".format(pprint.pformat(order.to_dict()))
+
+    def test_to_resource(self, transport):
+        order = compact_class(Order)(ORDER).to_resource(transport, parent='stores/1')
+        assert isinstance(order, Order)
+        assert order.uri == '/stores/1/orders/aFQX'
+        assert order.unknown_field == 'foo'
+        assert order.created_at == datetime(2014, 1, 1)
+
+    def test_collection_option(self, monkeypatch, test_token):
+        client = Tictail(test_token, {'compact_resources': True})
+        orders = client.orders(store=1)
+        pages = [([ORDER, {'id': 'b'}], 200), ([{'id': 'c'}], 200)]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(orders, 'request', mock)
+
+        rv = list(orders.iterate(limit=2))
+        assert [type(o) for o in rv] == [compact_class(Order)] * 3
+        assert [o.pk for o in rv] == ['aFQX', 'b', 'c']
+        mock.assert_called_with('GET', '/stores/1/orders',
+                                params={'limit': 2, 'after': 'b'})
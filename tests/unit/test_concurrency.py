@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+
+from tictail.concurrency import (imap_unordered, map_concurrently, run_batch,
+                                 retrying, is_transient, BatchReport, Throttle)
+from tictail.errors import (ApiTimeout, BadRequest, RateLimited,
+                            ServerError)
+
+from conftest import FakeClock
+
+
+class TestConcurrency(object):
+
+    def test_imap_unordered(self):
+        rv = list(imap_unordered(lambda x: x * 2, range(10), workers=3))
+        assert sorted(rv) == [(x, x * 2, None) for x in range(10)]
+
+    def test_imap_unordered_captures_errors(self):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+
+        rv = dict((item, error) for item, _, error in imap_unordered(func, range(5)))
+        assert isinstance(rv[3], ValueError)
+        assert all(rv[x] is None for x in (0, 1, 2, 4))
+
+    def test_imap_unordered_uses_threads(self):
+        barrier = threading.Event()
+        seen = []
+
+        def func(x):
+            seen.append(x)
+            if len(seen) == 2:
+                barrier.set()
+            # Both calls must be in flight at the same time to finish.
+            assert barrier.wait(5) in (True, None)
+            return x
+
+        rv = list(imap_unordered(func, [1, 2], workers=2))
+        assert barrier.is_set()
+        assert sorted(item for item, _, _ in rv) == [1, 2]
+
+    def test_imap_unordered_close_early(self):
+        gen = imap_unordered(lambda x: x, iter(range(1000)), workers=2)
+        next(gen)
+        gen.close()
+
+    def test_imap_unordered_invalid_workers(self):
+        with pytest.raises(ValueError):
+            list(imap_unordered(lambda x: x, [1], workers=0))
+
+    def test_map_concurrently(self):
+        assert map_concurrently(lambda x: x + 1, range(20), 4) == range(1, 21)
+
+    def test_map_concurrently_raises(self):
+        def func(x):
+            raise KeyError(x)
+
+        with pytest.raises(KeyError):
+            map_concurrently(func, [1, 2])
+
+    def test_run_batch(self):
+        def func(x):
+            if x % 3 == 0:
+                raise KeyError(x)
+            return x * 2
+
+        report = run_batch(func, range(10), 3)
+        assert isinstance(report, BatchReport)
+        assert len(report) == 10
+        assert not report.ok
+        assert sorted(report.succeeded) == [(x, x * 2) for x in range(10)
+                                            if x % 3]
+        assert sorted(item for item, _ in report.failed) == [0, 3, 6, 9]
+        assert all(isinstance(e, KeyError) for _, e in report.failed)
+        with pytest.raises(KeyError):
+            report.raise_first()
+
+    def test_run_batch_ok(self):
+        report = run_batch(lambda x: x, [1, 2])
+        assert report.ok
+        report.raise_first()
+
+    def test_throttle(self):
+        clock = FakeClock()
+        throttle = Throttle(clock.time, clock.sleep)
+        throttle.wait()
+        assert clock.sleeps == []
+
+        throttle.pause(5)
+        throttle.pause(2)
+        throttle.wait()
+        assert clock.now == 5
+        throttle.wait()
+        assert clock.sleeps == [5]
+
+    def test_retrying(self):
+        clock = FakeClock()
+        errors = [ServerError('error', 503, ''), ServerError('error', 503, '')]
+
+        def func(x):
+            if errors:
+                raise errors.pop()
+            return x
+
+        call = retrying(func, (ServerError,), retries=2, delay=1,
+                        throttle=Throttle(clock.time, clock.sleep))
+        assert call(1) == 1
+        assert clock.sleeps == [1, 2]
+
+    def test_retrying_gives_up(self):
+        clock = FakeClock()
+
+        def func(x):
+            raise ServerError('error', 503, '')
+
+        call = retrying(func, (ServerError,), retries=2, delay=1,
+                        throttle=Throttle(clock.time, clock.sleep))
+        with pytest.raises(ServerError):
+            call(1)
+        assert clock.sleeps == [1, 2]
+
+    def test_retrying_only_transient_errors(self):
+        calls = []
+
+        def func(x):
+            calls.append(x)
+            raise BadRequest('error', 400, '')
+
+        with pytest.raises(BadRequest):
+            retrying(func, (ServerError,))(1)
+        assert calls == [1]
+
+    def test_retrying_rate_limited(self):
+        clock = FakeClock()
+        throttle = Throttle(clock.time, clock.sleep)
+        errors = [RateLimited('error', 429, '', retry_after=10)]
+
+        def func(x):
+            if errors:
+                raise errors.pop()
+            return x
+
+        call = retrying(func, (RateLimited,), delay=1, throttle=throttle)
+        assert call(1) == 1
+        # The pause is shared with every other call using the throttle.
+        assert clock.sleeps == [10]
+        throttle.pause(3)
+        assert call(2) == 2
+        assert clock.sleeps == [10, 3]
+
+    @pytest.mark.parametrize('error,expected', [
+        (ApiTimeout('timed out'), True),
+        (RateLimited('error', 429, ''), True),
+        (ServerError('error', 503, ''), True),
+        (ServerError('error', 401, ''), False),
+        (ServerError('error', 422, ''), False),
+        (BadRequest('error', 400, ''), False),
+        (KeyError(), False)
+    ])
+    def test_is_transient(self, error, expected):
+        assert is_transient(error) is expected
+
+    def test_retrying_predicate(self):
+        clock = FakeClock()
+        calls = []
+
+        def func(x):
+            calls.append(x)
+            raise ServerError('error', 422, '')
+
+        call = retrying(func, is_transient,
+                        throttle=Throttle(clock.time, clock.sleep))
+        with pytest.raises(ServerError):
+            call(1)
+        assert calls == [1]
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+import threading
+import time
+
+import pytest
+from mock import MagicMock
+
+from tictail.resource import (Orders,
+                              Follower,
+                              Product,
+                              Card,
+                              Customer,
+                              Order,
+                              Store,
+                              Me,
+                              Cards,
+                              Products,
+                              Customers,
+                              Followers,
+                              Theme,
+                              Category,
+                              Categories)
+from tictail.resource.base import transform_attr_value
+
+from conftest import FakeApi
+
+
+def make_orders(count, start, step):
+    return [{
+        'id': "o{0:04d}".format(i),
+        'modified_at': (start + step * i).isoformat()
+    } for i in range(count)]
+
+
+class TestOrders(object):
+    start = datetime(2014, 1, 1)
+
+    @pytest.fixture
+    def api(self, monkeypatch, transport):
+        orders = make_orders(50, self.start, timedelta(hours=1))
+        collection = Orders(transport, parent='stores/1')
+        api = FakeApi(orders)
+        monkeypatch.setattr(collection, 'request', api)
+        return collection, api
+
+    def test_split_window(self, transport):
+        collection = Orders(transport)
+        end = self.start + timedelta(hours=4)
+        windows = collection._split_window(self.start, end, 4)
+        assert len(windows) == 4
+        assert windows[0][0] == self.start
+        assert windows[-1][1] == end
+        for (_, prev_end), (next_start, _) in zip(windows, windows[1:]):
+            assert prev_end == next_start
+
+        # Ranges too short to be split are returned as a single window.
+        end = self.start + timedelta(microseconds=1)
+        assert collection._split_window(self.start, end, 4) == [(self.start, end)]
+
+    @pytest.mark.parametrize('partitions,workers,adaptive', [
+        (1, 1, False),
+        (3, 2, False),
+        (7, 4, False),
+        (2, 2, True)
+    ])
+    def test_fetch_range(self, api, partitions, workers, adaptive):
+        collection, fake = api
+        orders = collection.fetch_range(
+            self.start,
+            self.start + timedelta(hours=40),
+            partitions=partitions,
+            workers=workers,
+            limit=5,
+            adaptive=adaptive
+        )
+        assert all(isinstance(o, Order) for o in orders)
+        assert [o.id for o in orders] == ["o{0:04d}".format(i) for i in range(40)]
+
+    def test_fetch_range_boundaries(self, api):
+        collection, _ = api
+        # Orders modified exactly on a window boundary are fetched once, and
+        # `end` is exclusive.
+        orders = collection.fetch_range(self.start + timedelta(hours=2),
+                                        self.start + timedelta(hours=6),
+                                        partitions=4)
+        assert [o.id for o in orders] == ['o0002', 'o0003', 'o0004', 'o0005']
+
+    def test_fetch_range_adaptive_splits_dense_windows(self, api):
+        collection, fake = api
+        orders = collection.fetch_range(self.start,
+                                        self.start + timedelta(hours=50),
+                                        partitions=1,
+                                        limit=10,
+                                        adaptive=True)
+        assert len(orders) == 50
+        # The single window was split, so several windows were queried.
+        windows = set(params['modified_after'] for params in fake.calls)
+        assert len(windows) > 1
+
+    def test_fetch_range_with_strings(self, api):
+        collection, _ = api
+        orders = collection.fetch_range('2014-01-01T00:00:00',
+                                        '2014-01-01T03:00:00')
+        assert [o.id for o in orders] == ['o0000', 'o0001', 'o0002']
+
+    def test_fetch_range_empty(self, api):
+        collection, fake = api
+        assert collection.fetch_range(self.start, self.start) == []
+        assert fake.calls == []
+
+    def test_fetch_range_dedupes(self, monkeypatch, transport):
+        collection = Orders(transport)
+        stale = {'id': 'a', 'modified_at': '2014-01-01T01:00:00'}
+        fresh = {'id': 'a', 'modified_at': '2014-01-01T02:00:00'}
+
+        def request(method, uri, params=None):
+            if params['modified_before'] < '2014-01-01T02':
+                return [stale], 200
+            return [fresh], 200
+
+        monkeypatch.setattr(collection, 'request', request)
+        orders = collection.fetch_range(self.start,
+                                        self.start + timedelta(hours=4),
+                                        partitions=2)
+        assert len(orders) == 1
+        assert orders[0].modified_at == datetime(2014, 1, 1, 2)
+
+    def test_fetch_range_raises(self, monkeypatch, transport):
+        collection = Orders(transport)
+        monkeypatch.setattr(collection, 'request', MagicMock(side_effect=KeyError))
+        with pytest.raises(KeyError):
+            collection.fetch_range(self.start, self.start + timedelta(hours=1))
+
+    def test_fetch_range_stops_on_error(self, monkeypatch, transport):
+        collection = Orders(transport)
+        started = threading.Event()
+
+        def request(method, uri, params=None):
+            if started.is_set():
+                return [], 200
+            started.set()
+            raise KeyError
+
+        mock = MagicMock(side_effect=request)
+        monkeypatch.setattr(collection, 'request', mock)
+        with pytest.raises(KeyError):
+            collection.fetch_range(self.start,
+                                   self.start + timedelta(hours=40),
+                                   partitions=40, workers=1)
+        # The remaining windows are not fetched, even later on.
+        time.sleep(0.3)
+        assert mock.call_count < 40
+
+
+    def test_fetch_range_never_modified(self, monkeypatch, transport):
+        collection = Orders(transport)
+        data = [
+            {'id': 'b', 'modified_at': '2014-01-01T01:00:00'},
+            {'id': 'a', 'modified_at': None}
+        ]
+        monkeypatch.setattr(collection, 'request', MagicMock(return_value=(data, 200)))
+        orders = collection.fetch_range(self.start,
+                                        self.start + timedelta(hours=4),
+                                        partitions=2)
+        assert [o.id for o in orders] == ['a', 'b']
+
+
+class TestProducts(object):
+
+    @pytest.fixture
+    def api(self, monkeypatch, transport):
+        products = [{
+            'id': "p{0:02d}".format(i),
+            'categories': [{'id': c} for c in ('a', 'b', 'c')[:i % 3 + 1]]
+        } for i in range(30)]
+        calls = []
+
+        def request(method, uri, params=None):
+            calls.append(params)
+            category = params['categories']
+            rv = [p for p in products
+                  if category in [c['id'] for c in p['categories']]]
+            if 'after' in params:
+                rv = [p for p in rv if p['id'] > params['after']]
+            return rv[:params['limit']], 200
+
+        collection = Products(transport, parent='stores/1')
+        monkeypatch.setattr(collection, 'request', request)
+        return collection, calls
+
+    def test_by_category(self, api):
+        collection, calls = api
+        rv = dict(collection.by_category(['a', 'b', 'c', 'b'], workers=2,
+                                         limit=4))
+        assert sorted(rv) == ['a', 'b', 'c']
+        assert len(rv['a']) == 30
+        assert len(rv['b']) == 20
+        assert [p.id for p in rv['c']] == ["p{0:02d}".format(i)
+                                           for i in range(2, 30, 3)]
+        # Every category is paginated on its own.
+        assert set(c['categories'] for c in calls) == set(['a', 'b', 'c'])
+
+    def test_in_categories(self, api, transport):
+        collection, _ = api
+        category = Category(transport, data={'id': 'c'})
+        products = list(collection.in_categories(['b', category], limit=7,
+                                                 raw=True))
+        assert sorted(p['id'] for p in products) == \
+            ["p{0:02d}".format(i) for i in range(30) if i % 3]
+
+    def test_by_category_raises(self, monkeypatch, transport):
+        collection = Products(transport)
+        monkeypatch.setattr(collection, 'request',
+                            MagicMock(side_effect=KeyError))
+        with pytest.raises(KeyError):
+            list(collection.in_categories(['a', 'b']))
+
+
+def timestamps(**data):
+    data.update(created_at='2014-01-01T00:00:00',
+                modified_at='2014-01-02T00:00:00')
+    return data
+
+
+PRODUCT = timestamps(
+    id='Fq', title='Shirt', price=100, currency='SEK',
+    images=[timestamps(id='i1', url='http://example.com/shirt.png',
+                       sizes={'30': 'http://example.com/shirt-30.png'})],
+    variations=[timestamps(id='v1', title='Large', quantity=3, price=120)],
+    categories=[timestamps(id='c1', title='Shirts', parent_id=None,
+                           position=0)]
+)
+
+# Payloads with timestamps at every level the API returns them.
+PAYLOADS = [
+    (Follower, timestamps(id='f1', email='follower@example.com')),
+    (Product, PRODUCT),
+    (Card, timestamps(id='k1', title='Hello', card_type='text',
+                      content={'text': 'Hi'})),
+    (Customer, timestamps(id='u1', name='Customer', country='SE')),
+    (Order, timestamps(
+        id='aFQX', price=100, vat={'price': 20, 'rate': '0.250000'},
+        customer=timestamps(id='u1', email='customer@example.com'),
+        transaction=timestamps(status='paid', processor='paypal'),
+        fullfilment=timestamps(status='unhandled',
+                               receiver={'name': 'Customer'}),
+        discounts=[timestamps(id='d1', title='Summer')],
+        items=[timestamps(quantity=1, price=100, currency='SEK',
+                          product=PRODUCT)]
+    )),
+    (Theme, timestamps(id='t1', markup='<html></html>')),
+    (Category, timestamps(id='c1', title='Shirts', parent_id=None)),
+    (Store, timestamps(
+        id='KGu', name='Store',
+        logotype=[timestamps(id='l1', url='http://example.com/logo.png')]
+    ))
+]
+
+
+class TestTransformPaths(object):
+
+    @pytest.mark.parametrize('cls,data', PAYLOADS)
+    def test_plans_match_generic_transform(self, cls, data):
+        expected = dict((k, transform_attr_value(k, v))
+                        for k, v in data.iteritems())
+        assert cls.get_transform_plan().apply(data) == expected
+
+    def test_order(self, transport):
+        data = {
+            'id': 'aFQX',
+            'created_at': '2014-01-01T00:00:00',
+            'customer': {'created_at': '2014-01-01T00:00:00'},
+            'items': [{
+                'price': 100,
+                'product': {
+                    'title': 'Shirt',
+                    'modified_at': '2014-01-01T00:00:00',
+                    'images': [{'created_at': '2014-01-01T00:00:00'}]
+                }
+            }],
+            'vat': {'price': 0, 'rate': '0.250000'}
+        }
+        order = Order(transport, data=data)
+        assert order.created_at == datetime(2014, 1, 1)
+        assert order.customer['created_at'] == datetime(2014, 1, 1)
+        product = order.items[0]['product']
+        assert product['modified_at'] == datetime(2014, 1, 1)
+        assert product['images'][0]['created_at'] == datetime(2014, 1, 1)
+        assert order.vat is data['vat']
+
+
+class TestStore(object):
+
+    @pytest.mark.parametrize('name,cls,uri', [
+        ('cards', Cards, '/stores/KGu/cards'),
+        ('products', Products, '/stores/KGu/products'),
+        ('customers', Customers, '/stores/KGu/customers'),
+        ('followers', Followers, '/stores/KGu/followers'),
+        ('orders', Orders, '/stores/KGu/orders'),
+        ('theme', Theme, '/stores/KGu/theme'),
+        ('categories', Categories, '/stores/KGu/categories')
+    ])
+    def test_subresources(self, transport, name, cls, uri):
+        store = Store(transport, data={'id': 'KGu'})
+        assert name not in store.__dict__
+        subresource = getattr(store, name)
+        assert isinstance(subresource, cls)
+        assert subresource.uri == uri
+        assert getattr(store, name) is subresource
+
+        me = Me(transport).instantiate_from_data({'id': 'KGu'})
+        assert getattr(me, name).uri == uri
+
+    def test_construction_without_id(self, transport):
+        # Subresources need the uri of the store, but only once accessed.
+        store = Store(transport)
+        with pytest.raises(ValueError):
+            store.products
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+from mock import MagicMock
+
+from tictail.diff import (HashIndex, SnapshotDiff, content_hash, diff,
+                          diff_collection)
+from tictail.resource import Product, Products
+
+from conftest import ids
+
+
+OLD = [
+    {'id': 'p1', 'title': u'Tröja', 'price': 100},
+    {'id': 'p2', 'title': 'Scarf', 'price': 50},
+    {'id': 'p3', 'title': 'Jeans', 'price': 900}
+]
+
+NEW = [
+    {'id': 'p1', 'title': u'Tröja', 'price': 100},
+    {'id': 'p2', 'title': 'Scarf', 'price': 75},
+    {'id': 'p4', 'title': 'Socks', 'price': 10}
+]
+
+
+class TestContentHash(object):
+
+    def test_key_order(self):
+        assert content_hash({'a': 1, 'b': [1, 2]}) == \
+            content_hash({'b': [1, 2], 'a': 1})
+        assert content_hash({'a': 1}) != content_hash({'a': 2})
+        assert len(content_hash({'a': 1})) == 16
+
+    def test_resources(self, transport):
+        data = {'id': 'p1', 'created_at': '2014-01-01T00:00:00'}
+        product = Product(transport, data=data)
+        assert content_hash(product) == content_hash(
+            {'id': 'p1', 'created_at': datetime(2014, 1, 1)})
+
+
+class TestDiff(object):
+
+    def test_diff(self):
+        changes = diff(OLD, NEW)
+        assert isinstance(changes, SnapshotDiff)
+        assert changes
+        assert ids(changes.created) == ['p4']
+        assert ids(changes.modified) == ['p2']
+        assert changes.deleted == ['p3']
+        assert sorted(changes.index) == ['p1', 'p2', 'p4']
+
+    def test_no_changes(self):
+        assert not diff(OLD, iter(OLD))
+
+    def test_diff_against_index(self):
+        changes = diff(HashIndex.build(OLD), NEW)
+        assert ids(changes.modified) == ['p2']
+
+    def test_index_persistence(self, tmpdir):
+        path = str(tmpdir.join('index.json'))
+        assert HashIndex.load(path) == {}
+        index = HashIndex.build(OLD)
+        index.save(path)
+        assert HashIndex.load(path) == index
+
+    def test_diff_collection(self, monkeypatch, tmpdir, transport):
+        path = str(tmpdir.join('products.json'))
+        products = Products(transport, parent='stores/KGu')
+        mock = MagicMock(return_value=(OLD, 200))
+        monkeypatch.setattr(products, 'request', mock)
+
+        changes = diff_collection(products, path)
+        assert [p.id for p in changes.created] == ['p1', 'p2', 'p3']
+
+        mock.return_value = (NEW, 200)
+        changes = diff_collection(products, path)
+        assert [p.id for p in changes.created] == ['p4']
+        assert [p.id for p in changes.modified] == ['p2']
+        assert changes.deleted == ['p3']
+
+        assert not diff_collection(products, path)
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import csv
+from contextlib import closing
+import gzip
+
+import pytest
+from mock import MagicMock
+
+from tictail.export import export_collection, export_store
+from tictail.resource.base import (parse_decimal, register_transform,
+                                   unregister_transform)
+from tictail.resource import Products, Store
+from tictail.sync import FileCheckpointStore
+
+from conftest import FakeApi
+
+
+PRODUCTS = [{
+    'id': "p{0:02d}".format(i),
+    'title': u'Tröja {0}'.format(i),
+    'price': i * 100,
+    'created_at': '2014-01-29T13:41:43',
+    'store': {'id': 'KGu'}
+} for i in range(25)]
+
+
+@pytest.fixture
+def products(monkeypatch, transport):
+    collection = Products(transport, parent='stores/KGu')
+    monkeypatch.setattr(collection, 'request', FakeApi(PRODUCTS))
+    return collection
+
+
+def read_lines(path, compress=False):
+    # `GzipFile` is no context manager on Python 2.6.
+    opener = gzip.open if compress else open
+    with closing(opener(path, 'rb')) as fd:
+        return fd.read().decode('utf-8').splitlines()
+
+
+class TestExport(object):
+
+    @pytest.mark.parametrize('compress', [False, True])
+    def test_ndjson(self, tmpdir, products, compress):
+        path = str(tmpdir.join('products.ndjson'))
+        count = export_collection(products, path, compress=compress, limit=10)
+        assert count == 25
+
+        lines = read_lines(path, compress)
+        assert len(lines) == 25
+        assert lines[1] == (u'{"created_at": "2014-01-29T13:41:43", "id": "p01", '
+                            u'"price": 100, "store": {"id": "KGu"}, '
+                            u'"title": "Tr\\u00f6ja 1"}')
+
+    def test_ndjson_decimals(self, tmpdir, products):
+        register_transform('price', parse_decimal)
+        try:
+            path = str(tmpdir.join('products.ndjson'))
+            export_collection(products, path, columns=['id', 'price'])
+        finally:
+            unregister_transform('price')
+        assert read_lines(path)[1] == '{"id": "p01", "price": 100}'
+
+    def test_ndjson_columns(self, tmpdir, products):
+        path = str(tmpdir.join('products.ndjson'))
+        export_collection(products, path, columns=['id', 'store.id'])
+        assert read_lines(path)[0] == '{"id": "p00", "store.id": "KGu"}'
+
+    def test_csv(self, tmpdir, products):
+        path = str(tmpdir.join('products.csv'))
+        export_collection(products, path, format='csv', limit=7)
+        with open(path, 'rb') as fd:
+            rows = list(csv.reader(fd))
+        assert len(rows) == 26
+        assert rows[0] == ['created_at', 'id', 'price', 'store', 'title']
+        assert rows[2] == ['2014-01-29T13:41:43', 'p01', '100',
+                           '{"id": "KGu"}', u'Tröja 1'.encode('utf-8')]
+
+    def test_csv_columns(self, tmpdir, products):
+        path = str(tmpdir.join('products.csv'))
+        export_collection(products, path, format='csv',
+                          columns=['id', 'store.id', 'missing'])
+        assert read_lines(path)[:2] == ['id,store.id,missing', 'p00,KGu,']
+
+    def test_unknown_format(self, tmpdir, products):
+        with pytest.raises(ValueError):
+            export_collection(products, str(tmpdir.join('out')), format='xml')
+
+    @pytest.mark.parametrize('format,compress', [
+        ('ndjson', False),
+        ('ndjson', True),
+        ('csv', False),
+        ('csv', True)
+    ])
+    def test_resume(self, monkeypatch, tmpdir, products, format, compress):
+        path = str(tmpdir.join('products'))
+        checkpoints = FileCheckpointStore(str(tmpdir.join('checkpoints.json')))
+
+        # Fail on the third page, after 2 checkpoints of 4 resources each.
+        api = FakeApi(PRODUCTS, fail_after=2)
+        monkeypatch.setattr(products, 'request', api)
+        with pytest.raises(IOError):
+            export_collection(products, path, format=format, compress=compress,
+                              checkpoints=checkpoints, checkpoint_every=4,
+                              limit=5)
+
+        monkeypatch.setattr(products, 'request', FakeApi(PRODUCTS))
+        count = export_collection(products, path, format=format,
+                                  compress=compress, checkpoints=checkpoints,
+                                  checkpoint_every=4, limit=5)
+        assert count == 25
+
+        lines = read_lines(path, compress)
+        if format == 'csv':
+            assert lines[0].startswith('created_at,id')
+            lines = lines[1:]
+        assert len(lines) == 25
+        assert all("p{0:02d}".format(i) in line for i, line in enumerate(lines))
+
+        # A finished export clears its checkpoint.
+        assert checkpoints.load("/stores/KGu/products:{0}".format(path)) is None
+
+    def test_export_store(self, monkeypatch, tmpdir, transport):
+        store = Store(transport, data={'id': 'KGu'})
+        monkeypatch.setattr(store.products, 'request', FakeApi(PRODUCTS))
+        monkeypatch.setattr(store.followers, 'request',
+                            MagicMock(return_value=([], 200)))
+
+        directory = tmpdir.join('export')
+        counts = export_store(store, str(directory),
+                              collections=['products', 'followers'],
+                              compress=True)
+        assert counts == {'products': 25, 'followers': 0}
+        assert len(read_lines(str(directory.join('products.ndjson.gz')), True)) == 25
+        assert directory.join('followers.ndjson.gz').check()
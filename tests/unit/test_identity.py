@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+import gc
+
+import pytest
+from mock import MagicMock
+
+from tictail import Tictail
+from tictail.resource import Order, Product
+from tictail.resource.identity import IdentityMap
+
+
+@pytest.fixture
+def mapped_client(test_token):
+    return Tictail(test_token, {'identity_map': True})
+
+
+class TestIdentityMap(object):
+
+    def test_disabled_by_default(self, client):
+        assert client.identity_map is None
+
+    def test_enabled(self, mapped_client):
+        assert isinstance(mapped_client.identity_map, IdentityMap)
+        assert mapped_client.transport.identity_map is mapped_client.identity_map
+
+    def test_same_instance_per_uri(self, monkeypatch, mapped_client):
+        products = mapped_client.products(store=1)
+        page = [{'id': 'a', 'title': 'Hat'}, {'id': 'b', 'title': 'Scarf'}]
+        monkeypatch.setattr(products, 'request',
+                            MagicMock(return_value=(page, 200)))
+
+        first = products.all()
+        second = products.all()
+        assert first[0] is second[0]
+        assert first[1] is second[1]
+        assert len(mapped_client.identity_map) == 2
+
+        monkeypatch.setattr(products, 'request',
+                            MagicMock(return_value=(page[0], 200)))
+        assert products.get('a') is first[0]
+
+    def test_me(self, monkeypatch, mapped_client):
+        from tictail.resource import Me
+        rv = ({'id': 'KGu', 'name': 'Store'}, 200)
+        monkeypatch.setattr(Me, 'request', MagicMock(return_value=rv))
+        store = mapped_client.me()
+        assert mapped_client.me() is store
+        assert store.uri == '/stores/KGu'
+
+    def test_different_classes_and_parents(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        product = Product(transport, data={'id': 'a'}, parent='stores/1')
+        other_store = Product(transport, data={'id': 'a'}, parent='stores/2')
+        order = Order(transport, data={'id': 'a'}, parent='stores/1')
+        assert identity_map.add(product) is product
+        assert identity_map.add(other_store) is other_store
+        assert identity_map.add(order) is order
+        assert identity_map.get(Product, '/stores/1/products/a') is product
+
+    def test_merges_newer_data(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        old = Product(transport, parent='stores/1', data={
+            'id': 'a', 'title': 'Hat', 'modified_at': '2014-01-01T00:00:00'})
+        new = Product(transport, parent='stores/1', data={
+            'id': 'a', 'title': 'Cap', 'modified_at': '2014-01-02T00:00:00'})
+
+        identity_map.add(old)
+        assert identity_map.add(new) is old
+        assert old.title == 'Cap'
+        assert old.modified_at == datetime(2014, 1, 2)
+
+    def test_keeps_more_recent_data(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        current = Product(transport, parent='stores/1', data={
+            'id': 'a', 'title': 'Cap', 'modified_at': '2014-01-02T00:00:00'})
+        stale = Product(transport, parent='stores/1', data={
+            'id': 'a', 'title': 'Hat', 'modified_at': '2014-01-01T00:00:00'})
+
+        identity_map.add(current)
+        assert identity_map.add(stale) is current
+        assert current.title == 'Cap'
+
+    def test_keeps_unsaved_changes(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        current = Product(transport, data={'id': 'a', 'title': 'Hat',
+                                           'price': 100})
+        identity_map.add(current)
+        current.title = 'Cap'
+
+        identity_map.add(Product(transport, data={'id': 'a', 'title': 'Hat',
+                                                  'price': 200}))
+        assert current.title == 'Cap'
+        assert current.price == 200
+        assert current.changes() == {'title': 'Cap'}
+
+    def test_partial_data_is_merged(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        full = Product(transport, data={'id': 'a', 'title': 'Hat',
+                                        'price': 100})
+        identity_map.add(full)
+
+        partial = Product(transport, data={'id': 'a', 'price': 200})
+        assert identity_map.add(partial) is full
+        assert full.to_dict() == {'id': 'a', 'title': 'Hat', 'price': 200}
+
+    def test_resources_without_pk_are_not_mapped(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        product = Product(mapped_client.transport, data={'title': 'Hat'})
+        assert identity_map.add(product) is product
+        assert len(identity_map) == 0
+
+    def test_weak_references(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        product = Product(mapped_client.transport, data={'id': 'a'})
+        identity_map.add(product)
+        assert len(identity_map) == 1
+
+        del product
+        gc.collect()
+        assert len(identity_map) == 0
+
+    def test_discard_and_clear(self, mapped_client):
+        identity_map = mapped_client.identity_map
+        transport = mapped_client.transport
+        a = Product(transport, data={'id': 'a'})
+        b = Product(transport, data={'id': 'b'})
+        identity_map.add(a)
+        identity_map.add(b)
+
+        identity_map.discard(a)
+        assert len(identity_map) == 1
+        identity_map.clear()
+        assert len(identity_map) == 0
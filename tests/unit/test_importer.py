@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tictail.importer import LazyModule, lazy_import, import_optional
+
+
+ROOT = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+class TestImporter(object):
+
+    def test_lazy_module(self):
+        module = LazyModule('json')
+        assert module.__dict__['_module'] is None
+        assert module.dumps([1]) == '[1]'
+        assert module.__dict__['_module'] is not None
+
+    def test_lazy_module_missing(self):
+        module = LazyModule('tictail_missing_module', 'tictail-missing')
+        with pytest.raises(ImportError) as excinfo:
+            module.foo
+        assert 'pip install tictail-missing' in str(excinfo.value)
+
+    def test_lazy_import_loaded_module(self):
+        assert lazy_import('os') is os
+
+    def test_import_optional(self):
+        assert import_optional('os') is os
+        assert import_optional('tictail_missing_module') is None
+
+    def test_import_is_lazy(self):
+        # Heavy dependencies are only imported on first use.
+        script = ("import sys, tictail; "
+                  "print(sorted(m for m in sys.modules "
+                  "if m.split('.')[0] in ('requests', 'dateutil')))")
+        process = subprocess.Popen([sys.executable, '-c', script],
+                                   cwd=os.path.abspath(ROOT),
+                                   stdout=subprocess.PIPE)
+        out, _ = process.communicate()
+        assert out.strip() == b'[]'
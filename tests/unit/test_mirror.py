@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+
+from tictail.mirror import StoreMirror
+from tictail.resource import Order, Product, Store
+
+from conftest import FakeApi
+
+
+PRODUCTS = [
+    {'id': 'p1', 'title': 'Hat', 'status': 'published',
+     'categories': [{'id': 'aVr'}], 'created_at': '2014-01-01T00:00:00',
+     'modified_at': '2014-01-05T00:00:00'},
+    {'id': 'p2', 'title': 'Scarf', 'status': 'unpublished',
+     'categories': [{'id': 'aVr'}, {'id': 'bEt2'}],
+     'created_at': '2014-01-02T00:00:00', 'modified_at': None},
+    {'id': 'p3', 'title': 'Jeans', 'status': 'published',
+     'categories': [{'id': 'bEt2'}], 'created_at': '2014-01-03T00:00:00',
+     'modified_at': '2014-01-04T00:00:00'}
+]
+
+ORDERS = [
+    {'id': 'o1', 'transaction': {'status': 'paid'},
+     'created_at': '2014-01-01T00:00:00', 'modified_at': '2014-01-01T10:00:00'},
+    {'id': 'o2', 'transaction': {'status': 'pending'},
+     'created_at': '2014-01-02T00:00:00', 'modified_at': '2014-01-02T10:00:00'}
+]
+
+
+@pytest.fixture
+def store(monkeypatch, transport):
+    store = Store(transport, data={'id': 'KGu'})
+    monkeypatch.setattr(store.products, 'request', FakeApi(PRODUCTS))
+    monkeypatch.setattr(store.orders, 'request', FakeApi(list(ORDERS)))
+    return store
+
+
+@pytest.fixture
+def mirror(store):
+    mirror = StoreMirror(store, ':memory:', collections=['products', 'orders'],
+                         limit=2)
+    mirror.load()
+    return mirror
+
+
+class TestStoreMirror(object):
+
+    def test_invalid_collection(self, store):
+        with pytest.raises(ValueError):
+            StoreMirror(store, ':memory:', collections=['cards'])
+
+    def test_load(self, mirror, store):
+        assert mirror.count('products') == 3
+        assert mirror.count('orders') == 2
+        assert mirror.state('orders')[1] == '2014-01-02T10:00:00'
+
+        # Loading again replaces the data.
+        store.products.request.items = PRODUCTS[:1]
+        assert mirror.load(['products']) == {'products': 1}
+        assert mirror.count('products') == 1
+
+    def test_get(self, mirror):
+        product = mirror.get('products', 'p1')
+        assert isinstance(product, Product)
+        assert product.title == 'Hat'
+        assert product.created_at == datetime(2014, 1, 1)
+        assert product.uri == '/stores/KGu/products/p1'
+        assert mirror.get('products', 'missing') is None
+
+    def test_query(self, mirror):
+        ids = lambda rv: [r.id for r in rv]
+        assert ids(mirror.query('products', status='published')) == ['p1', 'p3']
+        assert ids(mirror.query('products', category='aVr')) == ['p1', 'p2']
+        assert ids(mirror.query('products', category='bEt2',
+                                status='published')) == ['p3']
+        assert ids(mirror.query('products',
+                                created_after=datetime(2014, 1, 1),
+                                order_by='modified_at',
+                                descending=True)) == ['p3', 'p2']
+        assert ids(mirror.query('products', limit=1)) == ['p1']
+        assert ids(mirror.query('orders', status='paid')) == ['o1']
+
+        orders = mirror.query('orders', modified_before='2014-01-02T00:00:00')
+        assert isinstance(orders[0], Order)
+        assert ids(orders) == ['o1']
+
+    def test_query_invalid_order(self, mirror):
+        with pytest.raises(ValueError):
+            mirror.query('products', order_by='data')
+
+    def test_refresh(self, mirror, store):
+        api = store.orders.request
+        api.items.append({
+            'id': 'o3', 'transaction': {'status': 'paid'},
+            'created_at': '2014-01-03T00:00:00',
+            'modified_at': '2014-01-03T10:00:00'
+        })
+        api.items[0] = dict(api.items[0], transaction={'status': 'refunded'},
+                            modified_at='2014-01-04T00:00:00')
+
+        # The last mirrored order is fetched again because of the lookback.
+        counts = mirror.refresh(['orders'])
+        assert counts == {'orders': 3}
+        assert api.calls[-1]['modified_after'] == '2014-01-02T09:59:59'
+        assert mirror.count('orders') == 3
+        assert mirror.get('orders', 'o1').transaction['status'] == 'refunded'
+        assert mirror.state('orders')[1] == '2014-01-04T00:00:00'
+
+    def test_refresh_full_load(self, mirror, store):
+        store.products.request.items = PRODUCTS[1:]
+        assert mirror.refresh(['products']) == {'products': 2}
+        assert mirror.get('products', 'p1') is None
+        assert [r.id for r in mirror.query('products', category='aVr')] == ['p2']
+
+    def test_persistent(self, tmpdir, store):
+        path = str(tmpdir.join('mirror.db'))
+        StoreMirror(store, path, collections=['products']).load()
+        mirror = StoreMirror(store, path, collections=['products'])
+        assert mirror.count('products') == 3
+        mirror.close()
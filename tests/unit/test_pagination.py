@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import pytest
+from mock import MagicMock
+
+from tictail.errors import ApiTimeout, ServerError, BadRequest
+from tictail.pagination import PageSizeController
+from tictail.resource.base import Collection, List, Resource
+
+from conftest import FakeClock
+
+
+class MockResource(Resource):
+    endpoint = 'mocks'
+
+
+class MockCollection(Collection, List):
+    resource = MockResource
+
+
+def timed(clock, cost):
+    """Returns a `fetch_page` function whose pages take `cost(limit)` seconds."""
+    def fetch_page(limit):
+        clock.now += cost(limit)
+        return [None] * limit
+    return fetch_page
+
+
+class TestPageSizeController(object):
+
+    def test_bounds(self):
+        assert PageSizeController(1000, max_limit=200).limit == 200
+        assert PageSizeController(1, min_limit=5).limit == 5
+        with pytest.raises(ValueError):
+            PageSizeController(10, min_limit=20, max_limit=10)
+
+    def test_grows_while_linear(self):
+        clock = FakeClock()
+        controller = PageSizeController(10, max_limit=160, clock=clock)
+        fetch_page = timed(clock, lambda limit: limit * 0.01)
+        limits = [controller.fetch(fetch_page)[1] for _ in range(6)]
+        assert limits == [10, 20, 40, 80, 160, 160]
+
+    def test_stops_growing_when_superlinear(self):
+        clock = FakeClock()
+        controller = PageSizeController(10, clock=clock)
+        # Pages above 40 resources get disproportionately slower.
+        fetch_page = timed(clock, lambda limit: limit * (0.01 if limit <= 40 else 0.1))
+        limits = [controller.fetch(fetch_page)[1] for _ in range(6)]
+        assert limits == [10, 20, 40, 80, 40, 40]
+
+    def test_shrinks_when_slow(self):
+        clock = FakeClock()
+        controller = PageSizeController(100, max_latency=1.0, clock=clock)
+        fetch_page = timed(clock, lambda limit: limit * 0.02)
+        limits = [controller.fetch(fetch_page)[1] for _ in range(3)]
+        assert limits == [100, 50, 50]
+
+    def test_partial_pages_do_not_grow(self):
+        clock = FakeClock()
+        controller = PageSizeController(10, clock=clock)
+        page, limit = controller.fetch(lambda limit: [None] * 3)
+        assert limit == 10
+        assert controller.limit == 10
+
+    def test_retries_with_smaller_pages(self):
+        responses = [ApiTimeout('timeout'),
+                     ServerError('error', 503, ''),
+                     [None] * 5]
+        fetch_page = MagicMock(side_effect=responses)
+        controller = PageSizeController(20, min_limit=1)
+
+        page, limit = controller.fetch(fetch_page)
+        assert limit == 5
+        assert [c[0][0] for c in fetch_page.call_args_list] == [20, 10, 5]
+        assert controller.errors == 2
+        assert controller.error_rate == 2.0 / 3
+
+    def test_gives_up(self):
+        fetch_page = MagicMock(side_effect=ApiTimeout('timeout'))
+        controller = PageSizeController(20, max_retries=2)
+        with pytest.raises(ApiTimeout):
+            controller.fetch(fetch_page)
+        assert fetch_page.call_count == 3
+
+    def test_client_errors_are_not_retried(self):
+        fetch_page = MagicMock(side_effect=BadRequest('bad', 400, ''))
+        controller = PageSizeController(20)
+        with pytest.raises(BadRequest):
+            controller.fetch(fetch_page)
+        assert fetch_page.call_count == 1
+        assert controller.limit == 20
+
+    def test_short_page_caps_limit(self):
+        controller = PageSizeController(100, min_limit=10, max_limit=500)
+        controller.record_success(100, 60, 0.1)
+        assert controller.limit == 60
+        assert controller.api_limit is None
+
+        # Another page follows, so the API caps pages at 60.
+        controller.record_success(60, 60, 0.1)
+        assert controller.api_limit == 60
+        assert controller.limit == 60
+        assert controller.max_limit == 500
+
+    def test_last_page_does_not_cap_limit(self):
+        controller = PageSizeController(100, min_limit=10, max_limit=500)
+        controller.record_success(100, 60, 0.1)
+        controller.record_success(60, 0, 0.1)
+        assert controller.api_limit is None
+        controller.record_success(60, 60, 0.1)
+        assert controller.limit == 120
+
+    def test_recovers(self):
+        clock = FakeClock()
+        controller = PageSizeController(40, recovery=3, clock=clock)
+        controller.record_failure(40)
+        assert controller.ceiling == 20
+        fetch_page = timed(clock, lambda limit: limit * 0.01)
+        limits = [controller.fetch(fetch_page)[1] for _ in range(5)]
+        assert limits == [20, 20, 20, 40, 80]
+
+
+class TestAdaptiveIterate(object):
+
+    def test_iterate(self, monkeypatch, transport):
+        collection = MockCollection(transport)
+        data = [{'id': i} for i in range(100)]
+
+        def request(method, uri, params=None):
+            rv = [d for d in data if d['id'] > params.get('after', -1)]
+            return rv[:params['limit']], 200
+
+        mock = MagicMock(side_effect=request)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        controller = PageSizeController(10, max_limit=40)
+        resources = list(collection.iterate(limit=10, adaptive=controller))
+        assert [r.id for r in resources] == range(100)
+        limits = [c[1]['params']['limit'] for c in mock.call_args_list]
+        assert limits[0] == 10
+        assert max(limits) == 40
+
+    def test_iterate_retries(self, monkeypatch, transport):
+        collection = MockCollection(transport)
+        responses = [ApiTimeout('timeout'), ([{'id': 1}], 200), ([], 200)]
+        mock = MagicMock(side_effect=responses)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resources = list(collection.iterate(limit=100, adaptive=True))
+        assert [r.id for r in resources] == [1]
+        assert mock.call_args_list[1][1]['params'] == {'limit': 50}
+
+    def test_reused_controller(self, monkeypatch, transport):
+        collection = MockCollection(transport)
+        data = [{'id': i} for i in range(1003)]
+
+        def request(method, uri, params=None):
+            rv = [d for d in data if d['id'] > params.get('after', -1)]
+            return rv[:params['limit']], 200
+
+        monkeypatch.setattr(collection, 'request',
+                            MagicMock(side_effect=request))
+
+        controller = PageSizeController(10, max_limit=500)
+        for _ in range(2):
+            resources = list(collection.iterate(limit=10, adaptive=controller))
+            assert len(resources) == 1003
+            # The short last page is no cap.
+            assert controller.api_limit is None
+            assert controller.max_limit == 500
+
+    def test_iterate_capped_by_api(self, monkeypatch, transport):
+        collection = MockCollection(transport)
+        data = [{'id': i} for i in range(200)]
+
+        def request(method, uri, params=None):
+            rv = [d for d in data if d['id'] > params.get('after', -1)]
+            # The API never returns more than 30 resources.
+            return rv[:min(params['limit'], 30)], 200
+
+        mock = MagicMock(side_effect=request)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resources = list(collection.iterate(limit=20, adaptive=True))
+        assert [r.id for r in resources] == range(200)
+        limits = [c[1]['params']['limit'] for c in mock.call_args_list]
+        assert limits[:3] == [20, 40, 30]
+        assert max(limits[2:]) == 30
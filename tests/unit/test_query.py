@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+from mock import MagicMock
+
+from tictail.query import Snapshot, Query, extract
+from tictail.resource import Product, Products
+
+from conftest import ids
+
+
+PRODUCTS = [
+    {'id': 'p1', 'title': 'Hat', 'price': 100, 'status': 'published',
+     'categories': [{'id': 'aVr'}], 'created_at': '2014-01-03T00:00:00'},
+    {'id': 'p2', 'title': 'Scarf', 'price': 50, 'status': 'published',
+     'categories': [{'id': 'aVr'}, {'id': 'bEt2'}],
+     'created_at': '2014-01-01T00:00:00'},
+    {'id': 'p3', 'title': 'Jeans', 'price': 900, 'status': 'unpublished',
+     'categories': [{'id': 'bEt2'}], 'created_at': '2014-01-02T00:00:00'},
+    {'id': 'p4', 'title': 'Socks', 'price': None, 'status': 'published',
+     'categories': [], 'created_at': '2014-01-04T00:00:00'}
+]
+
+
+@pytest.fixture
+def snapshot(monkeypatch, transport):
+    products = Products(transport, parent='stores/KGu')
+    monkeypatch.setattr(products, 'request',
+                        MagicMock(return_value=(PRODUCTS, 200)))
+    return products.snapshot()
+
+
+class TestExtract(object):
+
+    def test_extract(self):
+        item = PRODUCTS[1]
+        assert extract(item, 'title') == ['Scarf']
+        assert extract(item, 'categories.*.id') == ['aVr', 'bEt2']
+        assert extract(item, 'missing') == []
+        assert extract(item, 'title.missing') == []
+
+
+class TestSnapshot(object):
+
+    def test_snapshot(self, snapshot):
+        assert isinstance(snapshot, Snapshot)
+        assert len(snapshot) == 4
+        assert isinstance(list(snapshot)[0], Product)
+
+    def test_where(self, snapshot):
+        assert ids(snapshot.where(status='published')) == ['p1', 'p2', 'p4']
+        assert ids(snapshot.where(category='aVr')) == ['p1', 'p2']
+        assert ids(snapshot.where(category='aVr', price__lt=100)) == ['p2']
+        assert ids(snapshot.where(category__in=['bEt2', 'x'])) == ['p2', 'p3']
+        assert ids(snapshot.where(category='missing')) == []
+
+    def test_unknown_operator(self, snapshot):
+        with pytest.raises(ValueError) as excinfo:
+            snapshot.where(title__contains='Shirt')
+        assert 'contains' in str(excinfo.value)
+
+    @pytest.mark.parametrize('filters,expected', [
+        ({'price__lt': 100}, ['p2']),
+        ({'price__lte': 100}, ['p1', 'p2']),
+        ({'price__gt': 100}, ['p3']),
+        ({'price__gte': 100}, ['p1', 'p3']),
+        ({'price': None}, ['p4']),
+        ({'created_at__gte': datetime(2014, 1, 3)}, ['p1', 'p4'])
+    ])
+    def test_ranges(self, snapshot, filters, expected):
+        assert ids(snapshot.where(**filters)) == expected
+
+    def test_chained_where(self, snapshot):
+        query = snapshot.where(status='published')
+        assert isinstance(query, Query)
+        assert ids(query.where(price__gte=100)) == ['p1']
+        # Queries are immutable.
+        assert len(query) == 3
+
+    def test_order_by(self, snapshot):
+        assert ids(snapshot.order_by('created_at')) == ['p2', 'p3', 'p1', 'p4']
+        assert ids(snapshot.order_by('-created_at')) == ['p4', 'p1', 'p3', 'p2']
+        # Missing values come last either way.
+        assert ids(snapshot.order_by('price')) == ['p2', 'p1', 'p3', 'p4']
+        assert ids(snapshot.order_by('-price')) == ['p3', 'p1', 'p2', 'p4']
+        assert ids(snapshot.order_by('status', '-price')) == ['p1', 'p2', 'p4',
+                                                              'p3']
+        assert ids(snapshot.where(category='aVr').order_by('price')) == ['p2',
+                                                                          'p1']
+
+    def test_limit_first_count(self, snapshot):
+        query = snapshot.where(status='published').order_by('-created_at')
+        assert ids(query.limit(2)) == ['p4', 'p1']
+        assert query.first().id == 'p4'
+        assert snapshot.where(status='draft').first() is None
+        assert query.count() == 3
+
+    def test_indexes_are_reused(self, snapshot):
+        snapshot.where(status='published').all()
+        index = snapshot.hash_index('status')
+        snapshot.where(status='unpublished').all()
+        assert snapshot.hash_index('status') is index
+
+    def test_unhashable_values(self):
+        snapshot = Snapshot([{'a': {'b': 1}}, {'a': 1}])
+        assert len(snapshot.where(a=1)) == 1
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import copy
 from datetime import datetime
+from decimal import Decimal
+import pickle
 
 import pytest
 from mock import MagicMock
 
+from tictail import Tictail
+from tictail.errors import (ApiTimeout, BadRequest, NotFound, RateLimited,
+                            ServerError)
 from tictail.resource.base import (ApiObject,
                                    Resource,
                                    Collection,
@@ -11,9 +17,22 @@ from tictail.resource.base import (ApiObject,
                                    GetById,
                                    List,
                                    Create,
+                                   Update,
                                    Delete,
                                    DeleteById,
+                                   LazyDict,
+                                   DataView,
+                                   TransformPlan,
+                                   parse_datetime,
+                                   parse_decimal,
+                                   register_transform,
+                                   unregister_transform,
+                                   timestamp_paths,
+                                   to_json_value,
+                                   project,
+                                   save_many,
                                    transform_attr_value)
+from tictail.resource import base
 
 
 class MockResource(Resource):
@@ -24,6 +43,53 @@ class MockCollection(Collection):
     resource = MockResource
 
 
+class TestParseDatetime(object):
+
+    @pytest.mark.parametrize('input,expected', [
+        ('2012-05-01T00:47:16', datetime(2012, 5, 1, 0, 47, 16)),
+        ('2014-04-23T20:25:47.745085', datetime(2014, 4, 23, 20, 25, 47, 745085)),
+        ('2014-04-23T20:25:47.7', datetime(2014, 4, 23, 20, 25, 47, 700000)),
+        ('2014-04-23T20:25:47.000123', datetime(2014, 4, 23, 20, 25, 47, 123)),
+        ('2014-04-23 20:25:47', datetime(2014, 4, 23, 20, 25, 47)),
+        ('2014-04-23', datetime(2014, 4, 23)),
+    ])
+    def test_parse(self, input, expected):
+        base._datetime_cache.clear()
+        assert parse_datetime(input) == expected
+        assert parse_datetime(input) == expected
+
+    def test_fallback(self, monkeypatch):
+        base._datetime_cache.clear()
+        mock = MagicMock(return_value='parsed')
+        monkeypatch.setattr('tictail.resource.base.parse', mock)
+
+        assert parse_datetime('2012-05-01T00:47:16') == datetime(2012, 5, 1, 0, 47, 16)
+        assert not mock.called
+        assert parse_datetime('2012-05-01T00:47:16Z') == 'parsed'
+        mock.assert_called_with('2012-05-01T00:47:16Z')
+
+    def test_datetime(self):
+        value = datetime(2012, 5, 1, 0, 47, 16)
+        assert parse_datetime(value) is value
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            parse_datetime('2012-13-01T00:47:16')
+
+    def test_cache(self, monkeypatch):
+        base._datetime_cache.clear()
+        monkeypatch.setattr('tictail.resource.base.DATETIME_CACHE_SIZE', 2)
+
+        first = parse_datetime('2012-05-01T00:47:16')
+        assert parse_datetime('2012-05-01T00:47:16') is first
+        parse_datetime('2012-05-01T00:47:17')
+        assert len(base._datetime_cache) == 2
+
+        # The cache is bounded.
+        parse_datetime('2012-05-01T00:47:18')
+        assert len(base._datetime_cache) == 1
+
+
 class TestTransforms(object):
     def test_transform_attr_value_simple(self):
         assert transform_attr_value('foo', 'bar') == 'bar'
@@ -102,6 +168,258 @@ class TestTransforms(object):
         assert transform_attr_value('foo', list_of_nested_dicts) == transformed
 
 
+class TestTransformRegistry(object):
+
+    def test_register_transform(self):
+        assert transform_attr_value('price', 100) == 100
+        register_transform('price', parse_decimal)
+        try:
+            assert transform_attr_value('price', 100) == Decimal('100')
+            assert transform_attr_value('foo', {'price': '1.5'}) == {
+                'price': Decimal('1.5')
+            }
+        finally:
+            unregister_transform('price')
+        assert transform_attr_value('price', 100) == 100
+
+    def test_plans_are_recompiled(self, transport):
+        class PricedResource(MockResource):
+            transform_paths = ('price',)
+
+        plan = PricedResource.get_transform_plan()
+        assert PricedResource.get_transform_plan() is plan
+        assert PricedResource(transport, data={'price': 1}).price == 1
+
+        register_transform('price', parse_decimal)
+        try:
+            assert PricedResource.get_transform_plan() is not plan
+            instance = PricedResource(transport, data={'price': 1})
+            assert instance.price == Decimal('1')
+        finally:
+            unregister_transform('price')
+
+
+class TestTransformPlan(object):
+    paths = timestamp_paths('', 'customer', 'items.*', 'items.*.product') + (
+        'price', 'items.*.price'
+    )
+
+    def test_timestamp_paths(self):
+        assert timestamp_paths('', 'a.*') == (
+            'created_at', 'modified_at', 'a.*.created_at', 'a.*.modified_at'
+        )
+
+    def test_compile(self):
+        plan = TransformPlan(self.paths)
+        # Paths without a registered transform are dropped.
+        assert plan.tree == {
+            'created_at': parse_datetime,
+            'modified_at': parse_datetime,
+            'customer': {
+                'created_at': parse_datetime,
+                'modified_at': parse_datetime
+            },
+            'items': {'*': {
+                'created_at': parse_datetime,
+                'modified_at': parse_datetime,
+                'product': {
+                    'created_at': parse_datetime,
+                    'modified_at': parse_datetime
+                }
+            }}
+        }
+
+        with pytest.raises(ValueError):
+            TransformPlan(['created_at', 'created_at.foo.created_at'])
+
+    def test_apply(self):
+        untouched = {'created_at': '2012-05-01T00:47:16'}
+        customer = {'name': 'John', 'modified_at': None}
+        data = {
+            'id': 1,
+            'created_at': '2012-05-01T00:47:16',
+            'customer': customer,
+            'untouched': untouched,
+            'items': [
+                {'product': {'created_at': '2012-05-01T00:47:16'}},
+                {'price': 1}
+            ]
+        }
+        plan = TransformPlan(self.paths)
+        transformed = plan.apply(data)
+
+        assert transformed is not data
+        assert transformed['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert transformed['items'][0]['product']['created_at'] == \
+            datetime(2012, 5, 1, 0, 47, 16)
+
+        # Unchanged subtrees are shared, and paths outside of the plan are not
+        # transformed.
+        assert transformed['customer'] is customer
+        assert transformed['untouched'] is untouched
+        assert transformed['items'][1] is data['items'][1]
+        assert untouched['created_at'] == '2012-05-01T00:47:16'
+
+        # The input is left alone.
+        assert data['created_at'] == '2012-05-01T00:47:16'
+        assert data['items'][0]['product']['created_at'] == '2012-05-01T00:47:16'
+
+    def test_apply_unexpected_shapes(self):
+        plan = TransformPlan(self.paths)
+        data = {'customer': 'John', 'items': {'created_at': 'foo'}}
+        transformed = plan.apply(data)
+        assert transformed == data
+        assert transformed is not data
+
+    def test_transform_value(self):
+        plan = TransformPlan(self.paths)
+        assert plan.transform_value('foo', '2012-05-01T00:47:16') == \
+            '2012-05-01T00:47:16'
+        assert plan.transform_value('created_at', None) is None
+        assert plan.transform_value('created_at', '2012-05-01T00:47:16') == \
+            datetime(2012, 5, 1, 0, 47, 16)
+        assert plan.transform_value('items', [{'created_at': '2012-05-01T00:47:16'}]) == \
+            [{'created_at': datetime(2012, 5, 1, 0, 47, 16)}]
+
+    def test_resource_with_plan(self, transport):
+        class PlannedResource(MockResource):
+            transform_paths = timestamp_paths('', 'nested')
+
+        data = {
+            'created_at': '2012-05-01T00:47:16',
+            'nested': {'created_at': '2012-05-01T00:47:16'},
+            'other': {'created_at': '2012-05-01T00:47:16'}
+        }
+        instance = PlannedResource(transport, data=data)
+        assert instance.created_at == datetime(2012, 5, 1, 0, 47, 16)
+        assert instance.nested == {'created_at': datetime(2012, 5, 1, 0, 47, 16)}
+        assert instance.other is data['other']
+
+        instance['nested'] = {'modified_at': '2012-05-01T00:47:16'}
+        assert instance.nested == {'modified_at': datetime(2012, 5, 1, 0, 47, 16)}
+
+
+class TestLazyDict(object):
+
+    def test_pickle(self):
+        data = LazyDict({'created_at': '2012-05-01T00:00:00',
+                         'modified_at': '2012-05-02T00:00:00'})
+        assert data['created_at'] == datetime(2012, 5, 1)
+
+        restored = pickle.loads(pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+        assert isinstance(restored, LazyDict)
+        assert restored._pending == set(['modified_at'])
+        assert restored == {'created_at': datetime(2012, 5, 1),
+                            'modified_at': datetime(2012, 5, 2)}
+
+    def test_transforms_on_read(self, monkeypatch):
+        calls = []
+        parse = lambda value: calls.append(value) or datetime(2012, 5, 1)
+        monkeypatch.setitem(base.TRANSFORMS, 'created_at', parse)
+        monkeypatch.setitem(base.TRANSFORMS, 'modified_at', parse)
+
+        data = LazyDict({
+            'foo': 'bar',
+            'created_at': '2012-05-01T00:00:00',
+            'nested': {'modified_at': '2012-05-01T00:00:00'},
+            'items': [{'created_at': '2012-05-01T00:00:00'}, 'baz']
+        })
+        assert calls == []
+
+        assert data['foo'] == 'bar'
+        assert data['created_at'] == datetime(2012, 5, 1)
+        assert data.get('created_at') == datetime(2012, 5, 1)
+        assert len(calls) == 1
+
+        nested = data['nested']
+        assert isinstance(nested, LazyDict)
+        assert data['nested'] is nested
+        assert len(calls) == 1
+        assert nested['modified_at'] == datetime(2012, 5, 1)
+        assert len(calls) == 2
+
+        items = data['items']
+        assert isinstance(items[0], LazyDict)
+        assert items[1] == 'baz'
+        assert len(calls) == 2
+
+    def test_dict_interface(self):
+        raw = {
+            'created_at': '2012-05-01T00:47:16',
+            'nested': [{'modified_at': '2012-05-01T00:47:16'}],
+            'foo': None
+        }
+        transformed = transform_attr_value('foo', raw)
+
+        data = LazyDict(raw)
+        assert data == transformed
+        assert not data != transformed
+        assert dict(data.items()) == transformed
+        assert len(data.values()) == 3
+        assert all(v in transformed.values() for v in data.values())
+        assert data.copy() == transformed
+        assert repr(data) == repr(transformed)
+        assert data.get('missing', 1) == 1
+
+        data['modified_at'] = '2012-05-01T00:47:16'
+        assert data['modified_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert data.setdefault('created_at') == datetime(2012, 5, 1, 0, 47, 16)
+        assert data.pop('created_at') == datetime(2012, 5, 1, 0, 47, 16)
+        assert data.pop('created_at', None) is None
+
+        data.update(created_at='2012-05-01T00:47:16')
+        assert data['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+
+
+class TestDataView(object):
+    plan = TransformPlan(timestamp_paths('', 'nested'))
+
+    def test_read(self, monkeypatch):
+        source = {
+            'foo': 'bar',
+            'created_at': '2012-05-01T00:47:16',
+            'nested': {'created_at': '2012-05-01T00:47:16'},
+            'other': {'created_at': '2012-05-01T00:47:16'}
+        }
+        view = DataView(source, self.plan)
+
+        assert view['foo'] == 'bar'
+        assert view['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert view['created_at'] is view['created_at']
+        assert view['nested'] == {'created_at': datetime(2012, 5, 1, 0, 47, 16)}
+        assert view['other'] is source['other']
+        assert view.get('missing', 1) == 1
+        with pytest.raises(KeyError):
+            view['missing']
+
+        assert 'foo' in view
+        assert len(view) == 4
+        assert sorted(view) == sorted(source)
+        assert sorted(view.keys()) == sorted(source.keys())
+        assert len(view.values()) == 4
+        assert dict(view.items()) == view.copy()
+        assert view == self.plan.apply(source)
+        assert repr(view) == repr(view.copy())
+
+        # The source is never modified by reads.
+        assert source['created_at'] == '2012-05-01T00:47:16'
+        assert source['nested'] == {'created_at': '2012-05-01T00:47:16'}
+
+    def test_copy_on_write(self):
+        source = {'foo': 'bar', 'created_at': '2012-05-01T00:47:16'}
+        view = DataView(source, self.plan)
+        assert view['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+
+        view['created_at'] = '2013-05-01T00:47:16'
+        view['baz'] = 1
+        del view['foo']
+        assert view['created_at'] == datetime(2013, 5, 1, 0, 47, 16)
+        assert view['baz'] == 1
+        assert 'foo' not in view
+
+        assert source == {'foo': 'bar', 'created_at': '2012-05-01T00:47:16'}
+
+
 class TestApiObject(object):
 
     @pytest.mark.parametrize('input', [
@@ -237,6 +555,76 @@ class TestResource(object):
             }
         }]
 
+    def test_constructor_with_lazy_datetimes(self, test_token, monkeypatch):
+        transport = Tictail(test_token, {'lazy_datetimes': True}).transport
+        data = {
+            'foo': 'bar',
+            'created_at': '2012-05-01T00:47:16',
+            'nested_list': [{
+                'created_at': '2012-05-01T00:47:16',
+            }]
+        }
+        instance = MockResource(transport, data=data, parent='/parent')
+        assert isinstance(instance._data, LazyDict)
+
+        mock = MagicMock(return_value=datetime(2012, 5, 1, 0, 47, 16))
+        monkeypatch.setitem(base.TRANSFORMS, 'created_at', mock)
+        assert instance.foo == 'bar'
+        assert instance.nested_list[0]['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert mock.call_count == 1
+        assert instance.created_at == datetime(2012, 5, 1, 0, 47, 16)
+        assert instance['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert mock.call_count == 2
+
+        instance['modified_at'] = '2012-05-01T00:47:16'
+        instance.created_at = '2012-05-01T00:47:16'
+        assert instance.modified_at == datetime(2012, 5, 1, 0, 47, 16)
+        assert instance.to_dict() == transform_attr_value('foo', dict(data, **{
+            'modified_at': '2012-05-01T00:47:16'
+        }))
+
+    def test_to_dict_with_lazy_datetimes(self, test_token):
+        transport = Tictail(test_token, {'lazy_datetimes': True}).transport
+        data = {
+            'created_at': '2012-05-01T00:47:16',
+            'nested': {'modified_at': '2012-05-01T00:47:16'},
+            'nested_list': [{'created_at': '2012-05-01T00:47:16'}]
+        }
+        instance = MockResource(transport, data=data)
+        expected = transform_attr_value('foo', data)
+
+        # Plain dicts, so that the dict level API sees transformed values.
+        rv = instance.to_dict()
+        assert type(rv) is dict
+        assert type(rv['nested']) is dict
+        assert type(rv['nested_list'][0]) is dict
+        assert dict(rv) == expected
+        assert dict(**rv) == expected
+
+    def test_view_resources(self, test_token):
+        transport = Tictail(test_token, {'view_resources': True}).transport
+        nested = {'created_at': '2012-05-01T00:47:16'}
+        data = {'id': 1, 'created_at': '2012-05-01T00:47:16', 'nested': nested}
+        instance = MockResource(transport, data=data, parent='/parent')
+
+        assert isinstance(instance._data, DataView)
+        assert instance._data._source is data
+        assert instance.created_at == datetime(2012, 5, 1, 0, 47, 16)
+        assert instance.nested == {'created_at': datetime(2012, 5, 1, 0, 47, 16)}
+        assert instance.uri == '/parent/mocks/1'
+
+        instance.id = 2
+        instance['modified_at'] = '2012-05-01T00:47:16'
+        assert instance.id == 2
+        assert instance.modified_at == datetime(2012, 5, 1, 0, 47, 16)
+        assert data['id'] == 1
+        assert 'modified_at' not in data
+
+        rv = instance.to_dict()
+        assert type(rv) is dict
+        assert rv['created_at'] == datetime(2012, 5, 1, 0, 47, 16)
+        assert sorted(instance.data_keys()) == sorted(rv.keys())
+
     def test_construction_with_subresources(self, transport):
         # Use a collection and a resource as subresources.
         class Posts(Collection):
@@ -265,6 +653,43 @@ class TestResource(object):
         with pytest.raises(KeyError):
             assert instance['comment']
 
+    def test_lazy_subresources(self, monkeypatch, transport):
+        class Post(Resource):
+            endpoint = 'posts'
+        class Posts(Collection):
+            resource = Post
+        class Comment(Resource):
+            pass
+        class Blog(MockResource):
+            subresources = [Posts, Comment]
+
+        created = []
+        original = Posts.__init__
+        def init(self, *args, **kwargs):
+            created.append(self)
+            original(self, *args, **kwargs)
+        monkeypatch.setattr(Posts, '__init__', init)
+
+        instance = Blog(transport, data={'id': 1}, parent='parent')
+        assert created == []
+        assert 'posts' not in instance.__dict__
+
+        posts = instance.posts
+        assert isinstance(posts, Posts)
+        assert posts.uri == '/parent/mocks/1/posts'
+        assert instance.posts is posts
+        assert created == [posts]
+        assert isinstance(instance.comment, Comment)
+
+        # Subresources are not part of the data.
+        with pytest.raises(KeyError):
+            instance['posts']
+
+        # Each instance gets its own subresources.
+        other = Blog(transport, data={'id': 2}, parent='parent')
+        assert other.posts is not posts
+        assert other.posts.uri == '/parent/mocks/2/posts'
+
     @pytest.mark.parametrize('input,expected', [
         (('parent', False), '/parent/mocks/1'),
         (('parent', True), '/parent/mocks'),
@@ -285,6 +710,27 @@ class TestResource(object):
         instance.singleton = singleton
         assert instance.uri == expected
 
+    def test_uri_follows_changes(self, transport):
+        instance = MockResource(transport, data={'id': 1}, parent='parent')
+        assert instance.uri is instance.uri
+
+        instance['id'] = 2
+        assert instance.uri == '/parent/mocks/2'
+        instance.parent = 'other/'
+        assert instance.uri == '/other/mocks/2'
+
+    def test_endpoint_path(self, transport):
+        class SlashedResource(Resource):
+            endpoint = '/slashed/'
+
+        assert SlashedResource.endpoint_path == 'slashed'
+        instance = SlashedResource(transport, data={'id': 1})
+        assert instance.uri == '/slashed/1'
+
+        SlashedResource.endpoint = 'renamed/'
+        assert SlashedResource.endpoint_path == 'renamed'
+        assert instance.uri == '/renamed/1'
+
     def test_pk(self, transport):
         data = {'id': 1}
         instance = MockResource(transport, data=data, parent='parent')
@@ -340,6 +786,25 @@ class TestGet(object):
         assert resource.foo == 'bar'
         mock.assert_called_with('GET', expected_uri)
 
+    def test_get_fields(self, monkeypatch, transport):
+        resource = self.GetMockResource(transport, data={'id': 1})
+        data = {'id': 1, 'title': 'Hat', 'created_at': '2014-01-01T00:00:00',
+                'images': [{'url': 'x'}]}
+        mock = MagicMock(return_value=(data, 200))
+        monkeypatch.setattr(resource, 'request', mock)
+
+        resource = resource.get(fields=['id', 'created_at'])
+        assert resource.to_dict() == {'id': 1,
+                                      'created_at': datetime(2014, 1, 1)}
+        mock.assert_called_with('GET', '/mocks/1')
+
+    def test_get_raw(self, monkeypatch, transport):
+        resource = self.GetMockResource(transport, data={'id': 1})
+        data = {'id': 1, 'created_at': '2014-01-01T00:00:00'}
+        monkeypatch.setattr(resource, 'request',
+                            MagicMock(return_value=(data, 200)))
+        assert resource.get(raw=True) is data
+
 
 class TestGetById(object):
     class GetByIdMockCollection(MockCollection, GetById):
@@ -356,6 +821,28 @@ class TestGetById(object):
         assert resource.foo == 'bar'
         mock.assert_called_with('GET', '/mocks/1')
 
+    def test_get_by_id_fields_param(self, monkeypatch, transport):
+        collection = self.GetByIdMockCollection(transport)
+        collection.fields_param = 'fields'
+        data = {'id': 1, 'foo': 'bar', 'transaction': {'status': 'paid'}}
+        mock = MagicMock(return_value=(data, 200))
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resource = collection.get(1, fields=['id', 'transaction.status'])
+        assert resource.to_dict() == {'id': 1,
+                                      'transaction': {'status': 'paid'}}
+        mock.assert_called_with('GET', '/mocks/1',
+                                params={'fields': 'id,transaction'})
+
+    def test_get_by_id_raw_option(self, monkeypatch, test_token):
+        transport = Tictail(test_token, {'raw': True}).transport
+        collection = self.GetByIdMockCollection(transport)
+        data = {'id': 1, 'foo': 'bar'}
+        monkeypatch.setattr(collection, 'request',
+                            MagicMock(return_value=(data, 200)))
+        assert collection.get(1) is data
+        assert isinstance(collection.get(1, raw=False), MockResource)
+
 
 class TestList(object):
     class ListMockCollection(MockCollection, List):
@@ -409,6 +896,110 @@ class TestList(object):
             params={'cats': 'a,b', 'date': now.isoformat()}
         )
 
+    def test_iterate(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        pages = [
+            ([{'id': 1}, {'id': 2}], 200),
+            ([{'id': 3}, {'id': 4}], 200),
+            ([{'id': 5}], 200)
+        ]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resources = list(collection.iterate(limit=2, cats=['a', 'b']))
+        assert [r.id for r in resources] == [1, 2, 3, 4, 5]
+        assert mock.call_count == 3
+        mock.assert_called_with(
+            'GET',
+            '/mocks',
+            params={'limit': 2, 'after': 4, 'cats': 'a,b'}
+        )
+
+    def test_iterate_stops_on_empty_page(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        pages = [([{'id': 1}, {'id': 2}], 200), ([], 200)]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resources = list(collection.iterate(limit=2))
+        assert [r.id for r in resources] == [1, 2]
+        assert mock.call_count == 2
+
+    def test_all_fields(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        data = [{'id': 1, 'items': [{'title': 'a', 'quantity': 2}]}]
+        mock = MagicMock(return_value=(data, 200))
+        monkeypatch.setattr(collection, 'request', mock)
+
+        resources = collection.all(fields=['items.quantity'], limit=10)
+        assert resources[0].to_dict() == {'items': [{'quantity': 2}]}
+        mock.assert_called_with('GET', '/mocks', params={'limit': 10})
+
+    def test_iterate_fields(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        pages = [
+            ([{'id': 1, 'foo': 'a'}, {'id': 2, 'foo': 'b'}], 200),
+            ([{'id': 3, 'foo': 'c'}], 200)
+        ]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        items = list(collection.iterate(limit=2, raw=True, fields=['foo']))
+        assert items == [{'foo': 'a'}, {'foo': 'b'}, {'foo': 'c'}]
+        # The cursor is taken from the unprojected page.
+        mock.assert_called_with('GET', '/mocks', params={'limit': 2, 'after': 2})
+
+    def test_all_raw(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        data = [{'id': 1, 'created_at': '2014-01-01T00:00:00'}]
+        monkeypatch.setattr(collection, 'request',
+                            MagicMock(return_value=(data, 200)))
+        instantiate = MagicMock()
+        monkeypatch.setattr(collection, 'instantiate_from_data', instantiate)
+
+        assert collection.all(raw=True) is data
+        assert not instantiate.called
+
+    def test_iterate_raw(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        pages = [([{'id': 1}, {'id': 2}], 200), ([{'id': 3}], 200)]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        items = list(collection.iterate(limit=2, raw=True))
+        assert items == [{'id': 1}, {'id': 2}, {'id': 3}]
+        mock.assert_called_with('GET', '/mocks', params={'limit': 2, 'after': 2})
+
+    def test_all_as_columns(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        rv = ([{'id': 1, 'price': 100}, {'id': 2, 'price': 250}], 200)
+        monkeypatch.setattr(collection, 'request', MagicMock(return_value=rv))
+        instantiate = MagicMock()
+        monkeypatch.setattr(collection, 'instantiate_from_data', instantiate)
+
+        columns = collection.all(as_columns=True, columns=['id', 'price'])
+        assert not instantiate.called
+        assert len(columns) == 2
+        assert list(columns['id']) == [1, 2]
+        assert list(columns['price']) == [100, 250]
+
+    def test_iterate_as_columns(self, monkeypatch, transport):
+        collection = self.ListMockCollection(transport)
+        pages = [
+            ([{'id': 1, 'title': 'a'}, {'id': 2, 'title': 'b'}], 200),
+            ([{'id': 3, 'title': 'c', 'extra': True}], 200)
+        ]
+        mock = MagicMock(side_effect=pages)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        chunks = list(collection.iterate(limit=2, as_columns=True))
+        assert [len(c) for c in chunks] == [2, 1]
+        # Later pages get the columns of the first one.
+        assert chunks[1].names == ['id', 'title']
+        assert list(chunks[1]['title']) == ['c']
+        mock.assert_called_with(
+            'GET', '/mocks', params={'limit': 2, 'after': 2})
+
 
 class TestCreate(object):
     class CreateMockCollection(MockCollection, Create):
@@ -427,6 +1018,242 @@ class TestCreate(object):
         assert resourcd.id == 1
         mock.assert_called_with('POST', '/mocks', data=body)
 
+    def test_create_many(self, monkeypatch, transport):
+        monkeypatch.setattr('tictail.concurrency.time.sleep', MagicMock())
+        collection = self.CreateMockCollection(transport)
+        limited = [RateLimited('error', 429, '', retry_after=0)]
+
+        def request(method, uri, data):
+            if data['id'] == 3:
+                raise BadRequest('error', 400, '')
+            if data['id'] == 4 and limited:
+                raise limited.pop()
+            return data, 201
+
+        mock = MagicMock(side_effect=request)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        bodies = [{'id': i} for i in range(6)]
+        report = collection.create_many(bodies, workers=16)
+        assert len(report) == 6
+        assert sorted(r.id for _, r in report.succeeded) == [0, 1, 2, 4, 5]
+        assert all(isinstance(r, Resource) for _, r in report.succeeded)
+        assert len(report.failed) == 1
+        body, error = report.failed[0]
+        assert body == {'id': 3}
+        assert isinstance(error, BadRequest)
+        # The rate limited request was retried, the bad one was not.
+        assert mock.call_count == 7
+        # There is a pooled connection for every worker.
+        assert transport.session.get_adapter('https://x')._pool_maxsize == 16
+
+
+class TestPickle(object):
+    DATA = {'id': 1, 'created_at': '2014-01-01T00:00:00',
+            'items': [{'modified_at': '2014-01-02T00:00:00'}]}
+
+    @pytest.mark.parametrize('protocol', [0, pickle.HIGHEST_PROTOCOL])
+    def test_pickle(self, transport, protocol):
+        resource = MockResource(transport, data=self.DATA, parent='stores/x')
+        resource['title'] = 'Hat'
+        dumped = pickle.dumps(resource, protocol)
+        assert transport.access_token not in dumped
+
+        restored = pickle.loads(dumped)
+        assert isinstance(restored, MockResource)
+        assert restored.transport is None
+        assert restored.to_dict() == resource.to_dict()
+        assert restored.created_at == datetime(2014, 1, 1)
+        assert restored.uri == '/stores/x/mocks/1'
+        assert restored.changes() == {'title': 'Hat'}
+
+        assert restored.attach(transport) is restored
+        assert restored.transport is transport
+
+    def test_pickle_skips_subresources(self, transport):
+        from tictail.resource import Store
+        store = Store(transport, data={'id': 'KGu'})
+        assert store.products.transport is transport
+
+        restored = pickle.loads(pickle.dumps(store, 2)).attach(transport)
+        assert 'products' not in restored.__dict__
+        assert restored.products.uri == '/stores/KGu/products'
+
+    def test_attach_after_subresource_access(self, transport):
+        from tictail.resource import Store
+        store = Store(transport, data={'id': 'KGu'})
+        restored = pickle.loads(pickle.dumps(store, 2))
+        assert restored.products.transport is None
+
+        restored.attach(transport)
+        assert restored.products.transport is transport
+        assert restored.products.uri == '/stores/KGu/products'
+
+    @pytest.mark.parametrize('option', ['lazy_datetimes', 'view_resources'])
+    def test_pickle_lazy_data(self, test_token, option):
+        transport = Tictail(test_token, {option: True}).transport
+        resource = MockResource(transport, data=self.DATA)
+        restored = pickle.loads(pickle.dumps(resource, 2))
+        assert not isinstance(restored._data, DataView)
+        assert restored.items[0]['modified_at'] == datetime(2014, 1, 2)
+
+    def test_copy(self, transport):
+        resource = MockResource(transport, data=self.DATA)
+        shallow = copy.copy(resource)
+        assert shallow.transport is transport
+        assert shallow._data is resource._data
+
+        deep = copy.deepcopy(resource)
+        assert deep.transport is transport
+        assert deep.to_dict() == resource.to_dict()
+        assert deep.items is not resource.items
+
+    @pytest.mark.parametrize('copier', [copy.copy, copy.deepcopy])
+    def test_copy_tracks_changes_separately(self, transport, copier):
+        resource = MockResource(transport, data=self.DATA)
+        resource['title'] = 'Hat'
+        other = copier(resource)
+        other.mark_clean()
+        assert resource.changes() == {'title': 'Hat'}
+        other.mark_dirty('id')
+        assert 'id' not in resource.changes()
+
+
+class TestProject(object):
+    def test_project(self):
+        data = {
+            'id': 1,
+            'customer': {'email': 'a@b.c', 'name': 'A'},
+            'items': [{'quantity': 1, 'product': {'id': 'x', 'title': 'X'}},
+                      {'quantity': 2, 'product': {'id': 'y', 'title': 'Y'}}]
+        }
+        fields = ['id', 'customer.email', 'items.product.id', 'missing.key']
+        assert project(data, fields) == {
+            'id': 1,
+            'customer': {'email': 'a@b.c'},
+            'items': [{'product': {'id': 'x'}}, {'product': {'id': 'y'}}]
+        }
+        # The input is left alone.
+        assert data['customer']['name'] == 'A'
+
+    def test_project_whole_value_wins(self):
+        data = {'customer': {'email': 'a@b.c', 'name': 'A'}}
+        assert project(data, ['customer', 'customer.email']) == data
+        assert project(data, ['customer.email', 'customer']) == data
+
+    def test_project_list(self):
+        assert project([{'a': 1, 'b': 2}, {'a': 3}], ['a']) == [{'a': 1},
+                                                               {'a': 3}]
+
+
+class TestUpdate(object):
+    class UpdateMockResource(MockResource, Update):
+        pass
+
+    def make(self, transport):
+        return self.UpdateMockResource(transport, data={
+            'id': 1,
+            'title': 'Hat',
+            'price': 100,
+            'created_at': '2014-01-01T00:00:00'
+        })
+
+    def test_dirty_tracking(self, transport):
+        resource = self.make(transport)
+        assert not resource.is_dirty
+        assert resource.changes() == {}
+
+        resource.title = 'Cap'
+        resource['created_at'] = datetime(2014, 2, 1)
+        assert resource.is_dirty
+        assert resource.changes() == {
+            'title': 'Cap',
+            'created_at': '2014-02-01T00:00:00'
+        }
+
+        resource.mark_clean()
+        assert not resource.is_dirty
+
+    def test_mark_dirty(self, transport):
+        resource = self.make(transport)
+        resource.mark_dirty('price')
+        assert resource.changes() == {'price': 100}
+
+    def test_save_sends_changes_only(self, monkeypatch, transport):
+        resource = self.make(transport)
+        rv = ({'id': 1, 'title': 'Cap', 'price': 200,
+               'created_at': '2014-01-01T00:00:00'}, 200)
+        mock = MagicMock(return_value=rv)
+        monkeypatch.setattr(resource, 'request', mock)
+
+        resource.title = 'Cap'
+        assert resource.save() is resource
+        mock.assert_called_once_with('PUT', '/mocks/1', data={'title': 'Cap'})
+        assert not resource.is_dirty
+        # The resource is reloaded from the response.
+        assert resource.price == 200
+        assert resource.created_at == datetime(2014, 1, 1)
+
+    def test_save_without_changes(self, monkeypatch, transport):
+        resource = self.make(transport)
+        mock = MagicMock()
+        monkeypatch.setattr(resource, 'request', mock)
+        assert resource.save() is resource
+        assert not mock.called
+
+    def test_update(self, monkeypatch, transport):
+        resource = self.make(transport)
+        mock = MagicMock(return_value=(None, 204))
+        monkeypatch.setattr(resource, 'request', mock)
+
+        resource.update(title='Cap', price=Decimal('150'))
+        mock.assert_called_once_with(
+            'PUT', '/mocks/1', data={'title': 'Cap', 'price': 150})
+        assert resource.title == 'Cap'
+        assert not resource.is_dirty
+
+    def test_save_many(self, monkeypatch, transport):
+        monkeypatch.setattr('tictail.concurrency.time.sleep', MagicMock())
+        resize_pool = MagicMock()
+        monkeypatch.setattr(transport, 'resize_pool', resize_pool, raising=False)
+        errors = {
+            3: [BadRequest('error', 400, '')],
+            4: [RateLimited('error', 429, '', retry_after=0)]
+        }
+
+        def request(method, uri, data):
+            id = int(uri.rsplit('/', 1)[1])
+            if errors.get(id):
+                raise errors[id].pop()
+            return None, 204
+
+        resources = []
+        for i in range(5):
+            resource = self.UpdateMockResource(transport, data={'id': i})
+            resource['title'] = str(i)
+            monkeypatch.setattr(resource, 'request',
+                                MagicMock(side_effect=request))
+            resources.append(resource)
+
+        report = save_many(iter(resources), workers=2)
+        resize_pool.assert_called_once_with(2)
+        assert len(report.succeeded) == 4
+        assert report.failed[0][0] is resources[3]
+        assert resources[3].is_dirty
+        assert not resources[0].is_dirty
+        # The rate limited save was retried.
+        assert not resources[4].is_dirty
+        assert resources[4].request.call_count == 2
+
+    def test_to_json_value(self):
+        value = {
+            'a': [datetime(2014, 1, 1), Decimal('1.5')],
+            'b': Decimal('2'),
+            'c': 'x'
+        }
+        assert to_json_value(value) == {
+            'a': ['2014-01-01T00:00:00', 1.5], 'b': 2, 'c': 'x'}
+
 
 class TestDelete(object):
     class DeleteMockResource(MockResource, Delete):
@@ -459,3 +1286,29 @@ class TestDeleteById(object):
 
         assert collection.delete(1) is True
         mock.assert_called_with('DELETE', '/mocks/1')
+
+    def test_delete_many(self, monkeypatch, transport):
+        monkeypatch.setattr('tictail.concurrency.time.sleep', MagicMock())
+        collection = self.DeleteByIdMockCollection(transport)
+        timeouts = [ApiTimeout('timed out')]
+
+        def request(method, uri):
+            id = int(uri.rsplit('/', 1)[1])
+            if id == 2:
+                raise NotFound('not found', 404, '')
+            if id == 3:
+                raise ServerError('conflict', 409, '')
+            if id == 4 and timeouts:
+                raise timeouts.pop()
+            return {}, 204
+
+        mock = MagicMock(side_effect=request)
+        monkeypatch.setattr(collection, 'request', mock)
+
+        report = collection.delete_many(range(6), workers=3)
+        assert sorted(report.deleted) == [0, 1, 4, 5]
+        assert report.missing == [2]
+        assert [id for id, _ in report.failed] == [3]
+        assert report.summary() == {'deleted': 4, 'missing': 1, 'failed': 1}
+        # Only the timed out delete was retried.
+        assert mock.call_count == 7
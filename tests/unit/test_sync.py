@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+from mock import MagicMock
+
+from tictail.resource import Orders
+from tictail.sync import FileCheckpointStore, SQLiteCheckpointStore, OrderSync
+
+from conftest import FakeApi, FakeClock
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def checkpoints(request, tmpdir):
+    if request.param == 'file':
+        return FileCheckpointStore(str(tmpdir.join('checkpoints.json')))
+    return SQLiteCheckpointStore(str(tmpdir.join('checkpoints.db')))
+
+
+class FakeOrdersApi(FakeApi):
+
+    def modify(self, id, modified_at):
+        self.put({'id': id, 'modified_at': modified_at})
+
+    def create(self, id, created_at):
+        self.put({'id': id, 'created_at': created_at, 'modified_at': None})
+
+
+class TestCheckpointStores(object):
+
+    def test_load_save(self, checkpoints):
+        assert checkpoints.load('foo') is None
+        checkpoints.save('foo', {'modified_at': '2014-01-01T00:00:00', 'ids': ['a']})
+        checkpoints.save('bar', {'modified_at': '2015-01-01T00:00:00', 'ids': []})
+        assert checkpoints.load('foo') == {
+            'modified_at': '2014-01-01T00:00:00',
+            'ids': ['a']
+        }
+        checkpoints.save('foo', None)
+        assert checkpoints.load('foo') is None
+        assert checkpoints.load('bar')['ids'] == []
+
+    def test_file_store_persists(self, tmpdir):
+        path = str(tmpdir.join('checkpoints.json'))
+        FileCheckpointStore(path).save('foo', {'ids': []})
+        assert FileCheckpointStore(path).load('foo') == {'ids': []}
+        assert not tmpdir.join('checkpoints.json.tmp').check()
+
+
+class TestOrderSync(object):
+
+    @pytest.fixture
+    def api(self, monkeypatch, transport):
+        orders = Orders(transport, parent='stores/1')
+        api = FakeOrdersApi()
+        monkeypatch.setattr(orders, 'request', api)
+        return orders, api
+
+    def test_key(self, api, checkpoints):
+        orders, _ = api
+        assert OrderSync(orders, checkpoints).key == '/stores/1/orders'
+        assert OrderSync(orders, checkpoints, key='foo').key == 'foo'
+
+    def test_changes(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('a', '2014-01-01T00:00:02')
+        fake.modify('b', '2014-01-01T00:00:01')
+        fake.modify('c', '2014-01-01T00:00:02')
+
+        clock = FakeClock(datetime(2014, 1, 1, 0, 0, 3))
+        sync = OrderSync(orders, checkpoints, clock=clock)
+        assert sync.watermark is None
+        assert [o.id for o in sync.changes()] == ['a', 'b', 'c']
+        assert 'modified_after' not in fake.calls[0]
+        assert fake.calls[0]['modified_before'] == '2014-01-01T00:00:03'
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 2)
+
+        # Nothing changed since.
+        clock.now = datetime(2014, 1, 1, 0, 0, 5)
+        assert [o.id for o in sync.changes()] == []
+        assert fake.calls[-1]['modified_after'] == '2014-01-01T00:00:01'
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 2)
+
+        # An order modified right before the end of the last run, which was
+        # not returned by it, is picked up, as well as newer orders.
+        fake.modify('d', '2014-01-01T00:00:04.500000')
+        fake.modify('b', '2014-01-01T00:00:05.500000')
+        clock.now = datetime(2014, 1, 1, 0, 0, 6)
+        assert [o.id for o in sync.changes()] == ['b', 'd']
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 5, 500000)
+
+    def test_overlap_is_not_repeated(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('a', '2014-01-01T00:00:02.500000')
+        clock = FakeClock(datetime(2014, 1, 1, 0, 0, 3))
+        sync = OrderSync(orders, checkpoints, clock=clock)
+        assert [o.id for o in sync.changes()] == ['a']
+
+        # 'a' is within the lookback of the next run.
+        clock.now = datetime(2014, 1, 1, 0, 0, 4)
+        assert [o.id for o in sync.changes()] == []
+
+        fake.modify('a', '2014-01-01T00:00:03.500000')
+        clock.now = datetime(2014, 1, 1, 0, 0, 5)
+        assert [o.id for o in sync.changes()] == ['a']
+
+    def test_overlap_across_checkpoints(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('z', '2014-01-01T00:00:02.500000')
+        clock = FakeClock(datetime(2014, 1, 1, 0, 0, 3))
+        sync = OrderSync(orders, checkpoints, checkpoint_every=1, clock=clock)
+        assert [o.id for o in sync.changes()] == ['z']
+
+        # Checkpoints taken after newer orders must not forget 'z', which
+        # comes last in this run.
+        fake.modify('a', '2014-01-01T00:00:08')
+        fake.modify('b', '2014-01-01T00:00:09')
+        clock.now = datetime(2014, 1, 1, 0, 0, 10)
+        assert [o.id for o in sync.changes()] == ['a', 'b']
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 9)
+
+    def test_resume_after_crash(self, api, checkpoints):
+        orders, fake = api
+        for i, id in enumerate('abcde'):
+            fake.modify(id, "2014-01-01T00:00:0{0}".format(i))
+
+        clock = FakeClock(datetime(2014, 1, 1, 0, 1))
+        sync = OrderSync(orders, checkpoints, checkpoint_every=2, clock=clock)
+        changes = sync.changes()
+        assert [next(changes).id for _ in range(4)] == ['a', 'b', 'c', 'd']
+        # Crash while processing 'd'. The last checkpoint was taken after 'b',
+        # so 'c' and 'd' are handed out again.
+        del changes
+        assert sync.watermark is None
+
+        clock.now = datetime(2014, 1, 1, 0, 2)
+        sync = OrderSync(orders, checkpoints, clock=clock)
+        assert [o.id for o in sync.changes()] == ['c', 'd', 'e']
+        # The interrupted run is completed, up to the time it started.
+        assert fake.calls[-1]['modified_before'] == '2014-01-01T00:01:00'
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 4)
+
+    def test_skewed_clock(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('a', '2014-01-01T00:00:05')
+        # The local clock is 5 seconds ahead of the API.
+        clock = FakeClock(datetime(2014, 1, 1, 0, 0, 15))
+        sync = OrderSync(orders, checkpoints, clock=clock)
+        assert [o.id for o in sync.changes()] == ['a']
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 5)
+
+        fake.modify('b', '2014-01-01T00:00:12')
+        clock.now = datetime(2014, 1, 1, 0, 0, 19)
+        assert [o.id for o in sync.changes()] == ['b']
+        assert sync.watermark == datetime(2014, 1, 1, 0, 0, 12)
+
+    def test_checkpoints_are_batched(self, api, checkpoints, monkeypatch):
+        orders, fake = api
+        for i in range(25):
+            fake.modify("o{0:02d}".format(i), '2014-01-01T00:00:00')
+        save = MagicMock(side_effect=checkpoints.save)
+        monkeypatch.setattr(checkpoints, 'save', save)
+
+        sync = OrderSync(orders, checkpoints, checkpoint_every=10)
+        assert len(list(sync.changes())) == 25
+        # Two checkpoints during the run and one at its end.
+        assert save.call_count == 3
+
+    def test_reset(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('a', '2014-01-01T00:00:00')
+        sync = OrderSync(orders, checkpoints)
+        assert len(list(sync.changes())) == 1
+        sync.reset()
+        assert sync.watermark is None
+        assert len(list(sync.changes())) == 1
+
+    def test_never_modified_orders(self, api, checkpoints):
+        orders, fake = api
+        fake.create('a', '2014-01-01T00:00:00')
+        fake.modify('b', '2014-01-01T00:00:00')
+        clock = FakeClock(datetime(2014, 1, 1, 0, 0, 1))
+        sync = OrderSync(orders, checkpoints, clock=clock)
+        assert [o.id for o in sync.changes()] == ['a', 'b']
+
+        # A new order which was never modified is synced on later runs too.
+        fake.create('c', '2014-01-01T00:00:01.500000')
+        clock.now = datetime(2014, 1, 1, 0, 0, 2)
+        assert [o.id for o in sync.changes()] == ['c']
+        clock.now = datetime(2014, 1, 1, 0, 0, 4)
+        assert [o.id for o in sync.changes()] == []
+
+    def test_legacy_checkpoint(self, api, checkpoints):
+        orders, fake = api
+        fake.modify('a', '2014-01-01T00:00:02')
+        fake.modify('b', '2014-01-01T00:00:02')
+        checkpoints.save('/stores/1/orders', {
+            'modified_at': '2014-01-01T00:00:02', 'ids': ['a']})
+        sync = OrderSync(orders, checkpoints,
+                         clock=FakeClock(datetime(2014, 1, 1, 0, 0, 3)))
+        assert [o.id for o in sync.changes()] == ['b']
+
+    def test_limit(self, api, checkpoints):
+        orders, fake = api
+        sync = OrderSync(orders, checkpoints, limit=10)
+        list(sync.changes())
+        assert fake.calls[0]['limit'] == 10
@@ -4,11 +4,17 @@ from mock import MagicMock
 
 from tictail.version import __version__
 from tictail.importer import json, requests
-from tictail.errors import ApiConnectionError, Forbidden, ServerError, ApiError
+from tictail.errors import (ApiConnectionError,
+                            ApiTimeout,
+                            Forbidden,
+                            ServerError,
+                            RateLimited,
+                            ApiError)
 
 
 ConnectionError = requests.exceptions.ConnectionError
 HTTPError = requests.exceptions.HTTPError
+Timeout = requests.exceptions.Timeout
 
 
 class TestTransport(object):
@@ -26,6 +32,26 @@ class TestTransport(object):
         abs_uri = transport._make_abs_uri('stores/')
         assert abs_uri == '{0}://{1}/v{2}/stores'.format(protocol, base, version)
 
+    def test_make_abs_url_config_change(self, transport):
+        transport._make_abs_uri('/stores')
+        transport.config['base'] = 'example.com'
+        assert transport._make_abs_uri('/stores').startswith('https://example.com/')
+
+    def test_session(self, transport):
+        session = transport.session
+        assert isinstance(session, requests.Session)
+        assert transport.session is session
+        adapter = session.get_adapter('https://api.tictail.com')
+        assert adapter._pool_maxsize == transport.config['pool_size']
+
+    def test_resize_pool(self, transport):
+        session = transport.resize_pool(32)
+        assert session is transport.session
+        assert session.get_adapter('https://x')._pool_maxsize == 32
+        # Pools never shrink.
+        transport.resize_pool(4)
+        assert session.get_adapter('https://x')._pool_maxsize == 32
+
     def test_utf8(self, transport):
         value = u'ƃäｃòԉ'
         assert transport._utf8(value) == value.encode('utf-8')
@@ -78,7 +104,7 @@ class TestTransport(object):
 
         method, uri, kwargs = call_params
 
-        monkeypatch.setattr('tictail.transport.requests.request', mock_request)
+        monkeypatch.setattr(transport, '_session', MagicMock(request=mock_request))
 
         base = transport.config['base']
         protocol = transport.config['protocol']
@@ -111,6 +137,7 @@ class TestTransport(object):
 
     @pytest.mark.parametrize('input', [
         (ConnectionError, '_handle_connection_error'),
+        (Timeout, '_handle_timeout'),
         (HTTPError, '_handle_http_error'),
         (Exception, '_handle_unexpected_error')
     ])
@@ -126,7 +153,7 @@ class TestTransport(object):
         mock_error_handler = MagicMock()
 
         monkeypatch.setattr(transport, error_handler, mock_error_handler)
-        monkeypatch.setattr('tictail.transport.requests.request', mock_request)
+        monkeypatch.setattr(transport, '_session', MagicMock(request=mock_request))
 
         transport.handle_request('GET', 'foo')
         mock_error_handler.assert_called_with(error)
@@ -136,6 +163,12 @@ class TestTransport(object):
         with pytest.raises(ApiConnectionError):
             transport._handle_connection_error(error)
 
+    def test_handle_timeout(self, transport):
+        error = Timeout('read timed out')
+        with pytest.raises(ApiTimeout) as excinfo:
+            transport._handle_timeout(error)
+        assert isinstance(excinfo.value, ApiConnectionError)
+
     @pytest.mark.parametrize('input', [
         (403, Forbidden),
         (500, ServerError)
@@ -166,6 +199,28 @@ class TestTransport(object):
         assert err.raw == error_body_text
         assert err.json == error_body_json
 
+    @pytest.mark.parametrize('headers,expected', [
+        ({'retry-after': '30'}, 30),
+        ({'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'}, None),
+        ({}, None)
+    ])
+    def test_handle_rate_limited(self, transport, headers, expected):
+        mock = MagicMock()
+        mock.status_code = 429
+        mock.headers = headers
+        mock.json.return_value = {'message': 'slow down'}
+
+        error = HTTPError('error response', 429)
+        error.response = mock
+
+        with pytest.raises(RateLimited) as excinfo:
+            transport._handle_http_error(error)
+
+        err = excinfo.value
+        assert isinstance(err, ServerError)
+        assert err.message == 'slow down'
+        assert err.retry_after == expected
+
     @pytest.mark.parametrize('input', [
         (502, 'API is unreachable'),
         (509, 'unexpected error')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import copy
+
+import pytest
+from mock import MagicMock
+
+from tictail.resource import Categories, Category
+from tictail.tree import CategoryTree, TreeCache, tree_cache
+
+from conftest import FakeClock, ids
+
+
+CATEGORIES = [
+    {'id': 'c', 'title': 'Shirts', 'parent_id': 'a', 'position': 1},
+    {'id': 'a', 'title': 'Clothes', 'parent_id': None, 'position': 0},
+    {'id': 'b', 'title': 'Pants', 'parent_id': 'a', 'position': 0},
+    {'id': 'd', 'title': 'Slim', 'parent_id': 'b', 'position': 0},
+    {'id': 'e', 'title': 'Stickers', 'parent_id': None, 'position': 1},
+    {'id': 'f', 'title': 'Orphan', 'parent_id': 'x', 'position': None}
+]
+
+
+class TestCategoryTree(object):
+
+    @pytest.fixture
+    def tree(self):
+        return CategoryTree(CATEGORIES)
+
+    def test_roots(self, tree):
+        assert ids(tree.roots) == ['a', 'e', 'f']
+        assert len(tree) == 6
+        assert 'd' in tree
+        assert 'x' not in tree
+
+    def test_lookups(self, tree):
+        assert tree.get('d')['title'] == 'Slim'
+        assert tree.get('x') is None
+        assert tree.parent('d')['id'] == 'b'
+        assert tree.parent('a') is None
+        assert tree.parent('f') is None
+        assert ids(tree.children('a')) == ['b', 'c']
+        assert tree.children('d') == ()
+        assert ids(tree.ancestors('d')) == ['a', 'b']
+        assert ids(tree.descendants('a')) == ['b', 'd', 'c']
+        assert ids(tree.path('d')) == ['a', 'b', 'd']
+        assert tree.path('x') == ()
+
+    def test_accepts_categories(self, tree):
+        category = tree.get('b')
+        assert category in tree
+        assert ids(tree.children(category)) == ['d']
+
+    def test_iter(self, tree):
+        assert ids(tree) == ['a', 'b', 'd', 'c', 'e', 'f']
+
+    def test_cycle(self):
+        tree = CategoryTree([
+            {'id': 'a', 'parent_id': 'b'},
+            {'id': 'b', 'parent_id': 'a'},
+            {'id': 'c', 'parent_id': None}
+        ])
+        assert ids(tree.roots) == ['c']
+        assert tree.ancestors('a') == ()
+        assert ids(tree) == ['c']
+
+
+class TestTreeCache(object):
+
+    def test_revalidation(self):
+        clock = FakeClock()
+        cache = TreeCache(clock)
+        data = copy.deepcopy(CATEGORIES)
+        fetch = MagicMock(side_effect=lambda: copy.deepcopy(data))
+        build = MagicMock(side_effect=CategoryTree)
+
+        tree = cache.get('/stores/1/categories', fetch, build, 60)
+        assert cache.get('/stores/1/categories', fetch, build, 60) is tree
+        assert fetch.call_count == 1
+
+        # Stale, but unchanged: revalidated without rebuilding.
+        clock.now = 61
+        assert cache.get('/stores/1/categories', fetch, build, 60) is tree
+        assert fetch.call_count == 2
+        assert build.call_count == 1
+
+        clock.now = 122
+        data[0]['title'] = 'T-shirts'
+        changed = cache.get('/stores/1/categories', fetch, build, 60)
+        assert changed is not tree
+        assert changed.get('c')['title'] == 'T-shirts'
+
+        cache.get('/stores/2/categories', fetch, build, 60)
+        assert len(cache) == 2
+        cache.invalidate('/stores/2/categories')
+        assert len(cache) == 1
+        cache.invalidate()
+        assert len(cache) == 0
+
+
+class TestCategories(object):
+
+    def test_tree(self, monkeypatch, transport):
+        categories = Categories(transport, parent='stores/1')
+        mock = MagicMock(return_value=(copy.deepcopy(CATEGORIES), 200))
+        monkeypatch.setattr(categories, 'request', mock)
+
+        tree = categories.tree()
+        assert isinstance(tree.get('a'), Category)
+        assert ids(tree.path('d')) == ['a', 'b', 'd']
+        mock.assert_called_once_with('GET', '/stores/1/categories', params={})
+
+        # Cached on the transport, i.e shared between collections.
+        other = Categories(transport, parent='stores/1')
+        monkeypatch.setattr(other, 'request', mock)
+        assert other.tree() is tree
+        assert mock.call_count == 1
+        assert tree_cache(transport) is transport.category_trees
+
+        assert other.tree(refresh=True) is tree
+        assert mock.call_count == 2
@@ -0,0 +1,96 @@
+"""
+tictail.cli
+~~~~~~~~~~~
+
+The `tictail` console script.
+
+Usage:
+  tictail export [options] [collection ...]
+
+"""
+import optparse
+import os
+import sys
+
+from .client import Client
+from .export import EXPORTABLE, FORMATS, export_store
+from .resource import Store
+from .sync import FileCheckpointStore
+
+
+USAGE = """%prog export [options] [collection ...]
+
+Exports the given collections of a store (default: {0}).""".format(
+    ', '.join(EXPORTABLE))
+
+
+def make_parser():
+    parser = optparse.OptionParser(usage=USAGE)
+    parser.add_option('-t', '--token',
+                      default=os.environ.get('TICTAIL_ACCESS_TOKEN'),
+                      help='access token, defaults to $TICTAIL_ACCESS_TOKEN')
+    parser.add_option('-s', '--store',
+                      help='store id, defaults to the store of the token')
+    parser.add_option('-o', '--output', default='.',
+                      help='output directory [default: %default]')
+    parser.add_option('-f', '--format', choices=FORMATS, default='ndjson',
+                      help="one of {0} [default: %default]".format(
+                          ', '.join(FORMATS)))
+    parser.add_option('-c', '--columns',
+                      help='comma separated list of (dotted) keys to export')
+    parser.add_option('-z', '--gzip', action='store_true', default=False,
+                      help='gzip the output files')
+    parser.add_option('--checkpoint',
+                      help='checkpoint file for resuming interrupted exports')
+    parser.add_option('--limit', type='int',
+                      help='page size')
+    return parser
+
+
+def export(client, opts, collections):
+    if opts.store:
+        store = Store(client.transport, data={'id': opts.store})
+    else:
+        store = client.me()
+
+    columns = None
+    if opts.columns:
+        columns = opts.columns.split(',')
+        columns = dict((name, columns) for name in collections)
+
+    kwargs = {}
+    if opts.checkpoint:
+        kwargs['checkpoints'] = FileCheckpointStore(opts.checkpoint)
+    if opts.limit:
+        kwargs['limit'] = opts.limit
+
+    counts = export_store(store, opts.output,
+                          collections=collections,
+                          format=opts.format,
+                          columns=columns,
+                          compress=opts.gzip,
+                          **kwargs)
+    for name in collections:
+        sys.stdout.write("{0}: {1}\n".format(name, counts[name]))
+
+
+def main(argv=None):
+    parser = make_parser()
+    opts, args = parser.parse_args(argv)
+
+    if not args or args[0] != 'export':
+        parser.error('unknown command, expected `export`')
+    if not opts.token:
+        parser.error('an access token is required')
+
+    collections = args[1:] or list(EXPORTABLE)
+    for name in collections:
+        if name not in EXPORTABLE:
+            parser.error("cannot export `{0}`".format(name))
+
+    export(Client(opts.token), opts, collections)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,6 +17,7 @@ from .resource import (Store,
                        Theme,
                        Categories,
                        Me)
+from .resource.identity import IdentityMap
 
 
 # API version supported by these bindings.
@@ -34,13 +35,49 @@ VERIFY_SSL_CERTS = True
 # Default socket timeout.
 DEFAULT_TIMEOUT = 20
 
+# Whether `created_at` and `modified_at` values are parsed when they are first
+# read, instead of when a resource is instantiated.
+LAZY_DATETIMES = False
+
+# Whether resources wrap the decoded JSON of a response as it is, instead of
+# copying it. Values are transformed when read, and the data is copied on the
+# first write.
+VIEW_RESOURCES = False
+
+# Whether collections return compact, read-only resources with slotted fields
+# instead of full resources. See `tictail.resource.compact`.
+COMPACT_RESOURCES = False
+
+# Whether reads return the decoded JSON of a response instead of resources.
+# Can be overridden per call with the `raw` argument.
+RAW = False
+
+# Whether a client maps each fetched resource to a single instance per uri.
+# See `tictail.resource.identity`.
+IDENTITY_MAP = False
+
+# How many connections per host the HTTP transport keeps open. Batch
+# operations grow the pool to their number of workers.
+POOL_SIZE = 10
+
+# How long (in seconds) a cached category tree is used before it is
+# revalidated. See `Categories.tree`.
+CATEGORY_TREE_MAX_AGE = 300
+
 # Defauly applied configuration.
 DEFAULT_CONFIG = {
     'version': VERSION,
     'protocol': DEFAULT_PROTOCOL,
     'base': BASE,
     'verify_ssl_certs': VERIFY_SSL_CERTS,
-    'timeout': DEFAULT_TIMEOUT
+    'timeout': DEFAULT_TIMEOUT,
+    'pool_size': POOL_SIZE,
+    'lazy_datetimes': LAZY_DATETIMES,
+    'compact_resources': COMPACT_RESOURCES,
+    'view_resources': VIEW_RESOURCES,
+    'raw': RAW,
+    'identity_map': IDENTITY_MAP,
+    'category_tree_max_age': CATEGORY_TREE_MAX_AGE
 }
 
 
@@ -53,8 +90,19 @@ class Client(object):
         if transport is None:
             transport = self._make_transport()
 
+        if self.config['identity_map']:
+            transport.identity_map = IdentityMap()
+
         self.transport = transport
 
+    @property
+    def identity_map(self):
+        """The identity map of this client, or None if the `identity_map`
+        option is not set.
+
+        """
+        return getattr(self.transport, 'identity_map', None)
+
     def _make_config(self, config_override):
         config = copy.deepcopy(DEFAULT_CONFIG)
         if config_override:
@@ -70,7 +118,7 @@ class Client(object):
         parent = "{0}/{1}".format(Store.endpoint, store_id)
         return resource_cls(self.transport, parent=parent)
 
-    def me(self):
+    def me(self, raw=None):
         """Alias for getting the store for which the access token you are using
         is valid.
 
@@ -78,8 +126,10 @@ class Client(object):
         >>> tt.me()
         Store({...})
 
+        :param raw: If set, the decoded JSON is returned instead of a `Store`.
+
         """
-        return Me(self.transport).get()
+        return Me(self.transport).get(raw)
 
     # ====== Resource factories ======= #
 
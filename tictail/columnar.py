@@ -0,0 +1,170 @@
+"""
+tictail.columnar
+~~~~~~~~~~~~~~~~
+
+Column oriented results for analytics. Instead of a list of resources, a page
+of data is turned into a `ColumnSet`: a dict of column names and arrays, built
+straight from the decoded JSON without instantiating any resources.
+
+If NumPy is installed, columns are NumPy arrays: timestamps become
+`datetime64[us]`, prices and quantities numeric arrays and everything else
+object arrays. Without NumPy, columns are lists with timestamps parsed into
+`datetime` objects.
+
+"""
+from .importer import import_optional
+from .resource.base import lookup_path, parse_datetime
+
+
+# Column kinds.
+DATETIME = 'datetime'
+NUMBER = 'number'
+OBJECT = 'object'
+
+# Kinds of columns by the last key of their path. Columns not listed here and
+# not ending in `_price` are objects.
+COLUMN_KINDS = {
+    'created_at': DATETIME,
+    'modified_at': DATETIME,
+    'price': NUMBER,
+    'quantity': NUMBER,
+    'position': NUMBER
+}
+
+
+def column_kind(name):
+    """Returns the kind of the column with the given (dotted) name.
+
+    :param name: The column name, e.g 'vat.price'.
+
+    """
+    key = name.rsplit('.', 1)[-1]
+    kind = COLUMN_KINDS.get(key)
+    if kind is None and key.endswith('_price'):
+        kind = NUMBER
+    return kind or OBJECT
+
+
+def _naive_utc(value):
+    if value is None:
+        return None
+    value = parse_datetime(value)
+    offset = value.utcoffset()
+    if offset is not None:
+        value = (value - offset).replace(tzinfo=None)
+    return value
+
+
+def _numpy_column(numpy, kind, values):
+    if kind == DATETIME:
+        # datetime64 has no time zones, store UTC. None becomes NaT.
+        values = [_naive_utc(v) for v in values]
+        return numpy.array(values, dtype='datetime64[us]')
+    if kind == NUMBER:
+        # NumPy truncates floats to fit an int64 column, so int64 is only
+        # used if every value is an integer.
+        if all(isinstance(v, (int, long)) and not isinstance(v, bool)
+               for v in values):
+            return numpy.array(values, dtype='int64')
+        values = [numpy.nan if v is None else v for v in values]
+        return numpy.array(values, dtype='float64')
+    column = numpy.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _list_column(kind, values):
+    if kind == DATETIME:
+        return [None if v is None else parse_datetime(v) for v in values]
+    return list(values)
+
+
+class ColumnSet(dict):
+    """A dict of column names and equally long columns."""
+
+    def __init__(self, columns, length):
+        """Initializes the column set.
+
+        :param columns: A list of `(name, column)` pairs.
+        :param length: The number of rows.
+
+        """
+        super(ColumnSet, self).__init__(columns)
+        self.names = [name for name, _ in columns]
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def to_records(self):
+        """Returns the columns as a NumPy structured array. Requires NumPy."""
+        numpy = import_optional('numpy')
+        if numpy is None:
+            raise ImportError('`to_records` requires NumPy.')
+        arrays = [numpy.asarray(self[name]) for name in self.names]
+        return numpy.rec.fromarrays(arrays, names=self.names)
+
+
+def to_columns(data, columns=None, use_numpy=None):
+    """Turns a list of decoded resources into a `ColumnSet`.
+
+    :param data: A list of dicts.
+    :param columns: An optional list of (dotted) column names. Defaults to all
+    top level keys in `data`.
+    :param use_numpy: Whether to build NumPy arrays. Defaults to True if NumPy
+    is installed.
+
+    """
+    if columns is None:
+        keys = set()
+        for item in data:
+            keys.update(item)
+        columns = sorted(keys)
+
+    numpy = import_optional('numpy') if use_numpy is not False else None
+    if use_numpy and numpy is None:
+        raise ImportError('NumPy is not installed.')
+
+    built = []
+    for name in columns:
+        if '.' in name:
+            values = [lookup_path(item, name) for item in data]
+        else:
+            values = [item.get(name) for item in data]
+        kind = column_kind(name)
+        if numpy is not None:
+            built.append((name, _numpy_column(numpy, kind, values)))
+        else:
+            built.append((name, _list_column(kind, values)))
+    return ColumnSet(built, len(data))
+
+
+def concat_columns(column_sets):
+    """Concatenates column sets with the same columns, e.g the pages yielded
+    by `List.iterate(as_columns=True)`, into one `ColumnSet`.
+
+    :param column_sets: An iterable of `ColumnSet`s.
+
+    """
+    column_sets = list(column_sets)
+    if not column_sets:
+        return ColumnSet([], 0)
+
+    names = column_sets[0].names
+    length = sum(len(c) for c in column_sets)
+    numpy = import_optional('numpy')
+
+    built = []
+    for name in names:
+        parts = [c[name] for c in column_sets]
+        if numpy is not None and isinstance(parts[0], numpy.ndarray):
+            built.append((name, numpy.concatenate(parts)))
+        else:
+            column = []
+            for part in parts:
+                column.extend(part)
+            built.append((name, column))
+    return ColumnSet(built, length)
+
+
+__all__ = ['ColumnSet', 'to_columns', 'concat_columns', 'column_kind']
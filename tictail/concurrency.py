@@ -0,0 +1,271 @@
+"""
+tictail.concurrency
+~~~~~~~~~~~~~~~~~~~
+
+Small helpers for issuing API calls from a bounded pool of threads. The HTTP
+transport is blocking, so threads are all we need to overlap requests.
+
+"""
+import threading
+import time
+
+from .errors import ApiConnectionError, RateLimited, ServerError
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+# Default number of worker threads.
+DEFAULT_WORKERS = 4
+
+# How often (in seconds) blocked threads check whether they should stop.
+POLL_INTERVAL = 0.1
+
+# Default number of times a call is retried after a transient error.
+DEFAULT_RETRIES = 3
+
+# Default delay (in seconds) before the first retry, doubled on every retry.
+DEFAULT_RETRY_DELAY = 1.0
+
+
+class _Done(object):
+    """Marker put on the results queue when a worker thread exits."""
+    pass
+
+
+def imap_unordered(func, items, workers=DEFAULT_WORKERS):
+    """Calls `func` on every item of `items` from a pool of threads and yields
+    `(item, result, error)` tuples in completion order. Exceptions raised by
+    `func` are not propagated, they are returned as `error` instead.
+
+    `items` is consumed lazily, so it can be an arbitrarily long iterator.
+    Closing the generator early stops the pool once the calls in flight are
+    done.
+
+    :param func: A callable taking a single item.
+    :param items: An iterable of items.
+    :param workers: The number of threads to use.
+
+    """
+    if workers < 1:
+        raise ValueError('`workers` must be at least 1')
+
+    tasks = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def put(task):
+        while not stop.is_set():
+            try:
+                tasks.put(task, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def feed():
+        try:
+            for item in items:
+                if not put((item,)):
+                    return
+        except Exception as e:
+            results.put((None, None, e))
+        for _ in range(workers):
+            if not put(None):
+                return
+
+    def work():
+        try:
+            while not stop.is_set():
+                try:
+                    task = tasks.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                # The pool may have been stopped while waiting for a task.
+                if task is None or stop.is_set():
+                    break
+                item = task[0]
+                try:
+                    results.put((item, func(item), None))
+                except Exception as e:
+                    results.put((item, None, e))
+        finally:
+            results.put(_Done)
+
+    threads = [threading.Thread(target=feed)]
+    threads.extend(threading.Thread(target=work) for _ in range(workers))
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        running = workers
+        while running:
+            rv = results.get()
+            if rv is _Done:
+                running -= 1
+                continue
+            yield rv
+    finally:
+        stop.set()
+
+
+def map_concurrently(func, items, workers=DEFAULT_WORKERS):
+    """Calls `func` on every item of `items` from a pool of threads and returns
+    the results in the order of `items`. The first exception raised by `func`
+    is re-raised.
+
+    :param func: A callable taking a single item.
+    :param items: An iterable of items.
+    :param workers: The number of threads to use.
+
+    """
+    indexed = list(enumerate(items))
+    results = [None] * len(indexed)
+    call = lambda pair: func(pair[1])
+    for pair, result, error in imap_unordered(call, indexed, workers):
+        if error is not None:
+            raise error
+        results[pair[0]] = result
+    return results
+
+
+class Throttle(object):
+    """Holds back every thread of a pool for a while, e.g after the API
+    answered with a 429.
+
+    """
+
+    def __init__(self, clock=None, sleep=None):
+        """Initializes the throttle.
+
+        :param clock: A function returning the current time in seconds.
+        Defaults to `time.time`.
+        :param sleep: A function sleeping for a number of seconds. Defaults to
+        `time.sleep`.
+
+        """
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        self._until = 0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Holds back all calls to `wait` for `seconds` from now."""
+        with self._lock:
+            self._until = max(self._until, self.clock() + seconds)
+
+    def wait(self):
+        """Blocks until the current pause, if any, is over."""
+        while True:
+            with self._lock:
+                remaining = self._until - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(remaining)
+
+
+def is_transient(error):
+    """Returns whether `error` is worth a retry: connection errors, timeouts,
+    rate limits and 5xx. Other server errors, e.g 401 or 422, are permanent.
+
+    """
+    if isinstance(error, (ApiConnectionError, RateLimited)):
+        return True
+    return isinstance(error, ServerError) and error.status >= 500
+
+
+def retrying(func, transient, retries=DEFAULT_RETRIES,
+             delay=DEFAULT_RETRY_DELAY, throttle=None):
+    """Returns a wrapper of `func` which retries calls failing with one of the
+    `transient` errors, with exponential backoff. A `RateLimited` error pauses
+    `throttle`, so that all threads sharing it back off together, for at least
+    as long as the API asked for.
+
+    :param func: A callable taking a single item.
+    :param transient: A tuple of the exception classes to retry on, or a
+    function taking an exception and returning whether to retry it, e.g
+    `is_transient`.
+    :param retries: How many times a call is retried before giving up.
+    :param delay: The delay before the first retry, in seconds.
+    :param throttle: An optional `Throttle` shared between threads.
+
+    """
+    if throttle is None:
+        throttle = Throttle()
+    if isinstance(transient, tuple):
+        should_retry = lambda e: isinstance(e, transient)
+    else:
+        should_retry = transient
+
+    def call(item):
+        attempt = 0
+        while True:
+            throttle.wait()
+            try:
+                return func(item)
+            except Exception as e:
+                if not should_retry(e) or attempt >= retries:
+                    raise
+                backoff = delay * 2 ** attempt
+                if isinstance(e, RateLimited):
+                    backoff = max(backoff, e.retry_after or 0)
+                    throttle.pause(backoff)
+                else:
+                    throttle.sleep(backoff)
+                attempt += 1
+
+    return call
+
+
+class BatchReport(object):
+    """The outcome of a batch of calls, see `run_batch`."""
+
+    def __init__(self):
+        # `(item, result)` tuples, in completion order.
+        self.succeeded = []
+        # `(item, error)` tuples, in completion order.
+        self.failed = []
+
+    def __len__(self):
+        return len(self.succeeded) + len(self.failed)
+
+    def __repr__(self):
+        return "BatchReport(succeeded={0}, failed={1})".format(
+            len(self.succeeded), len(self.failed))
+
+    @property
+    def ok(self):
+        return not self.failed
+
+    def raise_first(self):
+        """Re-raises the first error, if any."""
+        if self.failed:
+            raise self.failed[0][1]
+
+
+def run_batch(func, items, workers=DEFAULT_WORKERS, report=None):
+    """Calls `func` on every item of `items` from a pool of threads. Unlike
+    `map_concurrently`, errors do not stop the batch: every item ends up in
+    either the succeeded or the failed list of the returned `BatchReport`.
+
+    :param func: A callable taking a single item.
+    :param items: An iterable of items.
+    :param workers: The number of threads to use.
+    :param report: An optional (subclass of) `BatchReport` to fill in.
+
+    """
+    if report is None:
+        report = BatchReport()
+    for item, result, error in imap_unordered(func, items, workers):
+        if error is None:
+            report.succeeded.append((item, result))
+        else:
+            report.failed.append((item, error))
+    return report
+
+
+__all__ = ['imap_unordered', 'map_concurrently', 'run_batch', 'retrying',
+           'is_transient', 'BatchReport', 'Throttle']
@@ -0,0 +1,157 @@
+"""
+tictail.diff
+~~~~~~~~~~~~
+
+Change detection between snapshots of a collection. Every item is reduced to a
+short content hash, so comparing two snapshots only compares hashes and items
+that did not change are never compared in depth. The hashes of the last
+snapshot can be kept in a `HashIndex` file, which is all that is needed to
+diff against it later.
+
+This is the only way to find changed products and followers, which cannot be
+fetched by `modified_after`.
+
+"""
+import hashlib
+import os
+
+from .importer import json
+from .resource.base import to_json_value
+
+
+# The number of hex digits of a content hash kept, i.e 64 bits.
+HASH_LENGTH = 16
+
+
+def _data(item):
+    to_dict = getattr(item, 'to_dict', None)
+    return to_dict() if to_dict is not None else item
+
+
+def content_hash(item):
+    """Returns a hash of the content of a resource or dict. Equal content
+    hashes equally, regardless of key order.
+
+    :param item: A resource or a dict.
+
+    """
+    encoded = json.dumps(to_json_value(_data(item)), sort_keys=True,
+                         separators=(',', ':'))
+    if isinstance(encoded, unicode):
+        encoded = encoded.encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:HASH_LENGTH]
+
+
+def _key(item, identifier):
+    return unicode(_data(item)[identifier])
+
+
+class HashIndex(dict):
+    """A dict of item ids and content hashes, which can be saved to a file."""
+
+    @classmethod
+    def build(cls, items, identifier='id'):
+        """Returns the index of `items`.
+
+        :param items: An iterable of resources or dicts.
+        :param identifier: The name of the primary key.
+
+        """
+        return cls((_key(item, identifier), content_hash(item))
+                   for item in items)
+
+    @classmethod
+    def load(cls, path):
+        """Returns the index saved at `path`, or an empty index if there is
+        no such file.
+
+        """
+        try:
+            with open(path) as fd:
+                return cls(json.load(fd))
+        except IOError:
+            return cls()
+
+    def save(self, path):
+        """Saves the index to `path`, atomically."""
+        tmp_path = "{0}.tmp".format(path)
+        with open(tmp_path, 'w') as fd:
+            json.dump(self, fd, separators=(',', ':'))
+            fd.flush()
+            os.fsync(fd.fileno())
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+
+
+class SnapshotDiff(object):
+    """The changes between two snapshots."""
+
+    def __init__(self, created, modified, deleted, index):
+        # Items which are new in the second snapshot.
+        self.created = created
+        # Items whose content changed.
+        self.modified = modified
+        # Ids of items which are missing from the second snapshot.
+        self.deleted = deleted
+        # The `HashIndex` of the second snapshot.
+        self.index = index
+
+    def __nonzero__(self):
+        return bool(self.created or self.modified or self.deleted)
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return "SnapshotDiff(created={0}, modified={1}, deleted={2})".format(
+            len(self.created), len(self.modified), len(self.deleted))
+
+
+def diff(old, new, identifier='id'):
+    """Compares two snapshots of a collection. Returns a `SnapshotDiff`.
+
+    :param old: The earlier snapshot, as a `HashIndex` or an iterable of
+    resources or dicts.
+    :param new: The later snapshot, an iterable of resources or dicts. It is
+    consumed once, so it can be a generator, e.g `collection.iterate()`.
+    :param identifier: The name of the primary key.
+
+    """
+    if not isinstance(old, HashIndex):
+        old = HashIndex.build(old, identifier)
+
+    index = HashIndex()
+    created = []
+    modified = []
+    for item in new:
+        key = _key(item, identifier)
+        digest = index[key] = content_hash(item)
+        previous = old.get(key)
+        if previous is None:
+            created.append(item)
+        elif previous != digest:
+            modified.append(item)
+
+    deleted = sorted(key for key in old if key not in index)
+    return SnapshotDiff(created, modified, deleted, index)
+
+
+def diff_collection(collection, path, **params):
+    """Diffs the current content of `collection` against the index saved at
+    `path`, and saves the index of the current content there. On the first
+    run every item is reported as created.
+
+    :param collection: A collection with the `List` capability.
+    :param path: The path of the index file.
+    :param params: Query parameters for `iterate`.
+
+    """
+    identifier = collection.resource.identifier
+    changes = diff(HashIndex.load(path), collection.iterate(**params),
+                   identifier)
+    changes.index.save(path)
+    return changes
+
+
+__all__ = ['HashIndex', 'SnapshotDiff', 'content_hash', 'diff',
+           'diff_collection']
@@ -13,6 +13,11 @@ class ApiConnectionError(Exception):
     pass
 
 
+class ApiTimeout(ApiConnectionError):
+    """Thrown if the API did not respond within the configured timeout."""
+    pass
+
+
 class ApiError(Exception):
     """Base class for all HTTP errors."""
     def __init__(self, message, status, raw, json=None):
@@ -60,7 +65,18 @@ class ServerError(ApiError):
     pass
 
 
+class RateLimited(ServerError):
+    """Thrown for 429 errors, i.e too many requests. The request was not
+    processed and can safely be retried after `retry_after` seconds, if the
+    API said when.
+
+    """
+    def __init__(self, message, status, raw, json=None, retry_after=None):
+        super(RateLimited, self).__init__(message, status, raw, json=json)
+        self.retry_after = retry_after
+
+
 __all__ = [
-    'ApiError', 'ApiConnectionError', 'Forbidden', 'NotFound',
-    'BadRequest', 'ServerError'
+    'ApiError', 'ApiConnectionError', 'ApiTimeout', 'Forbidden', 'NotFound',
+    'BadRequest', 'ServerError', 'RateLimited'
 ]
@@ -0,0 +1,242 @@
+"""
+tictail.export
+~~~~~~~~~~~~~~
+
+Streaming export of store collections to NDJSON and CSV files. Resources are
+written out as they are fetched, one page at a time, so memory use does not
+grow with the size of the store.
+
+Exports can be resumed: if a checkpoint store is given, the cursor and the
+size of the output file are saved every `checkpoint_every` resources, and an
+interrupted export continues from the last checkpoint.
+
+"""
+import csv
+import gzip
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from .importer import json
+from .resource.base import DEFAULT_PAGE_LIMIT, lookup_path, to_json_value
+
+
+# Collections exported by `export_store`.
+EXPORTABLE = ('products', 'orders', 'customers', 'followers')
+
+# Supported output formats.
+FORMATS = ('ndjson', 'csv')
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return to_json_value(value)
+    raise TypeError("{0!r} is not JSON serializable".format(value))
+
+
+def _dumps(value):
+    return json.dumps(value, default=_default, sort_keys=True)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class NdjsonWriter(object):
+    """Writes one JSON object per line.
+
+    Writers take a file-like object and the list of columns to export, which
+    may be None for writers that do not need it.
+
+    """
+
+    def __init__(self, fd, columns=None):
+        self.fd = fd
+        self.columns = columns
+
+    def write_header(self):
+        pass
+
+    def write(self, data):
+        if self.columns:
+            data = dict((c, lookup_path(data, c)) for c in self.columns)
+        self.fd.write(_dumps(data))
+        self.fd.write('\n')
+
+
+class CsvWriter(object):
+    """Writes one row per resource. Nested values are JSON encoded."""
+
+    def __init__(self, fd, columns):
+        self.fd = fd
+        self.columns = columns
+        self.writer = csv.writer(fd)
+
+    def write_header(self):
+        self.writer.writerow(self.columns)
+
+    def write(self, data):
+        self.writer.writerow([_csv_value(lookup_path(data, c)) for c in self.columns])
+
+
+class _Output(object):
+    """An output file which can be truncated to a known good offset. Gzipped
+    output is written as one gzip member per checkpoint, so that truncating the
+    file always leaves a valid gzip stream behind.
+
+    """
+
+    def __init__(self, path, compress=False, offset=None):
+        if offset is None:
+            self.raw = open(path, 'wb')
+        else:
+            self.raw = open(path, 'r+b')
+            self.raw.truncate(offset)
+            self.raw.seek(offset)
+        self.compress = compress
+        self.fd = self._wrap()
+
+    def _wrap(self):
+        if self.compress:
+            return gzip.GzipFile(fileobj=self.raw, mode='wb')
+        return self.raw
+
+    def write(self, value):
+        self.fd.write(value)
+
+    def sync(self):
+        """Flushes everything written so far and returns the file offset."""
+        if self.compress:
+            self.fd.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        offset = self.raw.tell()
+        if self.compress:
+            self.fd = self._wrap()
+        return offset
+
+    def close(self):
+        if self.compress:
+            self.fd.close()
+        self.raw.close()
+
+
+def export_collection(collection, path, format='ndjson', columns=None,
+                      compress=False, checkpoints=None, checkpoint_every=None,
+                      limit=DEFAULT_PAGE_LIMIT, writer=None, **params):
+    """Streams every resource of `collection` to the file at `path`. Returns
+    the total number of exported resources.
+
+    :param collection: A collection with the `List` capability.
+    :param path: The output path.
+    :param format: Either 'ndjson' or 'csv'.
+    :param columns: An optional list of (dotted) keys to export. Required
+    for CSV unless the keys of the first resource should be used.
+    :param compress: If set, the output is gzipped.
+    :param checkpoints: An optional checkpoint store, see `tictail.sync`.
+    :param checkpoint_every: How many resources to write between checkpoints.
+    Defaults to `limit`.
+    :param limit: The page size.
+    :param writer: An optional writer class, overrides `format`.
+    :param params: Extra query parameters for the collection.
+
+    """
+    if writer is None:
+        if format not in FORMATS:
+            raise ValueError("Unknown format `{0}`.".format(format))
+        writer = CsvWriter if format == 'csv' else NdjsonWriter
+    checkpoint_every = checkpoint_every or limit
+
+    key = "{0}:{1}".format(collection.uri, path)
+    checkpoint = checkpoints.load(key) if checkpoints else None
+    if checkpoint:
+        count = checkpoint['count']
+        columns = checkpoint['columns']
+        params['after'] = checkpoint['after']
+        output = _Output(path, compress, checkpoint['offset'])
+    else:
+        count = 0
+        output = _Output(path, compress)
+
+    # The header has already been written if we are resuming.
+    out = writer(output, columns) if checkpoint else None
+
+    try:
+        pending = 0
+        for resource in collection.iterate(limit=limit, raw=False, **params):
+            data = resource.to_dict()
+            if out is None:
+                if columns is None and writer is CsvWriter:
+                    columns = sorted(data.keys())
+                out = writer(output, columns)
+                out.write_header()
+            out.write(data)
+
+            count += 1
+            pending += 1
+
+            if checkpoints and pending >= checkpoint_every:
+                offset = output.sync()
+                checkpoints.save(key, {
+                    'after': resource.pk,
+                    'count': count,
+                    'columns': columns,
+                    'offset': offset
+                })
+                pending = 0
+    finally:
+        output.close()
+
+    if checkpoints:
+        checkpoints.save(key, None)
+
+    return count
+
+
+def export_store(store, directory, collections=EXPORTABLE, format='ndjson',
+                 columns=None, compress=False, checkpoints=None, **kwargs):
+    """Exports the given collections of a store to `directory`, one file per
+    collection. Returns a dict of collection names and exported counts.
+
+    :param store: A `Store`.
+    :param directory: The output directory.
+    :param collections: The names of the collections to export.
+    :param format: Either 'ndjson' or 'csv'.
+    :param columns: An optional dict of collection names and columns.
+    :param compress: If set, the output files are gzipped.
+    :param checkpoints: An optional checkpoint store, see `tictail.sync`.
+    :param kwargs: Passed through to `export_collection`.
+
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    counts = {}
+    for name in collections:
+        filename = "{0}.{1}{2}".format(name, format, '.gz' if compress else '')
+        counts[name] = export_collection(
+            getattr(store, name),
+            os.path.join(directory, filename),
+            format=format,
+            columns=(columns or {}).get(name),
+            compress=compress,
+            checkpoints=checkpoints,
+            **kwargs
+        )
+    return counts
+
+
+__all__ = [
+    'NdjsonWriter', 'CsvWriter', 'export_collection', 'export_store',
+    'EXPORTABLE', 'FORMATS'
+]
@@ -3,13 +3,20 @@ tictail.importer
 ~~~~~~~~~~~~~~~~
 
 Imports various needed dependencies with fallbacks. Provides some help with
-installing missing dependencies.
+installing missing dependencies. Heavy dependencies are imported lazily, on
+first use, to keep `import tictail` fast.
 
 Dependencies:
   * json/simplejson
-  * requests
+  * requests (lazy)
+  * python-dateutil (lazy)
+
+Optional dependencies:
+  * numpy
 
 """
+import sys
+
 
 def raise_import_error_with_hint(dep):
     """Raises an import error and gives a helpful message for installing the
@@ -25,11 +32,67 @@ def raise_import_error_with_hint(dep):
                        .format(dep))
 
 
-# Try to import `requests`.
-try:
-    import requests
-except ImportError:
-    raise_import_error_with_hint('requests')
+def import_optional(name):
+    """Imports an optional dependency. Returns the module, or None if it is
+    not installed.
+
+    :param name: the name of the module.
+
+    """
+    try:
+        return __import__(name)
+    except ImportError:
+        return None
+
+
+class LazyModule(object):
+    """Stands in for a module which is imported on first attribute access."""
+
+    def __init__(self, name, dep=None):
+        """Initializes the lazy module.
+
+        :param name: the name of the module, e.g 'dateutil.parser'.
+        :param dep: the name of the package providing it, for the hint given
+        when it is missing.
+
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_dep'] = dep or name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            try:
+                __import__(self._name)
+                module = sys.modules[self._name]
+            except ImportError:
+                raise_import_error_with_hint(self._dep)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, k):
+        return getattr(self._load(), k)
+
+    def __repr__(self):
+        return "<lazy module '{0}'>".format(self._name)
+
+
+def lazy_import(name, dep=None):
+    """Returns a `LazyModule` for `name`. Modules which are imported already
+    are returned as they are.
+
+    :param name: the name of the module.
+    :param dep: the name of the package providing it.
+
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name, dep)
+
+
+# `requests` (and whatever it pulls in, like pyOpenSSL) is only imported when
+# the first request is made.
+requests = lazy_import('requests')
 
 
 # Try to import `json` and fallback to `simplejson` if not available.
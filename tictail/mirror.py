@@ -0,0 +1,298 @@
+"""
+tictail.mirror
+~~~~~~~~~~~~~~
+
+A local SQLite replica of a store. A `StoreMirror` is filled by full loads
+through the store's collections, and orders are kept current with incremental
+`modified_after` fetches. Lookups and queries against the mirror return
+resources without making any requests.
+
+Resources are stored as the JSON returned by the API, next to indexed columns
+for their id, timestamps, status and (for products) categories.
+
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+from .importer import json
+from .resource.base import DEFAULT_PAGE_LIMIT, lookup_path, parse_datetime
+
+
+# The collections of a store that can be mirrored.
+MIRRORABLE = ('products', 'orders', 'customers', 'followers', 'categories')
+
+# Collections which can be fetched by `modified_after`. Everything else is
+# reloaded in full on refresh.
+INCREMENTAL = ('orders',)
+
+# Paths of the status of a resource, by collection.
+STATUS_PATHS = {
+    'products': 'status',
+    'orders': 'transaction.status'
+}
+
+# Incremental fetches start this long before the last seen `modified_at`.
+DEFAULT_LOOKBACK = timedelta(seconds=1)
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS tictail_resources ('
+    ' collection TEXT NOT NULL,'
+    ' id TEXT NOT NULL,'
+    ' created_at TEXT,'
+    ' modified_at TEXT,'
+    ' status TEXT,'
+    ' data TEXT NOT NULL,'
+    ' PRIMARY KEY (collection, id))',
+    'CREATE INDEX IF NOT EXISTS tictail_resources_created_at'
+    ' ON tictail_resources (collection, created_at)',
+    'CREATE INDEX IF NOT EXISTS tictail_resources_modified_at'
+    ' ON tictail_resources (collection, modified_at)',
+    'CREATE INDEX IF NOT EXISTS tictail_resources_status'
+    ' ON tictail_resources (collection, status)',
+    'CREATE TABLE IF NOT EXISTS tictail_resource_categories ('
+    ' collection TEXT NOT NULL,'
+    ' id TEXT NOT NULL,'
+    ' category_id TEXT NOT NULL,'
+    ' PRIMARY KEY (collection, id, category_id))',
+    'CREATE INDEX IF NOT EXISTS tictail_resource_categories_category'
+    ' ON tictail_resource_categories (collection, category_id)',
+    'CREATE TABLE IF NOT EXISTS tictail_mirror_state ('
+    ' collection TEXT PRIMARY KEY,'
+    ' loaded_at TEXT NOT NULL,'
+    ' watermark TEXT)',
+)
+
+# Columns results can be ordered by.
+ORDERABLE = ('id', 'created_at', 'modified_at', 'status')
+
+
+def _timestamp(value):
+    if value is None or isinstance(value, basestring):
+        return value
+    return value.isoformat()
+
+
+class StoreMirror(object):
+    """Mirrors the collections of a store into a SQLite database."""
+
+    def __init__(self, store, path, collections=MIRRORABLE,
+                 limit=DEFAULT_PAGE_LIMIT, lookback=DEFAULT_LOOKBACK):
+        """Initializes the mirror and creates its tables if needed.
+
+        :param store: The `Store` to mirror.
+        :param path: The path of the database file, or ':memory:'.
+        :param collections: The names of the collections to mirror.
+        :param limit: The page size for loading collections.
+        :param lookback: A `timedelta`, how far before the last seen
+        `modified_at` incremental fetches start.
+
+        """
+        for name in collections:
+            if name not in MIRRORABLE:
+                raise ValueError("cannot mirror `{0}`".format(name))
+
+        self.store = store
+        self.path = path
+        self.collections = tuple(collections)
+        self.limit = limit
+        self.lookback = lookback
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def _collection(self, name):
+        if name not in self.collections:
+            raise ValueError("`{0}` is not mirrored".format(name))
+        return getattr(self.store, name)
+
+    def _rows(self, name, identifier, items):
+        status_path = STATUS_PATHS.get(name)
+        for data in items:
+            status = lookup_path(data, status_path) if status_path else None
+            yield (name, unicode(data[identifier]),
+                   _timestamp(data.get('created_at')),
+                   _timestamp(data.get('modified_at')),
+                   status, json.dumps(data))
+
+    def _category_rows(self, name, identifier, items):
+        for data in items:
+            for category in data.get('categories') or ():
+                yield (name, unicode(data[identifier]),
+                       unicode(category['id']))
+
+    def _upsert(self, name, items):
+        identifier = self._collection(name).resource.identifier
+        self.connection.executemany(
+            'DELETE FROM tictail_resource_categories'
+            ' WHERE collection = ? AND id = ?',
+            [(name, unicode(data[identifier])) for data in items])
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO tictail_resources'
+            ' (collection, id, created_at, modified_at, status, data)'
+            ' VALUES (?, ?, ?, ?, ?, ?)', self._rows(name, identifier, items))
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO tictail_resource_categories'
+            ' (collection, id, category_id) VALUES (?, ?, ?)',
+            self._category_rows(name, identifier, items))
+
+    def _save_state(self, name, watermark):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO tictail_mirror_state'
+            ' (collection, loaded_at, watermark) VALUES (?, ?, ?)',
+            (name, datetime.utcnow().isoformat(), _timestamp(watermark)))
+
+    def _watermark(self, name):
+        row = self.connection.execute(
+            'SELECT MAX(modified_at) FROM tictail_resources'
+            ' WHERE collection = ?', (name,)).fetchone()
+        return row[0]
+
+    def state(self, name):
+        """Returns a tuple of when `name` was last loaded and the latest
+        `modified_at` seen, or None if it has never been loaded.
+
+        """
+        row = self.connection.execute(
+            'SELECT loaded_at, watermark FROM tictail_mirror_state'
+            ' WHERE collection = ?', (name,)).fetchone()
+        return tuple(row) if row else None
+
+    def load(self, collections=None):
+        """Replaces the mirrored data with a full load of the given
+        collections. Returns a dict of the number of resources loaded, by
+        collection.
+
+        :param collections: The names of the collections to load. Defaults to
+        all mirrored collections.
+
+        """
+        counts = {}
+        for name in collections or self.collections:
+            items = list(self._collection(name).iterate(limit=self.limit,
+                                                        raw=True))
+            with self.connection:
+                self.connection.execute(
+                    'DELETE FROM tictail_resources WHERE collection = ?',
+                    (name,))
+                self.connection.execute(
+                    'DELETE FROM tictail_resource_categories'
+                    ' WHERE collection = ?', (name,))
+                self._upsert(name, items)
+                self._save_state(name, self._watermark(name))
+            counts[name] = len(items)
+        return counts
+
+    def refresh(self, collections=None):
+        """Brings the given collections up to date. Orders are fetched by
+        `modified_after` the latest mirrored `modified_at`, everything else
+        (and collections that were never loaded) is loaded in full. Returns a
+        dict of the number of resources fetched, by collection.
+
+        :param collections: The names of the collections to refresh. Defaults
+        to all mirrored collections.
+
+        """
+        counts = {}
+        for name in collections or self.collections:
+            state = self.state(name)
+            if name not in INCREMENTAL or state is None or state[1] is None:
+                counts.update(self.load([name]))
+                continue
+
+            watermark = parse_datetime(state[1])
+            params = {
+                'limit': self.limit,
+                'raw': True,
+                'modified_after': watermark - self.lookback
+            }
+            items = list(self._collection(name).iterate(**params))
+            with self.connection:
+                self._upsert(name, items)
+                self._save_state(name, self._watermark(name))
+            counts[name] = len(items)
+        return counts
+
+    def _instantiate(self, name, rows):
+        collection = self._collection(name)
+        return collection.instantiate_from_data(
+            [json.loads(row[0]) for row in rows])
+
+    def get(self, name, id):
+        """Returns a mirrored resource by id, or None.
+
+        :param name: The name of the collection, e.g 'products'.
+        :param id: The id of the resource.
+
+        """
+        row = self.connection.execute(
+            'SELECT data FROM tictail_resources'
+            ' WHERE collection = ? AND id = ?', (name, unicode(id))).fetchone()
+        if row is None:
+            return None
+        return self._instantiate(name, [row])[0]
+
+    def query(self, name, status=None, category=None, created_after=None,
+              created_before=None, modified_after=None, modified_before=None,
+              order_by='created_at', descending=False, limit=None):
+        """Returns the mirrored resources of a collection matching all of the
+        given filters, as resources.
+
+        :param name: The name of the collection, e.g 'products'.
+        :param status: Only return resources with this status.
+        :param category: Only return products in the category with this id.
+        :param created_after: A `datetime` or ISO 8601 string, exclusive.
+        :param created_before: A `datetime` or ISO 8601 string, exclusive.
+        :param modified_after: A `datetime` or ISO 8601 string, exclusive.
+        :param modified_before: A `datetime` or ISO 8601 string, exclusive.
+        :param order_by: One of `ORDERABLE`.
+        :param descending: Whether to sort in descending order.
+        :param limit: The maximum number of resources to return.
+
+        """
+        if order_by not in ORDERABLE:
+            raise ValueError("cannot order by `{0}`".format(order_by))
+
+        sql = ['SELECT r.data FROM tictail_resources r']
+        args = []
+        if category is not None:
+            sql.append('JOIN tictail_resource_categories c'
+                       ' ON c.collection = r.collection AND c.id = r.id'
+                       ' AND c.category_id = ?')
+            args.append(unicode(category))
+        sql.append('WHERE r.collection = ?')
+        args.append(name)
+
+        filters = [
+            ('r.status = ?', status),
+            ('r.created_at > ?', _timestamp(created_after)),
+            ('r.created_at < ?', _timestamp(created_before)),
+            ('r.modified_at > ?', _timestamp(modified_after)),
+            ('r.modified_at < ?', _timestamp(modified_before))
+        ]
+        for clause, value in filters:
+            if value is not None:
+                sql.append('AND ' + clause)
+                args.append(value)
+
+        sql.append("ORDER BY r.{0} {1}".format(
+            order_by, 'DESC' if descending else 'ASC'))
+        if limit is not None:
+            sql.append('LIMIT ?')
+            args.append(limit)
+
+        rows = self.connection.execute(' '.join(sql), args).fetchall()
+        return self._instantiate(name, rows)
+
+    def count(self, name):
+        """Returns the number of mirrored resources of a collection."""
+        row = self.connection.execute(
+            'SELECT COUNT(*) FROM tictail_resources WHERE collection = ?',
+            (name,)).fetchone()
+        return row[0]
+
+    def close(self):
+        self.connection.close()
+
+
+__all__ = ['StoreMirror']
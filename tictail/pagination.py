@@ -0,0 +1,181 @@
+"""
+tictail.pagination
+~~~~~~~~~~~~~~~~~~
+
+Adaptive page sizes for paginated reads. A `PageSizeController` picks the
+`limit` of the next page from the latency and error rate of the previous ones:
+pages grow while the time per resource stays flat, and shrink when a page is
+too slow, times out or fails with a server error.
+
+"""
+import time
+
+from .errors import ApiConnectionError, ServerError
+
+
+# Bounds for the page size.
+DEFAULT_MIN_LIMIT = 10
+DEFAULT_MAX_LIMIT = 500
+
+# A page taking longer than this (in seconds) is considered too slow.
+DEFAULT_MAX_LATENCY = 5.0
+
+# Pages stop growing once the time per resource exceeds the best observed time
+# per resource by this factor, i.e latency no longer grows linearly.
+DEFAULT_LINEARITY = 1.5
+
+# How many times a page is retried with a smaller size before giving up.
+DEFAULT_MAX_RETRIES = 3
+
+# After this many pages without errors, page sizes that once failed or were
+# too slow are tried again.
+DEFAULT_RECOVERY = 20
+
+
+class PageSizeController(object):
+    """Tunes the page size of a paginated read."""
+
+    def __init__(self, limit, min_limit=DEFAULT_MIN_LIMIT,
+                 max_limit=DEFAULT_MAX_LIMIT, max_latency=DEFAULT_MAX_LATENCY,
+                 linearity=DEFAULT_LINEARITY, growth=2.0, backoff=0.5,
+                 max_retries=DEFAULT_MAX_RETRIES, recovery=DEFAULT_RECOVERY,
+                 clock=time.time):
+        """Initializes the controller.
+
+        :param limit: The initial page size.
+        :param min_limit: The smallest page size.
+        :param max_limit: The largest page size.
+        :param max_latency: The slowest acceptable page, in seconds.
+        :param linearity: How much the time per resource may grow before pages
+        stop growing.
+        :param growth: The factor to grow pages by.
+        :param backoff: The factor to shrink pages by.
+        :param max_retries: How many times a failed page is retried.
+        :param recovery: How many pages without errors it takes before a
+        page size that was too slow is tried again.
+        :param clock: A function returning the current time in seconds.
+
+        """
+        if not 0 < min_limit <= max_limit:
+            raise ValueError('`min_limit` must be between 1 and `max_limit`')
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        # The largest page the API returns. A short page is only taken for a
+        # cap once the page after it turns out not to be empty, as it is
+        # usually the last one.
+        self.api_limit = None
+        self._short_page = None
+        self.limit = self._clamp(limit)
+        self.max_latency = max_latency
+        self.linearity = linearity
+        self.growth = growth
+        self.backoff = backoff
+        self.max_retries = max_retries
+        self.recovery = recovery
+        self.clock = clock
+
+        # The best observed time per resource, in seconds.
+        self.best_per_item = None
+        # The largest page size to try, lowered after slow or failed pages.
+        self.ceiling = max_limit
+
+        self.pages = 0
+        self.errors = 0
+        self.streak = 0
+
+    def _clamp(self, limit):
+        max_limit = self.max_limit
+        if self.api_limit is not None:
+            max_limit = min(max_limit, self.api_limit)
+        return max(self.min_limit, min(max_limit, int(limit)))
+
+    def _back_off(self, limit, factor):
+        # Shrinks the page size and caps it there until `recovery` pages
+        # have been fetched without trouble.
+        self.limit = self.ceiling = self._clamp(limit * factor)
+        self.streak = 0
+
+    @property
+    def error_rate(self):
+        attempts = self.pages + self.errors
+        return float(self.errors) / attempts if attempts else 0.0
+
+    def record_success(self, limit, count, latency):
+        """Adjusts the page size after a successful page.
+
+        :param limit: The page size that was requested.
+        :param count: The number of resources in the page.
+        :param latency: The time it took to fetch the page, in seconds.
+
+        """
+        self.pages += 1
+        self.streak += 1
+        if self.streak >= self.recovery:
+            self.ceiling = self.max_limit
+
+        if self._short_page is not None and count:
+            self.api_limit = max(self.min_limit, self._short_page)
+        self._short_page = None
+
+        if latency > self.max_latency:
+            self._back_off(limit, self.backoff)
+            return
+
+        # Only full pages tell us something about larger pages. A short page
+        # is either the last one or capped by the API, so the next page is no
+        # larger.
+        if count < limit or not count:
+            if count:
+                self._short_page = count
+                self.limit = self._clamp(count)
+            return
+
+        per_item = latency / count
+        if self.best_per_item is None or per_item < self.best_per_item:
+            self.best_per_item = per_item
+
+        if per_item > self.best_per_item * self.linearity:
+            # Latency grows faster than the page, go back to the last size
+            # and stay there.
+            self._back_off(limit, 1.0 / self.growth)
+        else:
+            self.limit = self._clamp(min(limit * self.growth, self.ceiling))
+
+    def record_failure(self, limit):
+        """Shrinks the page size after a timeout or a server error.
+
+        :param limit: The page size that was requested.
+
+        """
+        self.errors += 1
+        self._back_off(limit, self.backoff)
+
+    def fetch(self, fetch_page):
+        """Fetches a page with the current page size, retrying with smaller
+        pages after timeouts and server errors. Returns the page and the page
+        size it was fetched with.
+
+        :param fetch_page: A function taking a page size and returning a list.
+
+        """
+        retries = 0
+        while True:
+            limit = self.limit
+            started = self.clock()
+            try:
+                page = fetch_page(limit)
+            except (ApiConnectionError, ServerError) as e:
+                # Only timeouts, connection errors and 5xx are worth a retry.
+                if getattr(e, 'status', 500) < 500:
+                    raise
+                self.record_failure(limit)
+                retries += 1
+                if retries > self.max_retries:
+                    raise
+                continue
+            self.record_success(limit, len(page), self.clock() - started)
+            return page, limit
+
+
+__all__ = ['PageSizeController']
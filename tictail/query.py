@@ -0,0 +1,263 @@
+"""
+tictail.query
+~~~~~~~~~~~~~
+
+In-memory queries over a snapshot of a collection:
+
+    >>> products = store.products.snapshot()
+    >>> products.where(category='aVr', price__lt=100).order_by('-created_at')
+
+Filters are answered from indexes which are built the first time a field is
+filtered on and reused by every later query against the same snapshot:
+equality and `in` filters use a hash index, range filters a sorted index
+searched by bisection.
+
+"""
+import bisect
+
+
+# Filter operators, the part after `__` in a filter name.
+OPERATORS = ('eq', 'in', 'lt', 'lte', 'gt', 'gte')
+
+
+def extract(item, path):
+    """Returns the values at the dotted `path` of `item` as a list. A '*' in
+    the path matches every item of a list, e.g 'categories.*.id'.
+
+    :param item: A resource or a dict.
+    :param path: A dotted path.
+
+    """
+    values = [item]
+    for key in path.split('.'):
+        found = []
+        for value in values:
+            if key == '*':
+                if isinstance(value, list):
+                    found.extend(value)
+                continue
+            try:
+                found.append(value[key])
+            except (KeyError, TypeError, IndexError):
+                pass
+        values = found
+    return values
+
+
+def _parse_filter(name):
+    field, _, op = name.rpartition('__')
+    if not field:
+        return name, 'eq'
+    if op not in OPERATORS:
+        raise ValueError("unknown filter operator `{0}` in `{1}`".format(
+            op, name))
+    return field, op
+
+
+class Snapshot(object):
+    """A fixed list of resources with lazily built indexes."""
+
+    def __init__(self, items, aliases=None):
+        """Initializes the snapshot.
+
+        :param items: A list of resources (or dicts).
+        :param aliases: A dict of field names and the paths they stand for,
+        e.g {'category': 'categories.*.id'}.
+
+        """
+        self.items = list(items)
+        self.aliases = aliases or {}
+        self._hash_indexes = {}
+        self._sorted_indexes = {}
+        self._ranks = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def values(self, position, field):
+        """Returns the values of `field` for the item at `position`."""
+        path = self.aliases.get(field, field)
+        return extract(self.items[position], path)
+
+    def hash_index(self, field):
+        """Returns a dict of the values of `field` and the positions of the
+        items having them.
+
+        """
+        index = self._hash_indexes.get(field)
+        if index is None:
+            index = {}
+            for position in xrange(len(self.items)):
+                for value in self.values(position, field):
+                    try:
+                        index.setdefault(value, []).append(position)
+                    except TypeError:
+                        # Unhashable values, e.g nested dicts, cannot be
+                        # matched by equality.
+                        pass
+            self._hash_indexes[field] = index
+        return index
+
+    def sorted_index(self, field):
+        """Returns a tuple of the sorted non-null values of `field` and the
+        positions of the items having them, in the same order.
+
+        """
+        index = self._sorted_indexes.get(field)
+        if index is None:
+            pairs = []
+            for position in xrange(len(self.items)):
+                for value in self.values(position, field):
+                    if value is not None:
+                        pairs.append((value, position))
+            pairs.sort()
+            index = ([p[0] for p in pairs], [p[1] for p in pairs])
+            self._sorted_indexes[field] = index
+        return index
+
+    def ranks(self, field):
+        """Returns a dict of the positions of the items with a value for
+        `field` and the rank of their smallest value, for sorting. Equal
+        values share a rank.
+
+        """
+        ranks = self._ranks.get(field)
+        if ranks is None:
+            values, positions = self.sorted_index(field)
+            ranks = {}
+            rank = 0
+            for i, position in enumerate(positions):
+                if i and values[i] != values[i - 1]:
+                    rank = i
+                ranks.setdefault(position, rank)
+            self._ranks[field] = ranks
+        return ranks
+
+    def positions(self, field, op, value):
+        """Returns the set of positions of the items matching a filter."""
+        if op == 'eq':
+            return set(self.hash_index(field).get(value, ()))
+        if op == 'in':
+            index = self.hash_index(field)
+            positions = set()
+            for v in value:
+                positions.update(index.get(v, ()))
+            return positions
+
+        values, positions = self.sorted_index(field)
+        if op == 'lt':
+            return set(positions[:bisect.bisect_left(values, value)])
+        if op == 'lte':
+            return set(positions[:bisect.bisect_right(values, value)])
+        if op == 'gt':
+            return set(positions[bisect.bisect_right(values, value):])
+        return set(positions[bisect.bisect_left(values, value):])
+
+    def query(self):
+        return Query(self)
+
+    def where(self, **filters):
+        return self.query().where(**filters)
+
+    def order_by(self, *fields):
+        return self.query().order_by(*fields)
+
+
+class Query(object):
+    """A lazily evaluated, immutable query against a `Snapshot`."""
+
+    def __init__(self, snapshot, filters=(), ordering=(), limit=None):
+        self.snapshot = snapshot
+        self.filters = tuple(filters)
+        self.ordering = tuple(ordering)
+        self._limit = limit
+
+    def _copy(self, **kwargs):
+        attrs = dict(filters=self.filters, ordering=self.ordering,
+                     limit=self._limit)
+        attrs.update(kwargs)
+        return Query(self.snapshot, **attrs)
+
+    def where(self, **filters):
+        """Returns a query for the items also matching all of `filters`.
+        Filters are named `field` or `field__op`, where op is one of
+        `OPERATORS`. Items match if any of the values of a field does.
+
+        """
+        parsed = []
+        for name, value in sorted(filters.iteritems()):
+            field, op = _parse_filter(name)
+            parsed.append((field, op, value))
+        return self._copy(filters=self.filters + tuple(parsed))
+
+    def order_by(self, *fields):
+        """Returns a query ordered by `fields`. Prefix a field with '-' for
+        descending order. Items with several values for a field are ordered by
+        the smallest one, items without a value come last.
+
+        """
+        return self._copy(ordering=fields)
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def _positions(self):
+        snapshot = self.snapshot
+        if not self.filters:
+            return range(len(snapshot))
+
+        # The smallest result first, so that the intersections stay small.
+        matches = [snapshot.positions(*f) for f in self.filters]
+        matches.sort(key=len)
+        positions = matches[0]
+        for match in matches[1:]:
+            if not positions:
+                break
+            positions = positions & match
+        return sorted(positions)
+
+    def _sort(self, positions):
+        snapshot = self.snapshot
+        # Stable sorts, from the last field to the first.
+        for field in reversed(self.ordering):
+            descending = field.startswith('-')
+            ranks = snapshot.ranks(field.lstrip('-'))
+
+            def key(position):
+                rank = ranks.get(position)
+                # Missing values sort last either way.
+                return (rank is None) != descending, rank
+
+            positions.sort(key=key, reverse=descending)
+        return positions
+
+    def positions(self):
+        positions = list(self._positions())
+        if self.ordering:
+            positions = self._sort(positions)
+        if self._limit is not None:
+            positions = positions[:self._limit]
+        return positions
+
+    def all(self):
+        items = self.snapshot.items
+        return [items[p] for p in self.positions()]
+
+    def first(self):
+        positions = self.limit(1).positions()
+        return self.snapshot.items[positions[0]] if positions else None
+
+    def count(self):
+        return len(self._positions())
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self):
+        return self.count()
+
+
+__all__ = ['Snapshot', 'Query', 'extract']
@@ -6,16 +6,131 @@ Definitions for `Resource` and `Collection` with their corresponding capability
 mixins.
 
 """
-from dateutil.parser import parse
+import pprint
+import re
+from datetime import datetime
+from decimal import Decimal
+
+from ..concurrency import (DEFAULT_RETRIES, DEFAULT_WORKERS, BatchReport,
+                           is_transient, retrying, run_batch)
+from ..errors import NotFound, RateLimited
+from ..importer import lazy_import
+from ..pagination import PageSizeController
+from ..query import Snapshot
+from .compact import compact_class
+
+
+# Default page size used when paginating through a collection.
+DEFAULT_PAGE_LIMIT = 100
+
+# Matches the timestamps returned by the API, e.g '2014-04-23T20:25:47.745085'.
+# Anything else is handed to `dateutil`.
+API_DATETIME_RE = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?$'
+)
+
+# The maximum number of parsed datetimes to keep around. Many timestamps in a
+# page of resources are identical, e.g those of the items of an order.
+DATETIME_CACHE_SIZE = 4096
+
+_datetime_cache = {}
+
+# The maximum number of uri prefixes to keep around, see `uri_prefix`.
+URI_CACHE_SIZE = 1024
+
+_uri_prefixes = {}
+
+# Only needed for timestamps in other formats than the API's.
+dateutil_parser = lazy_import('dateutil.parser', 'python-dateutil')
+
+
+def parse(value):
+    return dateutil_parser.parse(value)
+
+
+def _parse_api_datetime(iso8601_string):
+    match = API_DATETIME_RE.match(iso8601_string)
+    if match is None:
+        return parse(iso8601_string)
+
+    year, month, day, hour, minute, second, fraction = match.groups()
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    return datetime(int(year), int(month), int(day),
+                    int(hour), int(minute), int(second), microsecond)
 
 
 def parse_datetime(iso8601_string):
     """Parses an ISO 8601 datetime string and returns a `datetime.datetime`.
 
+    Timestamps in the exact format used by the API are parsed on a fast path,
+    and recently parsed values are cached. `datetime` objects are returned as
+    they are, so that already transformed data can be transformed again.
+
     :param iso8601_string: The string to parse.
 
     """
-    return parse(iso8601_string)
+    if isinstance(iso8601_string, datetime):
+        return iso8601_string
+
+    try:
+        return _datetime_cache[iso8601_string]
+    except KeyError:
+        pass
+
+    value = _parse_api_datetime(iso8601_string)
+    if len(_datetime_cache) >= DATETIME_CACHE_SIZE:
+        _datetime_cache.clear()
+    _datetime_cache[iso8601_string] = value
+    return value
+
+
+def parse_decimal(value):
+    """Converts a number or a numeric string to a `decimal.Decimal`. Can be
+    registered for price fields, see `register_transform`.
+
+    :param value: The value to convert.
+
+    """
+    return Decimal(str(value))
+
+
+# Transforms applied to attribute values, by attribute name.
+TRANSFORMS = {
+    'modified_at': parse_datetime,
+    'created_at': parse_datetime
+}
+
+# Bumped whenever `TRANSFORMS` changes, so that compiled transform plans are
+# rebuilt.
+_transforms_version = [0]
+
+# Compiled transform plans and the version of `TRANSFORMS` they were compiled
+# against, by resource class.
+_transform_plans = {}
+
+
+def register_transform(attr, transform):
+    """Registers a transform for all attributes named `attr`, at any level.
+
+    >>> register_transform('price', parse_decimal)
+
+    :param attr: The attribute name.
+    :param transform: A function taking the raw value and returning the
+    transformed one. It is never called with None.
+
+    """
+    TRANSFORMS[attr] = transform
+    _transforms_version[0] += 1
+
+
+def unregister_transform(attr):
+    """Removes the transform for attributes named `attr`.
+
+    :param attr: The attribute name.
+
+    """
+    TRANSFORMS.pop(attr, None)
+    _transforms_version[0] += 1
 
 
 def transform_attr_value(attr, value):
@@ -30,11 +145,6 @@ def transform_attr_value(attr, value):
     :param value: The value of the attribute to transform.
 
     """
-    transforms = {
-        'modified_at': parse_datetime,
-        'created_at': parse_datetime
-    }
-
     def _transform_dict(value):
         transformed = {}
         for key, nested_value in value.iteritems():
@@ -44,7 +154,7 @@ def transform_attr_value(attr, value):
     if value is None:
         return value
 
-    transform = transforms.get(attr)
+    transform = TRANSFORMS.get(attr)
 
     if transform:
         # If we've found a transform at this level then return the transformed
@@ -66,7 +176,452 @@ def transform_attr_value(attr, value):
     return transformed
 
 
+def to_json_value(value):
+    """Converts a transformed value back to something JSON serializable:
+    `datetime`s become ISO 8601 strings and `Decimal`s numbers.
+
+    :param value: The value to convert.
+
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        if value == value.to_integral_value():
+            return int(value)
+        return float(value)
+    if isinstance(value, dict):
+        return dict((k, to_json_value(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return [to_json_value(v) for v in value]
+    return value
+
+
+def lookup_path(data, path):
+    """Returns the value for a dotted `path` in `data`, e.g
+    'transaction.status', or None if any part of it is missing.
+
+    """
+    value = data
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _projection_tree(fields):
+    # {'id': None, 'transaction': {'status': None}}, where None keeps the
+    # whole value.
+    tree = {}
+    for path in fields:
+        node = tree
+        keys = path.split('.')
+        for key in keys[:-1]:
+            child = node.setdefault(key, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[keys[-1]] = None
+    return tree
+
+
+def _project(value, tree):
+    if isinstance(value, list):
+        return [_project(v, tree) for v in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, child in tree.iteritems():
+        if key in value:
+            v = value[key]
+            projected[key] = v if child is None else _project(v, child)
+    return projected
+
+
+def project(data, fields):
+    """Returns a copy of `data` with only the given fields. Nested fields are
+    selected with dotted paths, e.g 'transaction.status', and apply to every
+    item of the lists they pass through, e.g 'items.quantity'.
+
+    :param data: A data dictionary or a list of data dictionaries.
+    :param fields: A list of (dotted) field names.
+
+    """
+    return _project(data, _projection_tree(fields))
+
+
+def timestamp_paths(*prefixes):
+    """Returns the paths of `created_at` and `modified_at` below each of the
+    given prefixes, for use in `Resource.transform_paths`. An empty prefix
+    stands for the top level.
+
+    :param prefixes: Dotted path prefixes, e.g 'items.*.product'.
+
+    """
+    paths = []
+    for prefix in prefixes:
+        for attr in ('created_at', 'modified_at'):
+            paths.append("{0}.{1}".format(prefix, attr) if prefix else attr)
+    return tuple(paths)
+
+
+class GenericTransformPlan(object):
+    """Transforms every attribute at every level, see `transform_attr_value`.
+    Used for resources which do not declare `transform_paths`.
+
+    """
+
+    def apply(self, data):
+        transformed = {}
+        for k, v in data.iteritems():
+            transformed[k] = transform_attr_value(k, v)
+        return transformed
+
+    def transform_value(self, attr, value):
+        return transform_attr_value(attr, value)
+
+
+class TransformPlan(object):
+    """Transforms only the values at a fixed set of paths.
+
+    Paths are dotted, with '*' standing for every item of a list, e.g
+    'items.*.product.created_at'. The transform for a path is looked up in
+    `TRANSFORMS` by its last key when the plan is compiled, and paths without
+    a transform are dropped.
+
+    Applying a plan copies only the dicts and lists on the way to a value that
+    actually changed. Everything else is shared with the input.
+
+    """
+
+    def __init__(self, paths, transforms=None):
+        """Compiles the plan.
+
+        :param paths: An iterable of dotted paths.
+        :param transforms: A dict of transforms, defaults to `TRANSFORMS`.
+
+        """
+        if transforms is None:
+            transforms = TRANSFORMS
+
+        self.tree = {}
+        for path in paths:
+            keys = path.split('.')
+            transform = transforms.get(keys[-1])
+            if transform is None:
+                continue
+            node = self.tree
+            for key in keys[:-1]:
+                node = node.setdefault(key, {})
+                if not isinstance(node, dict):
+                    raise ValueError("Conflicting transform path `{0}`".format(path))
+            node[keys[-1]] = transform
+
+    def _apply(self, node, value):
+        if isinstance(value, dict):
+            copied = None
+            for key, child in node.iteritems():
+                old = value.get(key)
+                if old is None:
+                    continue
+                if isinstance(child, dict):
+                    new = self._apply(child, old)
+                else:
+                    new = child(old)
+                if new is not old:
+                    if copied is None:
+                        copied = dict(value)
+                    copied[key] = new
+            return value if copied is None else copied
+
+        child = node.get('*')
+        if isinstance(value, list) and child is not None:
+            copied = None
+            for i, item in enumerate(value):
+                new = self._apply(child, item)
+                if new is not item:
+                    if copied is None:
+                        copied = list(value)
+                    copied[i] = new
+            return value if copied is None else copied
+
+        return value
+
+    def apply(self, data):
+        """Returns the transformed `data`. The top level dict is always a new
+        dict.
+
+        :param data: A data dictionary.
+
+        """
+        transformed = self._apply(self.tree, data)
+        return dict(data) if transformed is data else transformed
+
+    def transform_value(self, attr, value):
+        """Transforms the value of a single top level attribute.
+
+        :param attr: The attribute name.
+        :param value: The value to transform.
+
+        """
+        child = self.tree.get(attr)
+        if child is None or value is None:
+            return value
+        if isinstance(child, dict):
+            return self._apply(child, value)
+        return child(value)
+
+
+def transform_attr_value_lazily(attr, value):
+    """Like `transform_attr_value`, but only transforms the top level of
+    `value`. Nested dicts, also inside lists, are wrapped in a `LazyDict` so
+    that their keys are transformed when they are first read.
+
+    :param attr: The attribute to transform.
+    :param value: The value of the attribute to transform.
+
+    """
+    if value is None:
+        return value
+
+    transform = TRANSFORMS.get(attr)
+    if transform:
+        return transform(value)
+    if isinstance(value, dict):
+        return LazyDict(value)
+    if isinstance(value, list):
+        return [LazyDict(v) if isinstance(v, dict) else v for v in value]
+    return value
+
+
+class LazyDict(dict):
+    """A dict which transforms its values on first access, see
+    `transform_attr_value`. Transformed values are stored back into the dict,
+    so every value is transformed at most once.
+
+    """
+    __slots__ = ('_pending',)
+
+    def __init__(self, *args, **kwargs):
+        super(LazyDict, self).__init__(*args, **kwargs)
+        self._pending = set(self.iterkeys())
+
+    def __getitem__(self, k):
+        value = super(LazyDict, self).__getitem__(k)
+        if k in self._pending:
+            value = transform_attr_value_lazily(k, value)
+            super(LazyDict, self).__setitem__(k, value)
+            self._pending.discard(k)
+        return value
+
+    def __setitem__(self, k, v):
+        super(LazyDict, self).__setitem__(k, v)
+        self._pending.add(k)
+
+    def __delitem__(self, k):
+        super(LazyDict, self).__delitem__(k)
+        self._pending.discard(k)
+
+    def __reduce__(self):
+        # Pickles the stored values as they are, transformed or not, and
+        # restores which ones are still pending afterwards.
+        return (LazyDict, (), set(self._pending), None, dict.iteritems(self))
+
+    def __setstate__(self, pending):
+        self._pending = pending
+
+    def __eq__(self, other):
+        return dict(self.iteritems()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(dict(self.iteritems()))
+
+    def get(self, k, default=None):
+        return self[k] if k in self else default
+
+    def setdefault(self, k, default=None):
+        if k not in self:
+            self[k] = default
+        return self[k]
+
+    def pop(self, k, *default):
+        if k not in self:
+            return super(LazyDict, self).pop(k, *default)
+        value = self[k]
+        del self[k]
+        return value
+
+    def popitem(self):
+        k = next(self.iterkeys())
+        return k, self.pop(k)
+
+    def update(self, *args, **kwargs):
+        for k, v in dict(*args, **kwargs).iteritems():
+            self[k] = v
+
+    def copy(self):
+        return dict(self.iteritems())
+
+    def iteritems(self):
+        for k in self.keys():
+            yield k, self[k]
+
+    def itervalues(self):
+        for k in self.keys():
+            yield self[k]
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+
+def _materialize(value):
+    # Transforms `LazyDict`s at every level into plain dicts, as code working
+    # on the dict itself, e.g `dict(d)` or `**d`, skips `__getitem__`.
+    if isinstance(value, LazyDict):
+        return dict((k, _materialize(v)) for k, v in value.iteritems())
+    if isinstance(value, list):
+        return [_materialize(item) for item in value]
+    return value
+
+
+class DataView(object):
+    """A read-mostly view over a decoded JSON dict, used as the data of a
+    resource in view mode. The dict is not copied: values are transformed
+    when they are read, using the transform plan of the resource, and cached
+    next to it. The first write copies the dict, so the wrapped dict itself is
+    never modified.
+
+    """
+    __slots__ = ('_source', '_plan', '_cache', '_owned')
+
+    def __init__(self, source, plan):
+        """Initializes the view.
+
+        :param source: The dict to wrap.
+        :param plan: A transform plan, see `Resource.get_transform_plan`.
+
+        """
+        self._source = source
+        self._plan = plan
+        self._cache = {}
+        self._owned = False
+
+    def __getitem__(self, k):
+        try:
+            return self._cache[k]
+        except KeyError:
+            pass
+        value = self._plan.transform_value(k, self._source[k])
+        self._cache[k] = value
+        return value
+
+    def _own(self):
+        if not self._owned:
+            self._source = dict(self._source)
+            self._owned = True
+
+    def __setitem__(self, k, v):
+        self._own()
+        self._source[k] = v
+        self._cache.pop(k, None)
+
+    def __delitem__(self, k):
+        self._own()
+        del self._source[k]
+        self._cache.pop(k, None)
+
+    def __contains__(self, k):
+        return k in self._source
+
+    def __iter__(self):
+        return iter(self._source)
+
+    def __len__(self):
+        return len(self._source)
+
+    def __eq__(self, other):
+        return self.copy() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def get(self, k, default=None):
+        return self[k] if k in self._source else default
+
+    def keys(self):
+        return self._source.keys()
+
+    def iteritems(self):
+        for k in self._source:
+            yield k, self[k]
+
+    def itervalues(self):
+        for k in self._source:
+            yield self[k]
+
+    def items(self):
+        return list(self.iteritems())
+
+    def values(self):
+        return list(self.itervalues())
+
+    def copy(self):
+        """Returns a new dict with all values transformed."""
+        return dict(self.iteritems())
+
+
+def remove_slashes(url):
+    """Removes a leading and a trailing slash from the url `fragment`.
+
+    :param url: A url string.
+
+    """
+    if not url:
+        return url
+    start = 1 if url[0] == '/' else None
+    end = -1 if url[-1] == '/' else None
+    return url[start:end]
+
+
+def uri_prefix(parent, endpoint):
+    """Returns the uri of the `endpoint` under `parent`, e.g '/stores/1/orders'.
+    Most resources share a handful of parents, so prefixes are cached.
+
+    :param parent: An optional parent uri.
+    :param endpoint: An endpoint without leading and trailing slashes.
+
+    """
+    key = (parent, endpoint)
+    try:
+        return _uri_prefixes[key]
+    except KeyError:
+        pass
+
+    if parent:
+        prefix = "/{0}/{1}".format(remove_slashes(parent), endpoint)
+    else:
+        prefix = "/{0}".format(endpoint)
+    if len(_uri_prefixes) >= URI_CACHE_SIZE:
+        _uri_prefixes.clear()
+    _uri_prefixes[key] = prefix
+    return prefix
+
+
 class ApiObject(object):
+    # The name of the query parameter selecting the fields to return, if the
+    # endpoint supports one. Fields are always projected client side as well.
+    fields_param = None
+
     def __init__(self, transport, parent=None):
         """Initializes the base `ApiObject` class.
 
@@ -75,6 +630,67 @@ class ApiObject(object):
         """
         self.transport = transport
 
+    def get_option(self, name, default=None):
+        """Returns the value of a configuration option, see
+        `tictail.client.DEFAULT_CONFIG`.
+
+        :param name: The name of the option.
+        :param default: Returned if the transport has no such option.
+
+        """
+        config = getattr(self.transport, 'config', None) or {}
+        return config.get(name, default)
+
+    def identify(self, resource):
+        """Returns the instance to use for `resource`: with an identity map on
+        the transport, the mapped instance for the same resource, see
+        `tictail.resource.identity`. Otherwise `resource` itself.
+
+        """
+        identity_map = getattr(self.transport, 'identity_map', None)
+        if identity_map is None:
+            return resource
+        return identity_map.add(resource)
+
+    def reserve_connections(self, count):
+        """Grows the connection pool of the transport, if it has one, so that
+        `count` threads can issue requests without opening new connections.
+
+        """
+        resize_pool = getattr(self.transport, 'resize_pool', None)
+        if resize_pool is not None:
+            resize_pool(count)
+
+    def projection_params(self, fields, params=None):
+        """Returns `params` with the projection of `fields` added, if this
+        endpoint supports one, see `fields_param`.
+
+        """
+        if fields and self.fields_param:
+            params = dict(params or {})
+            top_level = []
+            for field in fields:
+                key = field.split('.', 1)[0]
+                if key not in top_level:
+                    top_level.append(key)
+            params[self.fields_param] = ','.join(top_level)
+        return params
+
+    def from_response(self, data, raw=None):
+        """Returns the decoded JSON `data` of a response as is if `raw` is set,
+        and instantiated resources otherwise.
+
+        :param data: A data dictionary or a list of data dictionaries.
+        :param raw: Whether to skip instantiating resources. Defaults to the
+        `raw` option.
+
+        """
+        if raw is None:
+            raw = self.get_option('raw', False)
+        if raw:
+            return data
+        return self.instantiate_from_data(data)
+
     @property
     def attr_name(self):
         """Returns a string used when attaching this `ApiObject` as a property
@@ -89,11 +705,7 @@ class ApiObject(object):
         :param url: A url string.
 
         """
-        if not url:
-            return url
-        start = 1 if url[0] == '/' else None
-        end = -1 if url[-1] == '/' else None
-        return url[start:end]
+        return remove_slashes(url)
 
     def request(self, method, uri, **kwargs):
         """Performs an HTTP request using the underlying transport.
@@ -113,10 +725,58 @@ class ApiObject(object):
 # =================
 
 
+class Subresource(object):
+    """A descriptor which instantiates a subresource the first time it is
+    accessed on a resource, and caches it on that resource.
+
+    """
+
+    def __init__(self, cls):
+        """Initializes the descriptor.
+
+        :param cls: The `Resource` or `Collection` class of the subresource.
+
+        """
+        self.cls = cls
+        self.name = cls.__name__.lower()
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        inst = self.cls(instance.transport, parent=instance.uri)
+        instance.__dict__[self.name] = inst
+        return inst
+
+
+class ResourceMeta(type):
+    """Attaches a `Subresource` descriptor for every class listed in the
+    `subresources` of a resource class, and strips the slashes off its
+    `endpoint` once, for building uris.
+
+    """
+
+    def __init__(cls, name, bases, attrs):
+        super(ResourceMeta, cls).__init__(name, bases, attrs)
+        for sub in attrs.get('subresources', ()):
+            descriptor = Subresource(sub)
+            if descriptor.name not in attrs:
+                setattr(cls, descriptor.name, descriptor)
+        cls.endpoint_path = remove_slashes(cls.endpoint)
+
+    def __setattr__(cls, name, value):
+        super(ResourceMeta, cls).__setattr__(name, value)
+        if name == 'endpoint':
+            super(ResourceMeta, cls).__setattr__('endpoint_path',
+                                                 remove_slashes(value))
+
+
 class Resource(ApiObject):
     """Describes an API resource."""
 
-    # A list of `Resource` objects, that will be instantiated as subresources.
+    __metaclass__ = ResourceMeta
+
+    # A list of `Resource` objects, that will be instantiated as subresources
+    # when they are first accessed.
     subresources = []
 
     # The name of the primary key for this instance.
@@ -129,6 +789,15 @@ class Resource(ApiObject):
     # without a primary key e.g /stores/1/theme.
     singleton = False
 
+    # Dotted paths of all the values that may need a transform, e.g
+    # 'items.*.created_at', see `TransformPlan`. If None, every attribute is
+    # transformed at every level.
+    transform_paths = None
+
+    # The names of the known top level fields of this resource. Compact
+    # resources keep these in slots, see `tictail.resource.compact`.
+    fields = ()
+
     def __init__(self, transport, data=None, parent=None):
         """Initializes this resource.
 
@@ -139,24 +808,47 @@ class Resource(ApiObject):
 
         """
         self._data = dict()
+        # The names of the fields changed since the data was loaded.
+        self._dirty = set()
         self.parent = parent
 
         super(Resource, self).__init__(transport)
+        self._set_data(data)
 
+    def _set_data(self, data):
         if data is None:
             data = {}
 
-        for k, v in data.iteritems():
-            self[k] = v
-
-        self.instantiate_subresources()
+        if self.get_option('view_resources'):
+            # The data is wrapped as it is and transformed when read.
+            self._data = DataView(data, self.get_transform_plan())
+        elif self.get_option('lazy_datetimes'):
+            # Values are only transformed when they are read.
+            self._data = LazyDict(data)
+        else:
+            self._data = self.get_transform_plan().apply(data)
+
+    @classmethod
+    def get_transform_plan(cls):
+        """Returns the compiled transform plan of this resource class."""
+        version, plan = _transform_plans.get(cls, (None, None))
+        if version != _transforms_version[0]:
+            if cls.transform_paths is None:
+                plan = GenericTransformPlan()
+            else:
+                plan = TransformPlan(cls.transform_paths)
+            _transform_plans[cls] = (_transforms_version[0], plan)
+        return plan
 
     def __getitem__(self, k):
         return self._data[k]
 
     def __setitem__(self, k, v):
-        v = transform_attr_value(k, v)
+        # Views and lazy dicts transform values when they are read.
+        if not isinstance(self._data, (DataView, LazyDict)):
+            v = self.get_transform_plan().transform_value(k, v)
         self._data[k] = v
+        self._dirty.add(k)
 
     def __delitem__(self, k):
         raise TypeError('Deleting properties is not supported.')
@@ -177,10 +869,50 @@ class Resource(ApiObject):
         self.__delitem__(k)
 
     def __repr__(self):
-        import pprint
         name = self.__class__.__name__
         return "{0}({1})".format(name, pprint.pformat(self.to_dict()))
 
+    def __reduce__(self):
+        # Pickles the (transformed) data, but neither the transport nor any
+        # instantiated subresources. See `attach`.
+        return (_restore_resource,
+                (self.__class__, self._plain_data(), self.parent, self._dirty))
+
+    def __copy__(self):
+        copy = self.__class__.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        # Saving the copy must not clear the pending changes of the original.
+        copy._dirty = set(self._dirty)
+        return copy
+
+    def __deepcopy__(self, memo):
+        import copy
+        data = copy.deepcopy(self._plain_data(), memo)
+        rv = _restore_resource(self.__class__, data, self.parent, self._dirty)
+        return rv.attach(self.transport)
+
+    def _plain_data(self):
+        # Views share their source, so they are materialized.
+        if isinstance(self._data, DataView):
+            return self._data.copy()
+        return self._data
+
+    def attach(self, transport):
+        """Attaches a transport to this resource, e.g after it has been
+        unpickled. Returns the resource.
+
+        :param transport: An instance of the transport strategy.
+
+        """
+        self.transport = transport
+        # Subresources read before were created without the transport, so
+        # they are instantiated again on their next access.
+        cls = self.__class__
+        for name in list(self.__dict__):
+            if isinstance(getattr(cls, name, None), Subresource):
+                del self.__dict__[name]
+        return self
+
     @property
     def pk(self):
         identifier = self.identifier
@@ -193,21 +925,33 @@ class Resource(ApiObject):
 
     @property
     def uri(self):
-        uri = ''
-
-        if self.parent:
-            parent = self._remove_slashes(self.parent)
-            uri += "/{0}".format(parent)
-
-        uri += "/{0}".format(self.endpoint)
-
-        if not self.singleton:
-            uri += "/{0}".format(self.pk)
+        parent = self.parent
+        endpoint = self.endpoint_path
+        if self.singleton:
+            return uri_prefix(parent, endpoint)
 
+        try:
+            pk = self._data[self.identifier]
+        except KeyError:
+            pk = self.pk
+
+        # The uri is cached for as long as the primary key, the parent and the
+        # endpoint stay the same.
+        cached = self.__dict__.get('_uri')
+        if (cached is not None and cached[0] == pk and
+                cached[1] is parent and cached[2] is endpoint):
+            return cached[3]
+        uri = "{0}/{1}".format(uri_prefix(parent, endpoint), pk)
+        self.__dict__['_uri'] = (pk, parent, endpoint, uri)
         return uri
 
     def instantiate_subresources(self):
-        """Instantiates all subresources which are attached as properties."""
+        """Instantiates all subresources which are attached as properties.
+
+        Subresources are instantiated on first access anyway, so this is only
+        needed to create them all up front.
+
+        """
         for sub in self.subresources:
             inst = sub(self.transport, parent=self.uri)
             setattr(self, inst.attr_name, inst)
@@ -218,7 +962,8 @@ class Resource(ApiObject):
         :param data: A data dictionary.
 
         """
-        return self.__class__(self.transport, data=data, parent=self.parent)
+        resource = self.__class__(self.transport, data=data, parent=self.parent)
+        return self.identify(resource)
 
     def data_keys(self):
         return self._data.keys()
@@ -230,8 +975,49 @@ class Resource(ApiObject):
         return self._data.items()
 
     def to_dict(self):
+        if isinstance(self._data, DataView):
+            return self._data.copy()
+        if isinstance(self._data, LazyDict):
+            return _materialize(self._data)
         return self._data
 
+    @property
+    def is_dirty(self):
+        return bool(self._dirty)
+
+    def mark_dirty(self, *names):
+        """Marks fields as changed. Only assignments are tracked, so fields
+        which are modified in place, e.g by appending to a list, need to be
+        marked explicitly.
+
+        """
+        self._dirty.update(names)
+
+    def mark_clean(self):
+        self._dirty.clear()
+
+    def changes(self):
+        """Returns a JSON serializable dict of the fields changed since the
+        data was loaded.
+
+        """
+        return dict((k, to_json_value(self._data[k]))
+                    for k in self._dirty if k in self._data)
+
+
+def _restore_resource(cls, data, parent, dirty):
+    """Restores a pickled resource. The data has been transformed already, so
+    the transform plan is skipped. The resource has no transport until it is
+    attached to one.
+
+    """
+    resource = cls.__new__(cls)
+    resource._data = data
+    resource._dirty = set(dirty)
+    resource.parent = parent
+    resource.transport = None
+    return resource
+
 
 class Collection(ApiObject):
     """Represents a collection of resources."""
@@ -252,20 +1038,23 @@ class Collection(ApiObject):
 
     @property
     def uri(self):
-        endpoint = self._remove_slashes(self.resource.endpoint)
-        if not self.parent:
-            return "/{0}".format(endpoint)
-        parent = self._remove_slashes(self.parent)
-        return "/{0}/{1}".format(parent, endpoint)
+        return uri_prefix(self.parent, self.resource.endpoint_path)
 
     def instantiate_from_data(self, data):
         """Returns an instance or list of instances of the `Resource` class for
         this collection.
 
+        If the `compact_resources` option is set, compact resources are
+        returned instead, see `tictail.resource.compact`.
+
         :param data: A data dictionary or a list of data dictionaries.
 
         """
-        maker = lambda d: self.resource(self.transport, data=d, parent=self.parent)
+        if self.get_option('compact_resources'):
+            maker = compact_class(self.resource)
+        else:
+            maker = lambda d: self.identify(
+                self.resource(self.transport, data=d, parent=self.parent))
         return map(maker, data) if isinstance(data, list) else maker(data)
 
 
@@ -275,32 +1064,208 @@ class Collection(ApiObject):
 
 
 class Get(object):
-    def get(self):
-        data, _ = self.request('GET', self.uri)
-        return self.instantiate_from_data(data)
+    def get(self, raw=None, fields=None):
+        params = self.projection_params(fields)
+        if params:
+            data, _ = self.request('GET', self.uri, params=params)
+        else:
+            data, _ = self.request('GET', self.uri)
+        if fields:
+            data = project(data, fields)
+        return self.from_response(data, raw)
 
 
 class GetById(object):
-    def get(self, id):
+    def get(self, id, raw=None, fields=None):
         uri = "{0}/{1}".format(self.uri, id)
-        data, _ = self.request('GET', uri)
-        return self.instantiate_from_data(data)
+        params = self.projection_params(fields)
+        if params:
+            data, _ = self.request('GET', uri, params=params)
+        else:
+            data, _ = self.request('GET', uri)
+        if fields:
+            data = project(data, fields)
+        return self.from_response(data, raw)
 
 
 class List(object):
+    # Field names usable in snapshot queries, and the paths they stand for.
+    # See `tictail.query`.
+    query_aliases = {}
+
     def format_params(self, **params):
         return params
 
-    def all(self, **params):
+    def snapshot(self, **params):
+        """Fetches all resources of this collection and returns them as a
+        `tictail.query.Snapshot` for querying in memory.
+
+        :param params: Query parameters, as accepted by `iterate`.
+
+        """
+        return Snapshot(self.iterate(**params), aliases=self.query_aliases)
+
+    def fetch_page(self, **params):
+        """Returns one page of this collection as decoded JSON."""
         params = self.format_params(**params)
         data, _ = self.request('GET', self.uri, params=params)
-        return self.instantiate_from_data(data)
+        return data
+
+    def all(self, as_columns=False, columns=None, raw=None, fields=None,
+            **params):
+        """Returns one page of this collection.
+
+        :param as_columns: If set, a `tictail.columnar.ColumnSet` is returned
+        instead of a list of resources.
+        :param columns: The (dotted) columns to return with `as_columns`.
+        Defaults to all top level keys.
+        :param raw: If set, the decoded JSON is returned instead of resources.
+        Defaults to the `raw` option.
+        :param fields: A list of (dotted) fields to keep, see `project`.
+        :param params: Query parameters.
+
+        """
+        params = self.projection_params(fields, params)
+        data = self.fetch_page(**params)
+        if fields:
+            data = project(data, fields)
+        if as_columns:
+            from ..columnar import to_columns
+            return to_columns(data, columns)
+        return self.from_response(data, raw)
+
+    def iterate(self, adaptive=False, as_columns=False, columns=None,
+                raw=None, fields=None, **params):
+        """Returns a generator over all resources of this collection. Pages are
+        fetched one at a time by following the `after` cursor until a page
+        with fewer than `limit` resources is returned, or an empty page in
+        adaptive mode.
+
+        :param adaptive: If set, the page size is tuned on the fly from the
+        observed latency and errors, starting at `limit`. Either True or a
+        `tictail.pagination.PageSizeController` with custom bounds.
+        :param as_columns: If set, one `tictail.columnar.ColumnSet` is yielded
+        per page instead of the resources. All pages get the columns of the
+        first page unless `columns` is given.
+        :param columns: The (dotted) columns to return with `as_columns`.
+        :param raw: If set, the decoded JSON of each resource is yielded.
+        Defaults to the `raw` option.
+        :param fields: A list of (dotted) fields to keep, see `project`. The
+        identifier is fetched regardless, to follow the cursor.
+        :param params: Query parameters, as accepted by `all`. `limit` sets
+        the page size.
+
+        """
+        if as_columns:
+            from ..columnar import to_columns
+
+        identifier = self.resource.identifier
+        if fields:
+            params = self.projection_params(list(fields) + [identifier], params)
+            projection = _projection_tree(fields)
+
+        params.setdefault('limit', DEFAULT_PAGE_LIMIT)
+        limit = params['limit']
+
+        controller = adaptive
+        if adaptive is True:
+            controller = PageSizeController(limit)
+
+        def fetch_page(limit):
+            params['limit'] = limit
+            return self.fetch_page(**params)
+
+        while True:
+            if controller:
+                page, limit = controller.fetch(fetch_page)
+            else:
+                page = self.fetch_page(**params)
+            if not page:
+                break
+            after = page[-1][identifier]
+            if fields:
+                page = _project(page, projection)
+            if as_columns:
+                chunk = to_columns(page, columns)
+                columns = chunk.names
+                yield chunk
+            else:
+                for resource in self.from_response(page, raw):
+                    yield resource
+            # The API may return fewer resources than an adaptive page size
+            # asked for, so only an empty page ends adaptive iteration.
+            if len(page) < limit and not controller:
+                break
+            params['after'] = after
 
 
 class Create(object):
-    def create(self, body):
+    def create(self, body, raw=None):
         data, _ = self.request('POST', self.uri, data=body)
-        return self.instantiate_from_data(data)
+        return self.from_response(data, raw)
+
+    def create_many(self, bodies, workers=DEFAULT_WORKERS, raw=None,
+                    retries=DEFAULT_RETRIES):
+        """Creates many resources concurrently. Returns a
+        `tictail.concurrency.BatchReport` of `(body, resource)` and
+        `(body, error)` tuples; a failed create does not stop the batch.
+
+        Requests rejected with a 429 pause every worker and are retried.
+        Other errors are not retried, since the resource may have been
+        created regardless.
+
+        :param bodies: An iterable of request bodies.
+        :param workers: The number of requests to issue at once.
+        :param raw: If set, the decoded JSON is returned instead of resources.
+        :param retries: How many times a rate limited request is retried.
+
+        """
+        self.reserve_connections(workers)
+        create = retrying(lambda body: self.create(body, raw=raw),
+                          (RateLimited,), retries)
+        return run_batch(create, bodies, workers)
+
+
+class Update(object):
+    def save(self):
+        """Sends the fields changed since the data was loaded with a PUT, and
+        reloads the resource from the response. Does nothing if no field has
+        changed.
+
+        """
+        changes = self.changes()
+        if not changes:
+            return self
+        data, _ = self.request('PUT', self.uri, data=changes)
+        self._dirty.difference_update(changes)
+        if data:
+            self._set_data(data)
+        return self
+
+    def update(self, **fields):
+        """Sets the given fields and saves them."""
+        for k, v in fields.iteritems():
+            self[k] = v
+        return self.save()
+
+
+def save_many(resources, workers=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    """Saves the changes of many resources concurrently. Returns a
+    `tictail.concurrency.BatchReport`; a failed save does not stop the batch.
+
+    PUTs are idempotent, so connection errors, 5xx errors and rate limits are
+    retried, see `tictail.concurrency.is_transient`.
+
+    :param resources: An iterable of resources with the `Update` capability.
+    :param workers: The number of requests to issue at once.
+    :param retries: How many times a failed request is retried.
+
+    """
+    resources = list(resources)
+    if resources:
+        resources[0].reserve_connections(workers)
+    save = retrying(lambda resource: resource.save(), is_transient, retries)
+    return run_batch(save, resources, workers)
 
 
 class Delete(object):
@@ -309,14 +1274,72 @@ class Delete(object):
         return status == 204
 
 
+class DeleteReport(BatchReport):
+    """The outcome of `DeleteById.delete_many`. Succeeded items are
+    `(id, True)` if the resource was deleted and `(id, False)` if it was gone
+    already.
+
+    """
+
+    @property
+    def deleted(self):
+        return [id for id, deleted in self.succeeded if deleted]
+
+    @property
+    def missing(self):
+        return [id for id, deleted in self.succeeded if not deleted]
+
+    def summary(self):
+        """Returns a dict of the number of deleted, missing and failed ids."""
+        deleted = len(self.deleted)
+        return {
+            'deleted': deleted,
+            'missing': len(self.succeeded) - deleted,
+            'failed': len(self.failed)
+        }
+
+    def __repr__(self):
+        return "DeleteReport(deleted={deleted}, missing={missing}, " \
+            "failed={failed})".format(**self.summary())
+
+
 class DeleteById(object):
     def delete(self, id):
         uri = "{0}/{1}".format(self.uri, id)
         data, status = self.request('DELETE', uri)
         return status == 204
 
+    def delete_many(self, ids, workers=DEFAULT_WORKERS,
+                    retries=DEFAULT_RETRIES):
+        """Deletes many resources concurrently. Returns a `DeleteReport`; a
+        failed delete does not stop the batch.
+
+        Deletes are idempotent, so connection errors, 5xx errors and rate
+        limits are retried, see `tictail.concurrency.is_transient`. A
+        resource that is not found counts as deleted already, e.g because a
+        retried delete went through the first time.
+
+        :param ids: An iterable of ids.
+        :param workers: The number of requests to issue at once.
+        :param retries: How many times a failed request is retried.
+
+        """
+        def delete(id):
+            try:
+                self.delete(id)
+            except NotFound:
+                return False
+            return True
+
+        self.reserve_connections(workers)
+        delete = retrying(delete, is_transient, retries)
+        return run_batch(delete, ids, workers, report=DeleteReport())
+
 
 __all__ = [
     'ApiObject', 'Resource', 'Collection', 'Get', 'GetById', 'List', 'Create',
-    'Delete', 'DeleteById'
+    'Update', 'Delete', 'DeleteById', 'DeleteReport', 'save_many', 'LazyDict', 'DataView',
+    'TransformPlan', 'GenericTransformPlan', 'to_json_value',
+    'register_transform', 'unregister_transform', 'timestamp_paths',
+    'parse_datetime', 'parse_decimal', 'lookup_path', 'project'
 ]
@@ -0,0 +1,165 @@
+"""
+tictail.resource.compact
+~~~~~~~~~~~~~~~~~~~~~~~~
+
+Compact, read-only representations of resources for holding large numbers of
+them in memory. A compact class is generated per resource class from its
+declared `fields`: every field gets a slot, and only fields which are not in
+the schema go into a per-instance dict. Compact resources keep neither a
+transport nor a parent; use `to_resource` to get a full `Resource` back.
+
+"""
+import pprint
+
+
+# Generated compact classes, by resource class.
+_compact_classes = {}
+
+
+class CompactResource(object):
+    """Base class for generated compact resource classes."""
+
+    __slots__ = ('_extra',)
+
+    # The `Resource` class this class was generated from.
+    resource_class = None
+
+    # The names of the slotted fields.
+    fields = ()
+
+    def __init__(self, data=None):
+        """Initializes this compact resource.
+
+        :param data: A optional dict of data for this resource.
+
+        """
+        self._load(self.resource_class.get_transform_plan().apply(data or {}))
+
+    def _load(self, data):
+        fields = self.fields
+        extra = None
+        for k, v in data.iteritems():
+            if k in fields:
+                object.__setattr__(self, k, v)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[k] = v
+        object.__setattr__(self, '_extra', extra)
+
+    def __reduce__(self):
+        # Generated classes cannot be pickled by reference, so compact
+        # resources are pickled by their resource class instead.
+        return (_restore_compact, (self.resource_class, self.to_dict()))
+
+    def __getattr__(self, k):
+        # Only called for unset slots and unknown fields.
+        extra = self._extra
+        if extra is not None and k in extra:
+            return extra[k]
+        raise AttributeError(k)
+
+    def __setattr__(self, k, v):
+        raise TypeError('Compact resources are read-only.')
+
+    def __getitem__(self, k):
+        # Only data is looked up, never methods or class attributes.
+        if k in self.fields:
+            try:
+                return object.__getattribute__(self, k)
+            except AttributeError:
+                raise KeyError(k)
+        extra = self._extra
+        if extra is not None and k in extra:
+            return extra[k]
+        raise KeyError(k)
+
+    def __contains__(self, k):
+        try:
+            self[k]
+        except KeyError:
+            return False
+        return True
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                self.to_dict() == other.to_dict())
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return "{0}({1})".format(name, pprint.pformat(self.to_dict()))
+
+    @property
+    def pk(self):
+        identifier = self.resource_class.identifier
+        if identifier not in self:
+            raise ValueError(
+                "This instance does not have a property '{0}' for primary key."
+                .format(identifier)
+            )
+        return self[identifier]
+
+    def data_keys(self):
+        return self.to_dict().keys()
+
+    def data_values(self):
+        return self.to_dict().values()
+
+    def data_items(self):
+        return self.to_dict().items()
+
+    def to_dict(self):
+        data = dict(self._extra or {})
+        for k in self.fields:
+            try:
+                data[k] = object.__getattribute__(self, k)
+            except AttributeError:
+                pass
+        return data
+
+    def to_resource(self, transport, parent=None):
+        """Returns a full `Resource` with the data of this compact resource.
+
+        :param transport: An instance of the transport strategy.
+        :param parent: An optional parent prefix for the resource's uri.
+
+        """
+        return self.resource_class(transport, data=self.to_dict(), parent=parent)
+
+
+def _restore_compact(resource_cls, data):
+    # The data has been transformed already.
+    cls = compact_class(resource_cls)
+    inst = cls.__new__(cls)
+    inst._load(data)
+    return inst
+
+
+def compact_class(resource_cls):
+    """Returns the compact class for `resource_cls`, generating it from the
+    resource's `fields` on first use.
+
+    :param resource_cls: A `Resource` subclass.
+
+    """
+    try:
+        return _compact_classes[resource_cls]
+    except KeyError:
+        pass
+
+    fields = tuple(resource_cls.fields)
+    name = "Compact{0}".format(resource_cls.__name__)
+    cls = type(name, (CompactResource,), {
+        '__slots__': fields,
+        '__module__': __name__,
+        'resource_class': resource_cls,
+        'fields': frozenset(fields)
+    })
+    _compact_classes[resource_cls] = cls
+    return cls
+
+
+__all__ = ['CompactResource', 'compact_class']
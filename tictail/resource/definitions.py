@@ -5,40 +5,129 @@ tictail.resource.definitions
 Definitions for all API endpoints and their corresponding instances.
 
 """
+from datetime import timedelta
 
+from ..concurrency import DEFAULT_WORKERS, imap_unordered
+from ..tree import CategoryTree, tree_cache
 from .base import (Collection,
                    Resource,
                    Get,
                    GetById,
                    List,
                    Create,
+                   Update,
                    Delete,
-                   DeleteById)
+                   DeleteById,
+                   parse_datetime,
+                   timestamp_paths,
+                   DEFAULT_PAGE_LIMIT)
+
+
+# Time windows are widened by this much at the front, so that an order which
+# was modified exactly on a window boundary is fetched no matter whether the
+# API treats `modified_after` as inclusive or exclusive.
+WINDOW_OVERLAP = timedelta(microseconds=1)
+
+# Dense windows are not split into windows shorter than this.
+MIN_WINDOW = timedelta(minutes=1)
 
 
 class Follower(Resource, Delete):
     endpoint = 'followers'
+    fields = ('id', 'email', 'created_at', 'modified_at')
+    transform_paths = timestamp_paths('')
 
 
 class Followers(Collection, List, Create, DeleteById):
     resource = Follower
 
 
-class Product(Resource, Get):
+class Product(Resource, Get, Update):
     endpoint = 'products'
+    fields = (
+        'id', 'store_id', 'title', 'slug', 'description', 'status', 'price',
+        'currency', 'price_includes_tax', 'quantity', 'unlimited', 'images',
+        'variations', 'categories', 'created_at', 'modified_at'
+    )
+    transform_paths = timestamp_paths(
+        '', 'images.*', 'variations.*', 'categories.*'
+    ) + ('price', 'variations.*.price')
 
 
 class Products(Collection, GetById, List):
     resource = Product
+    query_aliases = {'category': 'categories.*.id'}
 
     def format_params(self, **params):
         if 'categories' in params:
             params['categories'] = ','.join(params['categories'])
         return params
 
+    def _category_ids(self, categories):
+        ids = []
+        for category in categories:
+            if not isinstance(category, basestring):
+                category = category['id']
+            if category not in ids:
+                ids.append(category)
+        return ids
+
+    def by_category(self, categories, workers=DEFAULT_WORKERS, **params):
+        """Fetches the products of each of `categories`, paginating several
+        categories concurrently. Yields `(category_id, products)` tuples as
+        soon as all products of a category are fetched, in completion order.
+        The first error stops the fan-out and is re-raised.
+
+        :param categories: An iterable of category ids or `Category`
+        resources.
+        :param workers: The number of categories to fetch concurrently.
+        :param params: Query parameters, as accepted by `iterate`.
+
+        """
+        params.pop('categories', None)
+        self.reserve_connections(workers)
+
+        def fetch(category):
+            return list(self.iterate(categories=[category], **params))
+
+        results = imap_unordered(fetch, self._category_ids(categories),
+                                 workers)
+        try:
+            for category, products, error in results:
+                if error is not None:
+                    raise error
+                yield category, products
+        finally:
+            results.close()
+
+    def in_categories(self, categories, workers=DEFAULT_WORKERS, **params):
+        """Yields every product in any of `categories` once, fetching the
+        categories concurrently, see `by_category`. Products are yielded as
+        the categories complete, so the order is not deterministic.
+
+        :param categories: An iterable of category ids or `Category`
+        resources.
+        :param workers: The number of categories to fetch concurrently.
+        :param params: Query parameters, as accepted by `iterate`.
+
+        """
+        identifier = self.resource.identifier
+        seen = set()
+        for _, products in self.by_category(categories, workers, **params):
+            for product in products:
+                pk = product[identifier]
+                if pk not in seen:
+                    seen.add(pk)
+                    yield product
+
 
 class Card(Resource):
     endpoint = 'cards'
+    fields = (
+        'id', 'title', 'action', 'card_type', 'content', 'created_at',
+        'modified_at'
+    )
+    transform_paths = timestamp_paths('')
 
 
 class Cards(Collection, Create):
@@ -47,6 +136,11 @@ class Cards(Collection, Create):
 
 class Customer(Resource, Get):
     endpoint = 'customers'
+    fields = (
+        'id', 'name', 'email', 'country', 'language', 'created_at',
+        'modified_at'
+    )
+    transform_paths = timestamp_paths('')
 
 
 class Customers(Collection, GetById, List):
@@ -55,6 +149,16 @@ class Customers(Collection, GetById, List):
 
 class Order(Resource, GetById):
     endpoint = 'orders'
+    fields = (
+        'id', 'store_id', 'price', 'currency', 'prices_include_vat', 'vat',
+        'customer', 'transaction', 'fullfilment', 'items', 'discounts',
+        'created_at', 'modified_at'
+    )
+    transform_paths = timestamp_paths(
+        '', 'customer', 'transaction', 'fullfilment', 'discounts.*', 'items.*'
+    ) + ('price', 'vat.price', 'items.*.price') + tuple(
+        "items.*.product.{0}".format(path) for path in Product.transform_paths
+    )
 
 
 class Orders(Collection, GetById, List):
@@ -77,22 +181,166 @@ class Orders(Collection, GetById, List):
 
         return params
 
+    def _as_datetime(self, dt):
+        return parse_datetime(dt) if isinstance(dt, basestring) else dt
+
+    def _split_window(self, start, end, partitions):
+        """Splits the time range between `start` and `end` into `partitions`
+        adjacent windows of (almost) equal length.
+
+        """
+        step = (end - start) / partitions
+        if not step:
+            return [(start, end)]
+
+        windows = []
+        for i in range(partitions):
+            window_start = start + step * i
+            window_end = end if i == partitions - 1 else window_start + step
+            windows.append((window_start, window_end))
+        return windows
+
+    def _fetch_window(self, window, limit, split_if_dense):
+        """Fetches all orders modified in the given window. Returns a tuple of
+        the fetched orders and a flag telling whether the window was fully
+        fetched.
+
+        If `split_if_dense` is set, only the first page is fetched when it
+        turns out to be full and the window is reported as incomplete.
+
+        """
+        start, end = window
+        params = dict(modified_after=start - WINDOW_OVERLAP,
+                      modified_before=end,
+                      limit=limit)
+
+        if split_if_dense:
+            page = self.all(raw=False, **params)
+            if len(page) >= limit:
+                return page, False
+
+        return list(self.iterate(raw=False, **params)), True
+
+    def fetch_range(self, start, end, partitions=4, workers=DEFAULT_WORKERS,
+                    limit=DEFAULT_PAGE_LIMIT, adaptive=False,
+                    min_window=MIN_WINDOW):
+        """Fetches all orders modified between `start` (inclusive) and `end`
+        (exclusive). The range is split into time windows which are paginated
+        concurrently, and the results are merged and deduplicated by order id.
+
+        Returns a list of orders sorted by `modified_at`.
+
+        :param start: A naive UTC `datetime` or an ISO 8601 string.
+        :param end: A naive UTC `datetime` or an ISO 8601 string.
+        :param partitions: The number of windows to split the range into.
+        :param workers: The number of windows to fetch concurrently.
+        :param limit: The page size.
+        :param adaptive: If set, windows whose first page is full are split in
+        half and refetched, until they are shorter than `min_window`.
+        :param min_window: A `timedelta`, the shortest window to split.
+
+        """
+        start = self._as_datetime(start)
+        end = self._as_datetime(end)
+        if partitions < 1:
+            raise ValueError('`partitions` must be at least 1')
+        if end <= start:
+            return []
+
+        orders = {}
+        windows = self._split_window(start, end, partitions)
+        self.reserve_connections(workers)
+
+        def fetch(window):
+            split_if_dense = adaptive and window[1] - window[0] >= min_window * 2
+            return self._fetch_window(window, limit, split_if_dense)
+
+        while windows:
+            dense = []
+            results = imap_unordered(fetch, windows, workers)
+            try:
+                for window, rv, error in results:
+                    if error is not None:
+                        raise error
+                    page, complete = rv
+                    self._merge_orders(orders, page, start, end)
+                    if not complete:
+                        dense.extend(self._split_window(window[0], window[1],
+                                                        2))
+            finally:
+                results.close()
+            windows = dense
+
+        return sorted(orders.values(), key=self._modified_key)
+
+    def _modified_key(self, order):
+        # Sorts orders that were never modified first. Naive datetimes cannot
+        # be compared to None.
+        modified_at = order.modified_at
+        return (modified_at is not None, modified_at, order.pk)
+
+    def _merge_orders(self, orders, page, start, end):
+        """Merges `page` into the `orders` dict, keyed by id. Orders outside of
+        the requested range are dropped and the most recently modified copy of
+        an order wins.
+
+        """
+        for order in page:
+            modified_at = order.modified_at
+            if modified_at is not None and not start <= modified_at < end:
+                continue
+            seen = orders.get(order.pk)
+            if seen is None or self._modified_key(seen) < self._modified_key(order):
+                orders[order.pk] = order
+
 
 class Theme(Resource, Get):
     endpoint = 'theme'
     singleton = True
+    fields = ('id', 'markup', 'created_at', 'modified_at')
+    transform_paths = timestamp_paths('')
 
 
 class Category(Resource):
     endpoint = 'categories'
+    fields = (
+        'id', 'title', 'parent_id', 'position', 'created_at', 'modified_at'
+    )
+    transform_paths = timestamp_paths('')
 
 
 class Categories(Collection, List):
     resource = Category
 
+    def tree(self, max_age=None, refresh=False):
+        """Returns the categories as a `tictail.tree.CategoryTree`. Trees are
+        cached per store and revalidated once they are older than `max_age`:
+        the categories are fetched again, and the tree is only rebuilt if
+        they changed.
+
+        :param max_age: How long (in seconds) a cached tree is used. Defaults
+        to the `category_tree_max_age` option.
+        :param refresh: If set, the tree is revalidated regardless of its age.
+
+        """
+        if refresh:
+            max_age = 0
+        elif max_age is None:
+            max_age = self.get_option('category_tree_max_age', 0)
+
+        build = lambda data: CategoryTree(self.from_response(data, False))
+        return tree_cache(self.transport).get(
+            self.uri, lambda: self.all(raw=True), build, max_age)
+
 
 class Store(Resource, Get):
     endpoint = 'stores'
+    fields = (
+        'id', 'name', 'description', 'url', 'dashboard_url', 'country',
+        'currency', 'language', 'logotype', 'contact_email',
+        'storekeeper_email', 'sandbox', 'created_at', 'modified_at'
+    )
+    transform_paths = timestamp_paths('', 'logotype.*')
     subresources = [
         Cards,
         Products,
@@ -113,7 +361,7 @@ class Me(Store, Get):
     singleton = True
 
     def instantiate_from_data(self, data):
-        return Store(self.transport, data=data)
+        return self.identify(Store(self.transport, data=data))
 
 
 __all__ = [
@@ -0,0 +1,116 @@
+"""
+tictail.resource.identity
+~~~~~~~~~~~~~~~~~~~~~~~~~
+
+An identity map for resources. With the `identity_map` option set, every
+resource fetched through a client is looked up by its class and uri, so the
+same resource is only ever represented by one instance. Newer data for a
+resource that is already mapped is merged into the existing instance.
+
+Resources are held by weak references: once nothing else refers to a
+resource, it drops out of the map.
+
+"""
+import threading
+import weakref
+
+
+def _modified_at(resource):
+    try:
+        return resource['modified_at']
+    except KeyError:
+        return None
+
+
+class IdentityMap(object):
+    """Maps `(resource class, uri)` to the one instance of a resource."""
+
+    def __init__(self):
+        self._resources = weakref.WeakValueDictionary()
+        # Pages may be instantiated from several threads, e.g by
+        # `Orders.fetch_range`.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._resources)
+
+    def __contains__(self, key):
+        return key in self._resources
+
+    @staticmethod
+    def key(resource):
+        """Returns the key of `resource`, or None if it has no uri, e.g
+        because it has no primary key.
+
+        """
+        try:
+            return (resource.__class__, resource.uri)
+        except ValueError:
+            return None
+
+    def get(self, resource_cls, uri):
+        """Returns the mapped instance of a resource, or None.
+
+        :param resource_cls: The `Resource` class.
+        :param uri: The uri of the resource.
+
+        """
+        return self._resources.get((resource_cls, uri))
+
+    def add(self, resource):
+        """Maps `resource` and returns the instance to use in its place.
+
+        If an instance for the same resource is already mapped, the data of
+        `resource` is merged into it unless the mapped data has been modified
+        more recently, and the mapped instance is returned.
+
+        :param resource: A `Resource`.
+
+        """
+        key = self.key(resource)
+        if key is None:
+            return resource
+
+        with self._lock:
+            existing = self._resources.get(key)
+            if existing is None:
+                self._resources[key] = resource
+                return resource
+            if existing is not resource:
+                self.merge(existing, resource)
+            return existing
+
+    def merge(self, existing, resource):
+        """Merges the data of `resource` into `existing`, unless `existing` was
+        modified after `resource`. Fields missing from `resource`, e.g because
+        it was fetched with a projection, and unsaved changes to `existing` are
+        kept.
+
+        """
+        current = _modified_at(existing)
+        incoming = _modified_at(resource)
+        if current is not None and incoming is not None and incoming < current:
+            return
+        unsaved = dict((k, existing[k]) for k in existing._dirty
+                       if k in existing._data)
+        if set(resource._data.keys()) >= set(existing._data.keys()):
+            existing._data = resource._data
+        else:
+            for k in resource._data.keys():
+                existing._data[k] = resource._data[k]
+        for k, v in unsaved.iteritems():
+            existing._data[k] = v
+
+    def discard(self, resource):
+        """Removes `resource` from the map."""
+        key = self.key(resource)
+        with self._lock:
+            if key is not None and self._resources.get(key) is resource:
+                del self._resources[key]
+
+    def clear(self):
+        with self._lock:
+            self._resources.clear()
+
+
+__all__ = ['IdentityMap']
@@ -0,0 +1,283 @@
+"""
+tictail.sync
+~~~~~~~~~~~~
+
+Incremental synchronization of orders. `OrderSync` remembers a `modified_at`
+high-watermark in a checkpoint store, and only fetches orders modified after
+it on the next run.
+
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from .importer import json
+from .resource.base import parse_datetime
+
+
+# Orders are fetched starting this long before the watermark, so that no order
+# is missed regardless of how the API compares timestamps. Orders that were
+# already handed out are filtered on the client.
+DEFAULT_LOOKBACK = timedelta(seconds=1)
+
+# How many orders a sync goes through between checkpoints.
+DEFAULT_CHECKPOINT_EVERY = 100
+
+
+class FileCheckpointStore(object):
+    """Keeps checkpoints in a JSON file. Every save rewrites the file
+    atomically, so a crash never leaves a half written checkpoint behind.
+
+    """
+
+    def __init__(self, path):
+        """Initializes the store.
+
+        :param path: The path of the JSON file. It is created when the first
+        checkpoint is saved.
+
+        """
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path) as fd:
+                return json.load(fd)
+        except IOError:
+            return {}
+
+    def load(self, key):
+        """Returns the checkpoint saved under `key`, or None.
+
+        :param key: The checkpoint key.
+
+        """
+        return self._read().get(key)
+
+    def save(self, key, checkpoint):
+        """Saves a checkpoint under `key`.
+
+        :param key: The checkpoint key.
+        :param checkpoint: A JSON serializable dict.
+
+        """
+        checkpoints = self._read()
+        checkpoints[key] = checkpoint
+
+        tmp_path = "{0}.tmp".format(self.path)
+        with open(tmp_path, 'w') as fd:
+            json.dump(checkpoints, fd)
+            fd.flush()
+            os.fsync(fd.fileno())
+        if os.name == 'nt' and os.path.exists(self.path):
+            os.remove(self.path)
+        os.rename(tmp_path, self.path)
+
+
+class SQLiteCheckpointStore(object):
+    """Keeps checkpoints in a SQLite database."""
+
+    def __init__(self, path):
+        """Initializes the store and creates the checkpoint table if needed.
+
+        :param path: The path of the database file, or ':memory:'.
+
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS tictail_checkpoints '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+
+    def load(self, key):
+        """Returns the checkpoint saved under `key`, or None.
+
+        :param key: The checkpoint key.
+
+        """
+        row = self.connection.execute(
+            'SELECT value FROM tictail_checkpoints WHERE key = ?', (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, key, checkpoint):
+        """Saves a checkpoint under `key`.
+
+        :param key: The checkpoint key.
+        :param checkpoint: A JSON serializable dict.
+
+        """
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO tictail_checkpoints (key, value) '
+                'VALUES (?, ?)',
+                (key, json.dumps(checkpoint))
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class OrderSync(object):
+    """Yields the orders of a store that changed since the last run.
+
+    A run fetches the orders modified after the watermark and before the time
+    the run started, following the id cursor of the API, so orders are
+    streamed one page at a time. The cursor is checkpointed every
+    `checkpoint_every` orders, only once the consumer has asked for the next
+    order, so a run that is interrupted resumes from the last checkpoint and
+    hands out the orders after it again. When a run completes, the largest
+    `modified_at` it has seen becomes the new watermark. The watermark is
+    thereby taken from the clock of the API, and a skewed local clock only
+    bounds the run.
+
+    Orders that were never modified are placed by their `created_at`. The ids
+    of the orders handed out within `lookback` of the watermark are kept, so
+    that the overlap between runs is not handed out twice.
+
+    >>> sync = OrderSync(store.orders, FileCheckpointStore('orders.json'))
+    >>> for order in sync.changes():
+    ...     process(order)
+
+    """
+
+    def __init__(self, orders, checkpoints, key=None, lookback=DEFAULT_LOOKBACK,
+                 limit=None, checkpoint_every=DEFAULT_CHECKPOINT_EVERY,
+                 clock=datetime.utcnow):
+        """Initializes the sync.
+
+        :param orders: An `Orders` collection.
+        :param checkpoints: A checkpoint store, e.g `FileCheckpointStore`.
+        :param key: The checkpoint key. Defaults to the uri of `orders`, which
+        is unique per store.
+        :param lookback: A `timedelta` subtracted from the watermark when
+        querying the API.
+        :param limit: An optional page size.
+        :param checkpoint_every: How many orders to go through between
+        checkpoints.
+        :param clock: A function returning the current naive UTC `datetime`,
+        used to bound a run.
+
+        """
+        self.orders = orders
+        self.checkpoints = checkpoints
+        self.key = key or orders.uri
+        self.lookback = lookback
+        self.limit = limit
+        self.checkpoint_every = checkpoint_every
+        self.clock = clock
+
+    @property
+    def watermark(self):
+        """Returns the largest `modified_at` seen by the completed runs, or
+        None.
+
+        """
+        return self._load()['watermark']
+
+    def _load(self):
+        checkpoint = self.checkpoints.load(self.key) or {}
+        watermark = checkpoint.get('modified_at')
+        if watermark is not None:
+            watermark = parse_datetime(watermark)
+        recent = checkpoint.get('recent')
+        if recent is None:
+            # Checkpoints of earlier versions held the ids of the orders
+            # modified exactly at the watermark.
+            recent = dict((id, checkpoint['modified_at'])
+                          for id in checkpoint.get('ids', ()))
+        run = checkpoint.get('run')
+        if run is not None:
+            run = dict(run, until=parse_datetime(run['until']))
+            if run.get('seen') is not None:
+                run['seen'] = parse_datetime(run['seen'])
+        return {'watermark': watermark, 'recent': recent, 'run': run}
+
+    def _save(self, watermark, recent, run=None):
+        if run is not None:
+            seen = run['seen'].isoformat() if run['seen'] else None
+            run = dict(run, until=run['until'].isoformat(), seen=seen)
+        self.checkpoints.save(self.key, {
+            'modified_at': watermark.isoformat() if watermark else None,
+            'recent': recent,
+            'run': run
+        })
+
+    def _changed_at(self, order):
+        try:
+            return order['modified_at'] or order['created_at']
+        except KeyError:
+            return None
+
+    def _is_new(self, order, watermark, recent):
+        if watermark is None:
+            return True
+        changed_at = self._changed_at(order)
+        if changed_at is None:
+            return True
+        if changed_at <= watermark - self.lookback:
+            return False
+        return recent.get(order.pk) != changed_at.isoformat()
+
+    def reset(self):
+        """Forgets the watermark, so that the next run starts from scratch."""
+        self.checkpoints.save(self.key, None)
+
+    def changes(self):
+        """Returns a generator over all orders modified since the watermark,
+        in the order the API returns them.
+
+        """
+        checkpoint = self._load()
+        watermark = checkpoint['watermark']
+        recent = checkpoint['recent']
+        run = checkpoint['run'] or {'until': self.clock(), 'after': None}
+        until = run['until']
+        # The largest change time seen by the run, which becomes the watermark.
+        seen = run.get('seen') or watermark
+
+        params = {'modified_before': until, 'raw': False}
+        if self.limit:
+            params['limit'] = self.limit
+        if watermark is not None:
+            params['modified_after'] = watermark - self.lookback
+        if run['after'] is not None:
+            params['after'] = run['after']
+
+        # The orders handed out by this run, kept apart from those of the
+        # previous run, which are needed until the run completes.
+        handed = {}
+        pending = 0
+        for order in self.orders.iterate(**params):
+            changed_at = self._changed_at(order)
+            if self._is_new(order, watermark, recent):
+                yield order
+                if changed_at is not None:
+                    handed[order.pk] = changed_at.isoformat()
+            if changed_at is not None and (seen is None or changed_at > seen):
+                seen = changed_at
+
+            pending += 1
+            if pending >= self.checkpoint_every:
+                handed = self._prune(handed, seen)
+                run = {'until': until, 'after': order.pk, 'seen': seen}
+                saved = dict(recent)
+                saved.update(handed)
+                self._save(watermark, saved, run)
+                pending = 0
+
+        recent.update(handed)
+        self._save(seen, self._prune(recent, seen))
+
+    def _prune(self, recent, watermark):
+        # Orders changed this close to the watermark are remembered, as the
+        # next run fetches them again.
+        if watermark is None:
+            return {}
+        overlap = (watermark - self.lookback).isoformat()
+        return dict((k, v) for k, v in recent.iteritems() if v > overlap)
+
+
+__all__ = ['FileCheckpointStore', 'SQLiteCheckpointStore', 'OrderSync']
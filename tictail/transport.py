@@ -7,19 +7,22 @@ done via HTTP via the `requests` library. For documentation on `requests`,
 please visit: http://docs.python-requests.org/en/latest/.
 
 """
+import threading
 
 from .version import __version__
 from .importer import json, requests
 from .errors import (ApiConnectionError,
+                     ApiTimeout,
                      ApiError,
                      Forbidden,
                      NotFound,
                      BadRequest,
-                     ServerError)
+                     ServerError,
+                     RateLimited)
 
 
-ConnectionError = requests.exceptions.ConnectionError
-HTTPError = requests.exceptions.HTTPError
+# Default number of connections per host kept open by the session.
+DEFAULT_POOL_SIZE = 10
 
 
 class RequestsHttpTransport(object):
@@ -30,9 +33,56 @@ class RequestsHttpTransport(object):
 
     """
 
+    # An optional `tictail.resource.identity.IdentityMap` shared by all
+    # resources using this transport.
+    identity_map = None
+
+    # The `tictail.tree.TreeCache` of the category trees fetched through this
+    # transport, attached on first use.
+    category_trees = None
+
+    # The absolute base uri and the config values it was built from.
+    _base = None
+
+    # The `requests.Session` shared by all requests, and the number of
+    # connections per host its pool keeps open.
+    _session = None
+    _pool_size = 0
+
     def __init__(self, access_token, config):
         self.access_token = access_token
         self.config = config
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """The `requests.Session` all requests are made with, so that
+        connections are reused. Created on first use.
+
+        """
+        session = self._session
+        if session is None:
+            session = self.resize_pool(self.config.get('pool_size', DEFAULT_POOL_SIZE))
+        return session
+
+    def resize_pool(self, size):
+        """Makes the connection pool of the session keep at least `size`
+        connections per host open, e.g one for every thread issuing requests.
+        Returns the session.
+
+        :param size: The number of connections.
+
+        """
+        with self._session_lock:
+            session = self._session
+            if session is None:
+                session = self._session = requests.Session()
+            if size > self._pool_size:
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._pool_size = size
+            return session
 
     def _make_abs_uri(self, uri):
         """Makes an absolute API uri using the API base and protocol.
@@ -40,14 +90,17 @@ class RequestsHttpTransport(object):
         :param uri: The URI to absolutize.
 
         """
-        base = self.config['base']
-        version = "v{0}".format(self.config['version'])
-        protocol = self.config['protocol']
+        config = self.config
+        key = (config['protocol'], config['base'], config['version'])
+        # The base is only rebuilt when the config changes.
+        base = self._base
+        if base is None or base[0] != key:
+            base = self._base = (key, "{0}://{1}/v{2}/".format(*key))
         if uri[0] == '/':
             uri = uri[1:]
         if uri[-1] == '/':
             uri = uri[:-1]
-        return "{0}://{1}/{2}/{3}".format(protocol, base, version, uri)
+        return base[1] + uri
 
     def _utf8(self, value):
         return value.encode('utf-8') if isinstance(value, unicode) else value
@@ -55,6 +108,19 @@ class RequestsHttpTransport(object):
     def _handle_connection_error(self, err):
         raise ApiConnectionError(err.message)
 
+    def _handle_timeout(self, err):
+        raise ApiTimeout(str(err))
+
+    def _retry_after(self, resp):
+        """Returns the `Retry-After` header of a response in seconds, or None
+        if it is missing or not a number of seconds.
+
+        """
+        try:
+            return max(float(resp.headers['retry-after']), 0.0)
+        except (KeyError, TypeError, ValueError):
+            return None
+
     def _handle_http_error(self, err):
         resp = err.response
         status_code = resp.status_code
@@ -66,7 +132,11 @@ class RequestsHttpTransport(object):
             # If we can't read JSON from the error response, then something is
             # obviously wrong. Check for Bad Gateway errors first, otherwise
             # just show a generic error message and raise a `ServerError`.
-            if status_code == 502:
+            if status_code == 429:
+                raise RateLimited('Too many requests.', status_code,
+                                  resp.text,
+                                  retry_after=self._retry_after(resp))
+            elif status_code == 502:
                 message = ('It seems that the API is unreachable. Please contact '
                            'Tictail Support if the problem persists.')
             else:
@@ -75,9 +145,12 @@ class RequestsHttpTransport(object):
 
             raise ServerError(message, status_code, resp.text)
 
-        # Raise appropriate exception for 400, 403, 404, and a generic error
-        # for all other error codes.
-        if status_code == 400:
+        # Raise appropriate exception for 400, 403, 404, 429 and a generic
+        # error for all other error codes.
+        if status_code == 429:
+            raise RateLimited(message, status_code, resp.text, json=resp_json,
+                              retry_after=self._retry_after(resp))
+        elif status_code == 400:
             err_cls = BadRequest
         elif status_code == 403:
             err_cls = Forbidden
@@ -170,21 +243,23 @@ class RequestsHttpTransport(object):
         timeout = self.config['timeout']
 
         try:
-            resp = requests.request(method, abs_uri,
-                                    params=params,
-                                    data=data,
-                                    headers=headers,
-                                    timeout=timeout,
-                                    verify=verify_ssl_certs)
+            resp = self.session.request(method, abs_uri,
+                                        params=params,
+                                        data=data,
+                                        headers=headers,
+                                        timeout=timeout,
+                                        verify=verify_ssl_certs)
 
             # `requests` will store an `HTTPError` if one happened.
             resp.raise_for_status()
 
             content = resp.json() if resp.text else None
             return content, resp.status_code
-        except ConnectionError as ce:
+        except requests.exceptions.Timeout as te:
+            self._handle_timeout(te)
+        except requests.exceptions.ConnectionError as ce:
             self._handle_connection_error(ce)
-        except HTTPError as he:
+        except requests.exceptions.HTTPError as he:
             self._handle_http_error(he)
         except Exception as e:
             e.response = resp
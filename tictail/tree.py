@@ -0,0 +1,198 @@
+"""
+tictail.tree
+~~~~~~~~~~~~
+
+The category hierarchy of a store. Categories are returned as a flat list
+linked by `parent_id`; a `CategoryTree` indexes them once, so that the parent,
+children, ancestors and descendants of a category are dict lookups.
+
+Trees are cached per store by `Categories.tree`, see `TreeCache`.
+
+"""
+import threading
+import time
+
+from .diff import content_hash
+
+
+def _field(item, key):
+    try:
+        return item[key]
+    except KeyError:
+        return None
+
+
+def _position(item):
+    position = _field(item, 'position')
+    # Categories without a position come last.
+    return (position is None, position, _field(item, 'id'))
+
+
+class CategoryTree(object):
+    """Categories indexed by their place in the hierarchy. Siblings are in
+    the order of their `position`. Methods taking a category accept either a
+    category or its id.
+
+    """
+
+    def __init__(self, categories):
+        """Builds the tree.
+
+        :param categories: An iterable of `Category` resources or dicts.
+
+        """
+        self._categories = dict((_field(c, 'id'), c) for c in categories)
+        self._parents = {}
+        self._children = {}
+
+        ordered = sorted(self._categories.itervalues(), key=_position)
+        for category in ordered:
+            parent = self._categories.get(_field(category, 'parent_id'))
+            # Categories whose parent is missing are treated as roots.
+            parent_id = _field(parent, 'id') if parent is not None else None
+            self._parents[_field(category, 'id')] = parent
+            self._children.setdefault(parent_id, []).append(category)
+
+        self.roots = tuple(self._children.pop(None, ()))
+        self._children = dict((k, tuple(v))
+                              for k, v in self._children.iteritems())
+        self._ancestors = {}
+        self._descendants = {}
+        for root in self.roots:
+            self._index(root, ())
+
+    def _index(self, category, ancestors):
+        # Depth first, so that descendants come in tree order. Categories that
+        # are part of a cycle are never reached from a root and stay
+        # unindexed.
+        id = _field(category, 'id')
+        self._ancestors[id] = ancestors
+        descendants = []
+        for child in self._children.get(id, ()):
+            descendants.append(child)
+            descendants.extend(self._index(child, ancestors + (category,)))
+        self._descendants[id] = tuple(descendants)
+        return self._descendants[id]
+
+    def _id(self, category):
+        if isinstance(category, basestring):
+            return category
+        return _field(category, 'id')
+
+    def __len__(self):
+        return len(self._categories)
+
+    def __contains__(self, category):
+        return self._id(category) in self._categories
+
+    def __iter__(self):
+        """Iterates over all categories in tree order."""
+        for root in self.roots:
+            yield root
+            for category in self._descendants[_field(root, 'id')]:
+                yield category
+
+    def __repr__(self):
+        return "CategoryTree(categories={0}, roots={1})".format(
+            len(self), len(self.roots))
+
+    def get(self, category):
+        """Returns the category with the given id, or None."""
+        return self._categories.get(self._id(category))
+
+    def parent(self, category):
+        """Returns the parent of a category, or None for root categories."""
+        return self._parents.get(self._id(category))
+
+    def children(self, category):
+        """Returns a tuple of the children of a category."""
+        return self._children.get(self._id(category), ())
+
+    def ancestors(self, category):
+        """Returns a tuple of the ancestors of a category, root first."""
+        return self._ancestors.get(self._id(category), ())
+
+    def descendants(self, category):
+        """Returns a tuple of all descendants of a category, in tree order."""
+        return self._descendants.get(self._id(category), ())
+
+    def path(self, category):
+        """Returns a tuple of the ancestors of a category followed by the
+        category itself, e.g for breadcrumbs.
+
+        """
+        category = self.get(category)
+        if category is None:
+            return ()
+        return self.ancestors(category) + (category,)
+
+
+# Guards attaching a `TreeCache` to a transport.
+_attach_lock = threading.Lock()
+
+
+def tree_cache(transport):
+    """Returns the `TreeCache` of a transport, attaching one if needed."""
+    cache = getattr(transport, 'category_trees', None)
+    if cache is None:
+        with _attach_lock:
+            cache = getattr(transport, 'category_trees', None)
+            if cache is None:
+                cache = transport.category_trees = TreeCache()
+    return cache
+
+
+class TreeCache(object):
+    """Category trees by store, rebuilt when they are older than `max_age`
+    and their categories changed.
+
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        # Uris of category collections mapped to tuples of when the tree was
+        # last validated, the hash of its categories and the tree.
+        self._trees = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._trees)
+
+    def get(self, uri, fetch, build, max_age):
+        """Returns the cached tree for `uri`. Once the tree is older than
+        `max_age`, the categories are fetched again and the tree is only
+        rebuilt if they changed.
+
+        :param uri: The uri of the category collection.
+        :param fetch: A function returning the categories as decoded JSON.
+        :param build: A function building a tree from decoded JSON.
+        :param max_age: How long (in seconds) a tree is used before it is
+        revalidated. 0 revalidates on every call.
+
+        """
+        now = self.clock()
+        with self._lock:
+            entry = self._trees.get(uri)
+        if entry is not None and now - entry[0] < max_age:
+            return entry[2]
+
+        data = fetch()
+        digest = content_hash(data)
+        if entry is not None and entry[1] == digest:
+            tree = entry[2]
+        else:
+            tree = build(data)
+        with self._lock:
+            self._trees[uri] = (now, digest, tree)
+        return tree
+
+    def invalidate(self, uri=None):
+        """Drops the tree for `uri`, or all trees."""
+        with self._lock:
+            if uri is None:
+                self._trees.clear()
+            else:
+                self._trees.pop(uri, None)
+
+
+__all__ = ['CategoryTree', 'TreeCache', 'tree_cache']